@@ -1,13 +1,32 @@
 """Simulate the Claude Code CLI with the NotebookLM plugin installed.
 
 This script is used for manual testing of the plugin interface.
+
+Commands go to a long-lived plugin worker: the simulator starts itself once with
+``--worker``, and that process runs ``run.py`` in-process for each newline-delimited
+JSON request, so interpreter startup and plugin imports are paid once per session.
+A worker that crashes or times out is restarted on the next command. Pass
+``--no-worker`` to start a fresh ``run.py`` subprocess for every command instead.
 """
 
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
 import json
 import logging
+import os
+import queue
+import runpy
+import statistics
 import subprocess
 import sys
+import threading
+import time
+from dataclasses import dataclass, field
 from pathlib import Path
+from typing import TextIO
 
 PLUGIN_DIR = Path.home() / ".claude" / "plugins" / "installed" / "notebooklm"
 SCRIPTS_DIR = PLUGIN_DIR / "skills" / "notebooklm" / "scripts"
@@ -26,6 +45,7 @@ class Colors:
 
 logger = logging.getLogger("claude_code_simulator")
 MIN_SUBCOMMAND_PARTS = 2
+COMMAND_TIMEOUT_S = 10
 
 
 def _configure_logging() -> None:
@@ -50,6 +70,7 @@ def _handle_notebook_auth(parts: list[str]) -> None:
     subcmd = parts[1]
     result = execute_command("auth", [subcmd])
     format_response(result)
+    _emit_latency()
 
 
 def _handle_notebook(parts: list[str]) -> None:
@@ -64,6 +85,7 @@ def _handle_notebook(parts: list[str]) -> None:
 
     result = execute_command(subcmd, args)
     format_response(result)
+    _emit_latency()
 
 
 def _handle_command(user_input: str) -> bool:
@@ -101,21 +123,197 @@ def print_header() -> None:
     _emit(f"{Colors.RESET}")
 
 
-def execute_command(cmd: str, args: list[str]) -> dict:
-    """Execute a plugin command."""
-    script_path = SCRIPTS_DIR / "run.py"
-
+def _run_plugin(script: Path, cmd: str, args: list[str]) -> tuple[str, int]:
+    stdout = io.StringIO()
+    saved_argv = sys.argv
+    sys.argv = [str(script), cmd, *args]
+    exit_code = 0
+    try:
+        with contextlib.redirect_stdout(stdout):
+            runpy.run_path(str(script), run_name="__main__")
+    except SystemExit as exc:
+        exit_code = exc.code if isinstance(exc.code, int) else int(exc.code is not None)
+    except Exception:  # noqa: BLE001 - report a failed command, keep serving
+        exit_code = 1
+    finally:
+        sys.argv = saved_argv
+    return stdout.getvalue(), exit_code
+
+
+def serve_worker() -> int:
+    """Answer newline-delimited JSON command requests on stdin until it closes.
+
+    Replies go to a private duplicate of fd 1, and fd 1 itself is pointed at stderr,
+    so output the plugin writes below ``sys.stdout`` (child processes, C extensions)
+    cannot corrupt the protocol stream.
+    """
+    script = SCRIPTS_DIR / "run.py"
+    sys.stdout.flush()
+    channel = os.fdopen(os.dup(1), "w", encoding="utf-8")
+    os.dup2(2, 1)
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        request = json.loads(line)
+        stdout, exit_code = _run_plugin(script, request["cmd"], request.get("args", []))
+        response = {"id": request["id"], "stdout": stdout, "exit_code": exit_code}
+        channel.write(json.dumps(response) + "\n")
+        channel.flush()
+    return 0
+
+
+def _parse_output(stdout: str, exit_code: int = 0) -> dict:
     try:
-        result = subprocess.run(  # noqa: S603
-            [sys.executable, str(script_path), cmd, *args],
-            capture_output=True,
-            check=False,  # CLI script returns JSON on stdout.
+        data = json.loads(stdout)
+    except json.JSONDecodeError as exc:
+        data = {"success": False, "error": str(exc)}
+    if exit_code and isinstance(data, dict) and data.get("success", True):
+        data = {**data, "success": False, "error": f"run.py exited with {exit_code}"}
+    return data
+
+
+class PluginWorker:
+    """A persistent ``--worker`` process exchanging NDJSON requests and responses."""
+
+    def __init__(self, timeout_s: float = COMMAND_TIMEOUT_S) -> None:
+        """Create the worker handle; the process starts on the first request."""
+        self.timeout_s = timeout_s
+        self.process: subprocess.Popen[str] | None = None
+        self.responses: queue.Queue[str | None] = queue.Queue()
+        self.restarts = 0
+        self._next_id = 0
+
+    def _start(self) -> subprocess.Popen[str]:
+        if self.process is not None:
+            self.restarts += 1
+        self.process = subprocess.Popen(  # noqa: S603
+            [sys.executable, str(Path(__file__).resolve()), "--worker"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
             text=True,
-            timeout=10,
+            bufsize=1,
         )
-        return json.loads(result.stdout)
-    except (json.JSONDecodeError, subprocess.TimeoutExpired, OSError) as exc:
-        return {"success": False, "error": str(exc)}
+        self.responses = queue.Queue()
+        reader = threading.Thread(
+            target=self._read,
+            args=(self.process.stdout, self.responses),
+            daemon=True,
+        )
+        reader.start()
+        return self.process
+
+    @staticmethod
+    def _read(stream: TextIO, responses: queue.Queue[str | None]) -> None:
+        for line in stream:
+            responses.put(line)
+        responses.put(None)
+
+    def _await(self, request_id: int) -> dict:
+        deadline = time.monotonic() + self.timeout_s
+        while True:
+            line = self.responses.get(timeout=max(0.0, deadline - time.monotonic()))
+            if line is None:
+                message = "plugin worker exited; it restarts on the next command"
+                raise OSError(message)
+            response = json.loads(line)
+            if response.get("id") == request_id:
+                return response
+
+    def request(self, cmd: str, args: list[str]) -> dict:
+        """Send one command to the worker, restarting it if it has died."""
+        process = self.process
+        if process is None or process.poll() is not None:
+            process = self._start()
+        self._next_id += 1
+        request = {"id": self._next_id, "cmd": cmd, "args": args}
+        try:
+            process.stdin.write(json.dumps(request) + "\n")
+            process.stdin.flush()
+            response = self._await(self._next_id)
+        except queue.Empty:
+            process.kill()
+            process.wait()
+            return {
+                "success": False,
+                "error": f"plugin worker timed out after {self.timeout_s:g}s; restarting",
+            }
+        except (OSError, json.JSONDecodeError) as exc:
+            return {"success": False, "error": str(exc)}
+        return _parse_output(response["stdout"], response.get("exit_code", 1))
+
+    def close(self) -> None:
+        """Stop the worker process."""
+        process = self.process
+        if process is None or process.poll() is not None:
+            return
+        with contextlib.suppress(OSError):
+            process.stdin.close()
+        try:
+            process.wait(timeout=2)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+
+@dataclass
+class CommandRunner:
+    """Route plugin commands to a worker (or a subprocess each) and time them."""
+
+    worker: PluginWorker | None = None
+    latencies_ms: list[float] = field(default_factory=list)
+
+    def execute(self, cmd: str, args: list[str]) -> dict:
+        """Run one command and record its latency."""
+        started = time.perf_counter()
+        try:
+            if self.worker is not None:
+                return self.worker.request(cmd, args)
+            return self._spawn(cmd, args)
+        finally:
+            self.latencies_ms.append((time.perf_counter() - started) * 1000)
+
+    @staticmethod
+    def _spawn(cmd: str, args: list[str]) -> dict:
+        script_path = SCRIPTS_DIR / "run.py"
+        try:
+            result = subprocess.run(  # noqa: S603
+                [sys.executable, str(script_path), cmd, *args],
+                capture_output=True,
+                check=False,  # CLI script returns JSON on stdout.
+                text=True,
+                timeout=COMMAND_TIMEOUT_S,
+            )
+        except (subprocess.TimeoutExpired, OSError) as exc:
+            return {"success": False, "error": str(exc)}
+        return _parse_output(result.stdout, result.returncode)
+
+    def summary(self) -> str:
+        """Describe command latency for the session."""
+        if not self.latencies_ms:
+            return "No plugin commands run."
+        mode = "worker" if self.worker is not None else "subprocess per command"
+        text = (
+            f"{len(self.latencies_ms)} plugin commands ({mode}): "
+            f"median {statistics.median(self.latencies_ms):.0f} ms, "
+            f"max {max(self.latencies_ms):.0f} ms"
+        )
+        if self.worker is not None and self.worker.restarts:
+            text += f", {self.worker.restarts} worker restart(s)"
+        return text
+
+
+_runner = CommandRunner()
+
+
+def execute_command(cmd: str, args: list[str]) -> dict:
+    """Execute a plugin command."""
+    return _runner.execute(cmd, args)
+
+
+def _emit_latency() -> None:
+    if _runner.latencies_ms:
+        _emit(f"{Colors.BLUE}({_runner.latencies_ms[-1]:.0f} ms){Colors.RESET}")
 
 
 def _format_notebook_list(data: dict) -> None:
@@ -221,9 +419,32 @@ def show_help() -> None:
     _emit()
 
 
-def main() -> None:
+def main() -> int:
     """Run the main REPL loop."""
+    parser = argparse.ArgumentParser(description="Simulated Claude Code CLI with the plugin")
+    parser.add_argument(
+        "--no-worker",
+        action="store_true",
+        help="Start a fresh run.py subprocess for every command.",
+    )
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        return serve_worker()
+
     _configure_logging()
+    if not args.no_worker:
+        _runner.worker = PluginWorker()
+    try:
+        _repl()
+    finally:
+        if _runner.worker is not None:
+            _runner.worker.close()
+        _emit(_runner.summary())
+    return 0
+
+
+def _repl() -> None:
     print_header()
     _emit(f"{Colors.YELLOW}NOTE: This is a SIMULATED environment.{Colors.RESET}")
     _emit(f"{Colors.YELLOW}Real Claude Code requires installation and API keys.{Colors.RESET}")
@@ -256,4 +477,4 @@ def main() -> None:
 
 
 if __name__ == "__main__":
-    main()
+    raise SystemExit(main())
@@ -0,0 +1,589 @@
+"""Local stand-in for the ``notebooklm-mcp`` server.
+
+Speaks MCP JSON-RPC over stdio and implements the RPC tool surface from the
+notebooklm-patterns skill against an in-memory notebook store. Per-tool latency,
+timeout and error rates, and response sizes are configurable so task tooling can
+be load-tested and benchmarked offline.
+
+Point the task tools at it with::
+
+    NLM_MCP_COMMAND="python tests/fake_notebooklm_mcp.py" pixi run codex-ask-all
+
+Configuration is JSON, passed inline or as a file path via ``FAKE_NLM_CONFIG``
+or ``--config``::
+
+    {
+      "seed": 7,
+      "notebooks": 20,
+      "sources_per_notebook": 4,
+      "drive_sources_per_notebook": 2,
+      "drive_stale": 0,
+      "research_duration_s": 2.0,
+      "studio_duration_s": 2.0,
+      "default": {"latency": {"dist": "fixed", "ms": 5}},
+      "tools": {
+        "notebook_query": {
+          "latency": {"dist": "lognormal", "median_ms": 800, "sigma": 0.4},
+          "timeout_rate": 0.05,
+          "error_rate": 0.02,
+          "response_bytes": 4000
+        }
+      }
+    }
+
+Supported latency distributions: ``fixed`` (``ms``), ``uniform`` (``min_ms``,
+``max_ms``), ``normal`` (``mean_ms``, ``stddev_ms``) and ``lognormal``
+(``median_ms``, ``sigma``). A simulated timeout never answers the request.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import random
+import sys
+import time
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+logger = logging.getLogger("fake_notebooklm_mcp")
+
+PROTOCOL_VERSION = "2024-11-05"
+TOOLS = (
+    "save_auth_tokens",
+    "notebook_list",
+    "notebook_create",
+    "notebook_get",
+    "notebook_describe",
+    "notebook_rename",
+    "notebook_delete",
+    "notebook_query",
+    "notebook_add_url",
+    "notebook_add_text",
+    "notebook_add_drive",
+    "source_list_drive",
+    "source_sync_drive",
+    "source_delete",
+    "source_describe",
+    "research_start",
+    "research_status",
+    "research_import",
+    "chat_configure",
+    "audio_overview_create",
+    "video_overview_create",
+    "infographic_create",
+    "slide_deck_create",
+    "studio_status",
+    "studio_delete",
+)
+ARTIFACT_TOOLS = {
+    "audio_overview_create": "audio",
+    "video_overview_create": "video",
+    "infographic_create": "infographic",
+    "slide_deck_create": "slide_deck",
+}
+DRIVE_EPOCH = 1_700_000_000.0
+TOPICS = ("api", "oauth", "security", "testing", "pytest", "codex", "pixi", "mcp")
+
+
+class ToolError(Exception):
+    """Raised by a tool handler to produce an ``isError`` result."""
+
+
+@dataclass
+class ToolProfile:
+    """Injected behaviour for one tool."""
+
+    latency: dict[str, Any] = field(default_factory=lambda: {"dist": "fixed", "ms": 0})
+    timeout_rate: float = 0.0
+    error_rate: float = 0.0
+    response_bytes: int = 0
+
+    def sample_latency_s(self, rng: random.Random) -> float:
+        """Draw one latency in seconds from the configured distribution."""
+        spec = self.latency
+        dist = spec.get("dist", "fixed")
+        if dist == "uniform":
+            ms = rng.uniform(float(spec.get("min_ms", 0)), float(spec.get("max_ms", 0)))
+        elif dist == "normal":
+            ms = rng.gauss(float(spec.get("mean_ms", 0)), float(spec.get("stddev_ms", 0)))
+        elif dist == "lognormal":
+            median = max(float(spec.get("median_ms", 1)), 1e-3)
+            ms = rng.lognormvariate(math.log(median), float(spec.get("sigma", 0.5)))
+        else:
+            ms = float(spec.get("ms", 0))
+        return max(ms, 0.0) / 1000
+
+
+def _profile(data: dict[str, Any]) -> ToolProfile:
+    return ToolProfile(
+        latency=data.get("latency", {"dist": "fixed", "ms": 0}),
+        timeout_rate=float(data.get("timeout_rate", 0.0)),
+        error_rate=float(data.get("error_rate", 0.0)),
+        response_bytes=int(data.get("response_bytes", 0)),
+    )
+
+
+def load_config(value: str) -> dict[str, Any]:
+    """Parse config from inline JSON or a file path; empty means defaults."""
+    if not value:
+        return {}
+    if value.lstrip().startswith("{"):
+        return json.loads(value)
+    return json.loads(Path(value).read_text())
+
+
+class NotebookStore:
+    """In-memory notebooks, sources, research tasks and studio artifacts."""
+
+    def __init__(self, config: dict[str, Any], rng: random.Random) -> None:
+        """Seed the store with synthetic notebooks."""
+        self.rng = rng
+        self.research_duration_s = float(config.get("research_duration_s", 2.0))
+        self.studio_duration_s = float(config.get("studio_duration_s", 2.0))
+        self.notebooks: dict[str, dict[str, Any]] = {}
+        self.sources: dict[str, dict[str, Any]] = {}
+        self.research: dict[str, dict[str, Any]] = {}
+        self.artifacts: dict[str, dict[str, Any]] = {}
+        self.sessions: dict[str, int] = {}
+        for index in range(int(config.get("notebooks", 5))):
+            topic = TOPICS[index % len(TOPICS)]
+            notebook = self.create_notebook(f"{topic.upper()} Notebook {index}")
+            for source_index in range(int(config.get("sources_per_notebook", 3))):
+                self.add_source(
+                    notebook["id"],
+                    kind="text",
+                    title=f"{topic} guide part {source_index}",
+                    text=f"Notes about {topic} (part {source_index}).",
+                )
+            for drive_index in range(int(config.get("drive_sources_per_notebook", 0))):
+                # Stable across restarts; the first ``drive_stale`` docs have a newer revision.
+                stale = drive_index < int(config.get("drive_stale", 0))
+                self.add_source(
+                    notebook["id"],
+                    kind="drive",
+                    title=f"{topic} drive doc {drive_index}",
+                    document_id=f"doc-{index}-{drive_index}",
+                    revision=2 if stale else 1,
+                    modified_at=DRIVE_EPOCH + (86400 if stale else 0),
+                )
+            # Seeded notebooks look unchanged across restarts, like a real account.
+            notebook["updated_at"] = DRIVE_EPOCH
+
+    def new_id(self) -> str:
+        """Return a UUID drawn from the seeded generator."""
+        return str(uuid.UUID(int=self.rng.getrandbits(128)))
+
+    def create_notebook(self, title: str) -> dict[str, Any]:
+        """Create an empty notebook."""
+        notebook = {"id": self.new_id(), "title": title, "sources": [], "updated_at": time.time()}
+        self.notebooks[notebook["id"]] = notebook
+        return notebook
+
+    def notebook(self, notebook_id: str) -> dict[str, Any]:
+        """Return a notebook or raise ``ToolError``."""
+        if notebook_id not in self.notebooks:
+            message = f"Notebook not found: {notebook_id}"
+            raise ToolError(message)
+        return self.notebooks[notebook_id]
+
+    def add_source(
+        self,
+        notebook_id: str,
+        *,
+        kind: str,
+        title: str,
+        **extra: object,
+    ) -> dict[str, Any]:
+        """Attach a source to a notebook."""
+        notebook = self.notebook(notebook_id)
+        source = {
+            "id": self.new_id(),
+            "notebook_id": notebook_id,
+            "type": kind,
+            "title": title,
+            "modified_at": time.time(),
+            **extra,
+        }
+        self.sources[source["id"]] = source
+        notebook["sources"].append(source["id"])
+        notebook["updated_at"] = time.time()
+        return source
+
+    def source(self, source_id: str) -> dict[str, Any]:
+        """Return a source or raise ``ToolError``."""
+        if source_id not in self.sources:
+            message = f"Source not found: {source_id}"
+            raise ToolError(message)
+        return self.sources[source_id]
+
+    def source_summaries(self, notebook_id: str) -> list[dict[str, Any]]:
+        """Return ``{"id", "title", "type"}`` for a notebook's sources."""
+        return [
+            {key: self.sources[sid][key] for key in ("id", "title", "type")}
+            for sid in self.notebook(notebook_id)["sources"]
+        ]
+
+
+def _str_arg(args: dict[str, Any], name: str) -> str:
+    value = args.get(name)
+    if not isinstance(value, str) or not value:
+        message = f"Missing required argument: {name}"
+        raise ToolError(message)
+    return value
+
+
+def _notebook_tool(store: NotebookStore, tool: str, args: dict[str, Any]) -> dict[str, Any]:  # noqa: PLR0911
+    if tool == "notebook_list":
+        notebooks = [
+            {
+                "id": nb["id"],
+                "title": nb["title"],
+                "source_count": len(nb["sources"]),
+                "updated_at": nb["updated_at"],
+            }
+            for nb in store.notebooks.values()
+        ]
+        return {"notebooks": notebooks, "count": len(notebooks)}
+    if tool == "notebook_create":
+        notebook = store.create_notebook(str(args.get("title") or "Untitled notebook"))
+        return {"notebook_id": notebook["id"], "title": notebook["title"]}
+    notebook = store.notebook(_str_arg(args, "notebook_id"))
+    if tool == "notebook_get":
+        sources = store.source_summaries(notebook["id"])
+        return {"notebook": {"id": notebook["id"], "title": notebook["title"], "sources": sources}}
+    if tool == "notebook_describe":
+        titles = [store.sources[sid]["title"] for sid in notebook["sources"]]
+        return {
+            "notebook_id": notebook["id"],
+            "summary": f"{notebook['title']} covers: {', '.join(titles) or 'nothing yet'}.",
+            "keywords": sorted({word for title in titles for word in title.split()[:1]}),
+        }
+    if tool == "notebook_rename":
+        notebook["title"] = _str_arg(args, "new_title")
+        notebook["updated_at"] = time.time()
+        return {"notebook_id": notebook["id"], "title": notebook["title"]}
+    if tool == "notebook_delete":
+        for sid in notebook["sources"]:
+            store.sources.pop(sid, None)
+        del store.notebooks[notebook["id"]]
+        return {"deleted": notebook["id"]}
+    if tool == "chat_configure":
+        return {
+            "notebook_id": notebook["id"],
+            "configured": {k: v for k, v in args.items() if k != "notebook_id"},
+        }
+    message = f"Unknown tool: {tool}"
+    raise ToolError(message)
+
+
+def _query(store: NotebookStore, args: dict[str, Any], response_bytes: int) -> dict[str, Any]:
+    notebook = store.notebook(_str_arg(args, "notebook_id"))
+    question = _str_arg(args, "question")
+    session_id = str(args.get("session_id") or store.new_id())
+    store.sessions[session_id] = store.sessions.get(session_id, 0) + 1
+    sources = store.source_summaries(notebook["id"])
+    cited = sources[: min(3, len(sources))]
+    answer = f"[{notebook['title']}] Answer to '{question}' drawing on {len(cited)} sources."
+    if response_bytes > len(answer):
+        filler = " Supporting detail from the notebook sources."
+        answer += (filler * (response_bytes // len(filler) + 1))[: response_bytes - len(answer)]
+    return {
+        "answer": answer,
+        "citations": [{"source_id": s["id"], "source": s["title"]} for s in cited],
+        "session_id": session_id,
+        "turn": store.sessions[session_id],
+    }
+
+
+def _source_tool(store: NotebookStore, tool: str, args: dict[str, Any]) -> dict[str, Any]:  # noqa: PLR0911
+    if tool == "notebook_add_url":
+        url = _str_arg(args, "url")
+        source = store.add_source(_str_arg(args, "notebook_id"), kind="url", title=url, url=url)
+        return {"source_id": source["id"], "title": source["title"]}
+    if tool == "notebook_add_text":
+        text = _str_arg(args, "text")
+        title = str(args.get("title") or text[:40])
+        source = store.add_source(
+            _str_arg(args, "notebook_id"),
+            kind="text",
+            title=title,
+            text=text,
+        )
+        return {"source_id": source["id"], "title": source["title"]}
+    if tool == "notebook_add_drive":
+        source = store.add_source(
+            _str_arg(args, "notebook_id"),
+            kind="drive",
+            title=str(args.get("title") or args.get("document_id")),
+            document_id=_str_arg(args, "document_id"),
+            revision=1,
+        )
+        return {"source_id": source["id"], "title": source["title"]}
+    if tool == "source_list_drive":
+        notebook = store.notebook(_str_arg(args, "notebook_id"))
+        drive = [
+            store.sources[sid]
+            for sid in notebook["sources"]
+            if store.sources[sid]["type"] == "drive"
+        ]
+        return {
+            "sources": [
+                {
+                    "id": s["id"],
+                    "title": s["title"],
+                    "document_id": s["document_id"],
+                    "revision": s["revision"],
+                    "modified_at": s["modified_at"],
+                }
+                for s in drive
+            ],
+        }
+    if tool == "source_sync_drive":
+        source_ids = args.get("source_ids") or []
+        for sid in source_ids:
+            store.source(sid)["synced_at"] = time.time()
+        return {"synced": list(source_ids)}
+    if tool == "source_delete":
+        source = store.source(_str_arg(args, "source_id"))
+        store.notebooks[source["notebook_id"]]["sources"].remove(source["id"])
+        del store.sources[source["id"]]
+        return {"deleted": source["id"]}
+    if tool == "source_describe":
+        source = store.source(_str_arg(args, "source_id"))
+        return {
+            "source_id": source["id"],
+            "title": source["title"],
+            "summary": source.get("text") or f"Content of {source['title']}.",
+            "keywords": source["title"].lower().split()[:3],
+        }
+    message = f"Unknown tool: {tool}"
+    raise ToolError(message)
+
+
+def _research_tool(store: NotebookStore, tool: str, args: dict[str, Any]) -> dict[str, Any]:
+    notebook = store.notebook(_str_arg(args, "notebook_id"))
+    if tool == "research_start":
+        task = {
+            "task_id": store.new_id(),
+            "notebook_id": notebook["id"],
+            "query": _str_arg(args, "query"),
+            "started_at": time.time(),
+            "imported": False,
+        }
+        store.research[task["task_id"]] = task
+        return {"task_id": task["task_id"], "status": "in_progress"}
+    task_id = str(args.get("task_id") or "")
+    tasks = [t for t in store.research.values() if t["notebook_id"] == notebook["id"]]
+    task = store.research.get(task_id) if task_id else (tasks[-1] if tasks else None)
+    if task is None:
+        message = f"Research task not found: {task_id or notebook['id']}"
+        raise ToolError(message)
+    done = time.time() - task["started_at"] >= store.research_duration_s
+    if tool == "research_status":
+        status = {
+            "task_id": task["task_id"],
+            "query": task["query"],
+            "status": "completed" if done else "in_progress",
+        }
+        if done:
+            status["sources"] = [
+                {
+                    "index": i,
+                    "title": f"{task['query']} result {i}",
+                    "url": f"https://example.com/{i}",
+                }
+                for i in range(3)
+            ]
+        return status
+    if not done:
+        message = f"Research task {task['task_id']} is still in progress"
+        raise ToolError(message)
+    if task["imported"]:
+        return {"task_id": task["task_id"], "imported": 0}
+    task["imported"] = True
+    for index in range(3):
+        url = f"https://example.com/{index}"
+        store.add_source(
+            notebook["id"],
+            kind="url",
+            title=f"{task['query']} result {index}",
+            url=url,
+        )
+    return {"task_id": task["task_id"], "imported": 3}
+
+
+def _studio_tool(store: NotebookStore, tool: str, args: dict[str, Any]) -> dict[str, Any]:
+    notebook = store.notebook(_str_arg(args, "notebook_id"))
+    if tool in ARTIFACT_TOOLS:
+        artifact = {
+            "artifact_id": store.new_id(),
+            "notebook_id": notebook["id"],
+            "type": ARTIFACT_TOOLS[tool],
+            "created_at": time.time(),
+        }
+        store.artifacts[artifact["artifact_id"]] = artifact
+        return {"artifact_id": artifact["artifact_id"], "status": "in_progress"}
+    if tool == "studio_status":
+        now = time.time()
+        artifacts = [
+            {
+                "artifact_id": a["artifact_id"],
+                "type": a["type"],
+                "created_at": a["created_at"],
+                "status": "completed"
+                if now - a["created_at"] >= store.studio_duration_s
+                else "in_progress",
+            }
+            for a in store.artifacts.values()
+            if a["notebook_id"] == notebook["id"]
+        ]
+        return {"notebook_id": notebook["id"], "artifacts": artifacts}
+    artifact_id = _str_arg(args, "artifact_id")
+    if store.artifacts.pop(artifact_id, None) is None:
+        message = f"Artifact not found: {artifact_id}"
+        raise ToolError(message)
+    return {"deleted": artifact_id}
+
+
+def call_tool(
+    store: NotebookStore,
+    tool: str,
+    args: dict[str, Any],
+    profile: ToolProfile,
+) -> dict[str, Any]:
+    """Dispatch a tool call against the store."""
+    if tool == "save_auth_tokens":
+        result: dict[str, Any] = {"saved": True}
+    elif tool == "notebook_query":
+        result = _query(store, args, profile.response_bytes)
+    elif tool.startswith("research_"):
+        result = _research_tool(store, tool, args)
+    elif tool in ARTIFACT_TOOLS or tool.startswith("studio_"):
+        result = _studio_tool(store, tool, args)
+    elif tool.startswith(("source_", "notebook_add_")):
+        result = _source_tool(store, tool, args)
+    else:
+        result = _notebook_tool(store, tool, args)
+    if profile.response_bytes and tool != "notebook_query":
+        result["padding"] = "x" * profile.response_bytes
+    return {"status": "success", **result}
+
+
+class FakeServer:
+    """JSON-RPC loop that handles each request concurrently."""
+
+    def __init__(self, config: dict[str, Any]) -> None:
+        """Build the store and per-tool profiles from ``config``."""
+        self.rng = random.Random(config.get("seed"))  # noqa: S311
+        self.store = NotebookStore(config, self.rng)
+        self.default = _profile(config.get("default", {}))
+        self.profiles = {name: _profile(data) for name, data in config.get("tools", {}).items()}
+        self.hang_s = float(config.get("hang_s", 3600))
+        self._tasks: set[asyncio.Task[None]] = set()
+
+    def _write(self, message: dict[str, Any]) -> None:
+        sys.stdout.write(json.dumps(message, separators=(",", ":")) + "\n")
+        sys.stdout.flush()
+
+    async def _handle_call(self, request_id: Any, params: dict[str, Any]) -> None:  # noqa: ANN401
+        tool = str(params.get("name", ""))
+        args = params.get("arguments") or {}
+        if tool not in TOOLS:
+            self._write(
+                {
+                    "jsonrpc": "2.0",
+                    "id": request_id,
+                    "error": {"code": -32602, "message": f"Unknown tool: {tool}"},
+                },
+            )
+            return
+        profile = self.profiles.get(tool, self.default)
+        await asyncio.sleep(profile.sample_latency_s(self.rng))
+        roll = self.rng.random()
+        if roll < profile.timeout_rate:
+            await asyncio.sleep(self.hang_s)
+            return
+        if roll < profile.timeout_rate + profile.error_rate:
+            text, is_error = json.dumps({"status": "error", "error": "injected failure"}), True
+        else:
+            try:
+                text, is_error = json.dumps(call_tool(self.store, tool, args, profile)), False
+            except ToolError as exc:
+                text, is_error = json.dumps({"status": "error", "error": str(exc)}), True
+        result = {"content": [{"type": "text", "text": text}], "isError": is_error}
+        self._write({"jsonrpc": "2.0", "id": request_id, "result": result})
+
+    def _dispatch(self, message: dict[str, Any]) -> None:
+        method = message.get("method")
+        request_id = message.get("id")
+        if request_id is None:
+            return
+        if method == "initialize":
+            result = {
+                "protocolVersion": PROTOCOL_VERSION,
+                "capabilities": {"tools": {}},
+                "serverInfo": {"name": "fake-notebooklm-mcp", "version": "0.1.0"},
+            }
+        elif method == "tools/list":
+            result = {
+                "tools": [
+                    {"name": name, "description": f"Fake {name}", "inputSchema": {"type": "object"}}
+                    for name in TOOLS
+                ],
+            }
+        elif method == "tools/call":
+            task = asyncio.create_task(self._handle_call(request_id, message.get("params") or {}))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+            return
+        elif method == "ping":
+            result = {}
+        else:
+            self._write(
+                {
+                    "jsonrpc": "2.0",
+                    "id": request_id,
+                    "error": {"code": -32601, "message": f"Method not found: {method}"},
+                },
+            )
+            return
+        self._write({"jsonrpc": "2.0", "id": request_id, "result": result})
+
+    async def serve(self) -> None:
+        """Read requests from stdin until EOF."""
+        loop = asyncio.get_running_loop()
+        reader = asyncio.StreamReader(limit=2**24)
+        await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+        while line := await reader.readline():
+            try:
+                message = json.loads(line)
+            except json.JSONDecodeError:
+                logger.warning("Ignoring non-JSON line")
+                continue
+            self._dispatch(message)
+        for task in list(self._tasks):
+            task.cancel()
+
+
+def main() -> None:
+    """Run the fake server on stdio."""
+    logging.basicConfig(level=logging.WARNING, format="%(message)s", stream=sys.stderr)
+    parser = argparse.ArgumentParser(description="Fake notebooklm-mcp server for offline testing.")
+    parser.add_argument(
+        "--config",
+        default=os.environ.get("FAKE_NLM_CONFIG", ""),
+        help="Inline JSON or path to a JSON config file.",
+    )
+    args = parser.parse_args()
+    asyncio.run(FakeServer(load_config(args.config)).serve())
+
+
+if __name__ == "__main__":
+    main()
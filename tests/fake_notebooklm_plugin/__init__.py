@@ -0,0 +1 @@
+"""Stand-in NotebookLM plugin scripts for the simulations."""
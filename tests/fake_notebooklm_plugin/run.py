@@ -0,0 +1,80 @@
+"""Local stand-in for the NotebookLM plugin's ``run.py``.
+
+Answers the commands the simulations use (``auth``, ``add``, ``ask``, ``list``,
+``search``) with canned JSON on stdout, in the shape the real plugin prints, so
+``tests/run_simulation.py`` runs without the plugin installed::
+
+    NLM_PLUGIN_SCRIPTS=tests/fake_notebooklm_plugin python tests/run_simulation.py --fast
+
+Nothing is stored between calls; every command answers as if the demo notebook
+had already been added.
+"""
+
+from __future__ import annotations
+
+import json
+import sys
+
+NOTEBOOK = {
+    "id": "8e98a4d8-f778-4dfc-88e8-2d59e48b1069",
+    "name": "Raymond's Dev Docs",
+    "description": "Development documentation and research",
+    "topics": ["api", "oauth", "security", "best-practices"],
+    "sources_count": 12,
+    "active": True,
+}
+
+
+def _auth(args: list[str]) -> dict:
+    if args[:1] == ["setup"]:
+        return {"success": True, "authenticated": True, "email": "demo@example.com"}
+    return {
+        "success": True,
+        "authenticated": False,
+        "message": "Run /notebook-auth setup to log in (simulated).",
+    }
+
+
+def _add(args: list[str]) -> dict:
+    notebook = dict(NOTEBOOK)
+    if len(args) > 1:
+        notebook["name"] = args[1]
+    return {"success": True, "notebook": notebook}
+
+
+def _ask(args: list[str]) -> dict:
+    question = " ".join(args)
+    return {
+        "success": True,
+        "question": question,
+        "notebook": NOTEBOOK,
+        "answer": f"(Simulated answer from {NOTEBOOK['name']} to: {question})",
+        "citations": [{"source": "Development documentation"}],
+        "follow_up_questions": [],
+    }
+
+
+def _list(_args: list[str]) -> dict:
+    return {"success": True, "notebooks": [NOTEBOOK]}
+
+
+def _search(args: list[str]) -> dict:
+    term = " ".join(args).lower()
+    matches = [NOTEBOOK] if any(term in topic for topic in NOTEBOOK["topics"]) else []
+    return {"success": True, "notebooks": matches}
+
+
+COMMANDS = {"auth": _auth, "add": _add, "ask": _ask, "list": _list, "search": _search}
+
+
+def main() -> int:
+    """Print the canned JSON response for ``sys.argv[1:]``."""
+    if len(sys.argv) < 2 or sys.argv[1] not in COMMANDS:  # noqa: PLR2004
+        sys.stdout.write(json.dumps({"success": False, "error": "unknown command"}) + "\n")
+        return 1
+    sys.stdout.write(json.dumps(COMMANDS[sys.argv[1]](sys.argv[2:]), indent=2) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
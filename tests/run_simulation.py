@@ -1,29 +1,55 @@
 """Run a simulated Claude Code + NotebookLM walkthrough.
 
 This script mirrors the end-user flow without requiring real browser automation.
+``--fast`` swaps in a virtual clock so the scripted pauses cost nothing, runs the
+plugin commands in-process instead of in a new interpreter, runs independent
+scenario chains in parallel (output is buffered per scenario and printed in
+order), and ends with a timing report. In-process commands take a lock, so chains
+overlap only between commands. The plugin script must be installed (or
+``NLM_PLUGIN_SCRIPTS`` set, e.g. to ``tests/fake_notebooklm_plugin`` as CI does);
+a missing script or a crashing command fails the run.
 """
 
 from __future__ import annotations
 
+import argparse
+import contextlib
+import contextvars
+import io
+import json
 import logging
+import os
+import runpy
 import subprocess
 import sys
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
+from typing import TYPE_CHECKING
 
-SCRIPTS_DIR = (
-    Path.home()
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+SCRIPTS_DIR = Path(
+    os.environ.get("NLM_PLUGIN_SCRIPTS")
+    or Path.home()
     / ".claude"
     / "plugins"
     / "installed"
     / "notebooklm"
     / "skills"
     / "notebooklm"
-    / "scripts"
+    / "scripts",
 )
+PLUGIN_SCRIPT = SCRIPTS_DIR / "run.py"
 
 logger = logging.getLogger("simulation")
 
+# Plugin commands run in-process share sys.argv and stdout, so only one runs at a time.
+_IN_PROCESS_LOCK = threading.Lock()
+
 
 class Colors:
     """ANSI color codes for terminal output."""
@@ -45,31 +71,115 @@ def _configure_logging() -> None:
     logger.propagate = False
 
 
+class RealClock:
+    """Wall-clock pauses, for watching the walkthrough."""
+
+    def __init__(self) -> None:
+        """Start with nothing slept."""
+        self.slept_s = 0.0
+
+    def sleep(self, seconds: float) -> None:
+        """Pause for ``seconds``."""
+        self.slept_s += seconds
+        time.sleep(seconds)
+
+
+class VirtualClock(RealClock):
+    """Pauses that only advance a counter."""
+
+    def sleep(self, seconds: float) -> None:
+        """Record ``seconds`` without waiting."""
+        self.slept_s += seconds
+
+
+@dataclass
+class ScenarioRun:
+    """Clock, output buffer and timings for one scenario."""
+
+    name: str
+    clock: RealClock
+    in_process: bool = False
+    buffered: bool = False
+    lines: list[str] = field(default_factory=list)
+    commands: int = 0
+    command_s: float = 0.0
+    wall_s: float = 0.0
+
+    def timing(self) -> dict[str, float | int | str]:
+        """Return this scenario's row of the timing report."""
+        return {
+            "scenario": self.name,
+            "wall_ms": round(self.wall_s * 1000, 1),
+            "simulated_pause_s": round(self.clock.slept_s, 1),
+            "commands": self.commands,
+            "command_ms": round(self.command_s * 1000, 1),
+        }
+
+
+_current: contextvars.ContextVar[ScenarioRun] = contextvars.ContextVar("scenario_run")
+_DEFAULT_RUN = ScenarioRun("main", RealClock())
+
+
+def _active_run() -> ScenarioRun:
+    return _current.get(_DEFAULT_RUN)
+
+
 def _emit(message: str = "") -> None:
-    logger.info(message)
+    run = _active_run()
+    if run.buffered:
+        run.lines.append(message)
+    else:
+        logger.info(message)
+
+
+def _sleep(seconds: float) -> None:
+    _active_run().clock.sleep(seconds)
+
+
+def _run_in_process(cmd: str, args: list[str]) -> str:
+    script = PLUGIN_SCRIPT
+    stdout = io.StringIO()
+    with _IN_PROCESS_LOCK, contextlib.redirect_stdout(stdout):
+        saved_argv = sys.argv
+        sys.argv = [str(script), cmd, *args]
+        try:
+            runpy.run_path(str(script), run_name="__main__")
+        except SystemExit:
+            pass
+        finally:
+            sys.argv = saved_argv
+    return stdout.getvalue()
 
 
 def run_command(cmd: str, args: list[str]) -> str:
     """Run a NotebookLM command and return stdout."""
-    result = subprocess.run(  # noqa: S603
-        [sys.executable, str(SCRIPTS_DIR / "run.py"), cmd, *args],
-        capture_output=True,
-        check=False,
-        text=True,
-    )
-    return result.stdout
+    run = _active_run()
+    started = time.perf_counter()
+    try:
+        if run.in_process:
+            return _run_in_process(cmd, args)
+        result = subprocess.run(  # noqa: S603
+            [sys.executable, str(PLUGIN_SCRIPT), cmd, *args],
+            capture_output=True,
+            check=False,
+            text=True,
+        )
+        return result.stdout
+    finally:
+        run.commands += 1
+        run.command_s += time.perf_counter() - started
 
 
 def print_user_input(text: str) -> None:
     """Print simulated user input."""
     _emit(f"{Colors.BOLD}You:{Colors.RESET} {Colors.BLUE}{text}{Colors.RESET}")
-    time.sleep(0.5)
+    _sleep(0.5)
 
 
 def print_claude_response(text: str) -> None:
     """Print simulated Claude response."""
     _emit(f"{Colors.BOLD}Claude Code:{Colors.RESET} {text}")
-    time.sleep(0.5)
+    _sleep(0.5)
 
 
 def print_section(title: str) -> None:
@@ -78,14 +188,14 @@ def print_section(title: str) -> None:
     _emit(f"\n{Colors.YELLOW}{divider}{Colors.RESET}")
     _emit(f"{Colors.YELLOW}{Colors.BOLD}{title}{Colors.RESET}")
     _emit(f"{Colors.YELLOW}{divider}{Colors.RESET}\n")
-    time.sleep(0.5)
+    _sleep(0.5)
 
 
 def _scenario_first_time_setup() -> None:
     print_section("SCENARIO 1: First-Time Setup")
 
     print_user_input("claude")
-    time.sleep(1)
+    _sleep(1)
     print_claude_response(f"{Colors.GREEN}Claude Code CLI v2.0.12 starting...{Colors.RESET}")
     print_claude_response("Type /help for commands\n")
 
@@ -106,16 +216,16 @@ def _scenario_first_time_setup() -> None:
     print_user_input("/notebook-auth status")
     output = run_command("auth", ["status"])
     print_claude_response(f"{Colors.YELLOW}Checking authentication...{Colors.RESET}")
-    time.sleep(1)
+    _sleep(1)
     print_claude_response(output)
 
     print_user_input("/notebook-auth setup")
     print_claude_response(f"{Colors.YELLOW}Opening Chrome for Google login...{Colors.RESET}")
-    time.sleep(1.5)
+    _sleep(1.5)
     print_claude_response(f"{Colors.GREEN}✓ Browser automation started{Colors.RESET}")
     print_claude_response(f"{Colors.DIM}  → Navigating to NotebookLM")
     print_claude_response(f"{Colors.DIM}  → Waiting for Google login...")
-    time.sleep(2)
+    _sleep(2)
     output = run_command("auth", ["setup"])
     print_claude_response(output)
 
@@ -125,11 +235,11 @@ def _scenario_add_notebook(notebook_url: str) -> None:
 
     print_user_input(f'/notebook add {notebook_url} "Raymond\'s Dev Docs"')
     print_claude_response(f"{Colors.YELLOW}Adding notebook...{Colors.RESET}")
-    time.sleep(1)
+    _sleep(1)
     print_claude_response(f"{Colors.DIM}  → Opening notebook in browser")
     print_claude_response(f"{Colors.DIM}  → Discovering sources...")
     print_claude_response(f"{Colors.DIM}  → Extracting metadata...")
-    time.sleep(2)
+    _sleep(2)
     output = run_command(
         "add",
         [
@@ -149,18 +259,18 @@ def _scenario_querying() -> None:
 
     print_user_input('/notebook ask "How do I implement OAuth2 with JWT tokens in FastAPI?"')
     print_claude_response(f"{Colors.YELLOW}Querying NotebookLM...{Colors.RESET}")
-    time.sleep(1)
+    _sleep(1)
     print_claude_response(f"{Colors.DIM}  → Activating Raymond's Dev Docs")
     print_claude_response(f"{Colors.DIM}  → Opening in browser...")
     print_claude_response(f"{Colors.DIM}  → Typing question into NotebookLM...")
     print_claude_response(f"{Colors.DIM}  → Waiting for Gemini response...")
-    time.sleep(2.5)
+    _sleep(2.5)
     output = run_command("ask", ["How do I implement OAuth2 with JWT tokens in FastAPI?"])
     print_claude_response(output)
 
     print_user_input('/notebook ask "What are best practices for API rate limiting?"')
     print_claude_response(f"{Colors.YELLOW}Querying NotebookLM...{Colors.RESET}")
-    time.sleep(1)
+    _sleep(1)
     output = run_command("ask", ["What are best practices for API rate limiting?"])
     print_claude_response(output)
 
@@ -170,13 +280,13 @@ def _scenario_multiple() -> None:
 
     print_user_input("/notebook list")
     print_claude_response(f"{Colors.YELLOW}Loading your library...{Colors.RESET}")
-    time.sleep(1)
+    _sleep(1)
     output = run_command("list", [])
     print_claude_response(output)
 
     print_user_input('/notebook search "api"')
     print_claude_response(f"{Colors.YELLOW}Searching notebooks...{Colors.RESET}")
-    time.sleep(1)
+    _sleep(1)
     output = run_command("search", ["api"])
     print_claude_response(output)
 
@@ -213,9 +323,89 @@ def _scenario_summary(notebook_id: str) -> None:
     _emit(f"  📁 {Colors.BLUE}/home/claude/notebooklm-plugin-marketplace/{Colors.RESET}\n")
 
 
-def main() -> None:
+Chain = list[tuple[str, "Callable[[], None]"]]
+
+
+def _run_chain(chain: Chain, *, fast: bool) -> list[ScenarioRun]:
+    """Run dependent scenarios in order, each with its own clock and timings."""
+    runs = []
+    for name, scenario in chain:
+        run = ScenarioRun(
+            name,
+            VirtualClock() if fast else RealClock(),
+            in_process=fast,
+            buffered=fast,
+        )
+        token = _current.set(run)
+        started = time.perf_counter()
+        try:
+            scenario()
+        finally:
+            run.wall_s = time.perf_counter() - started
+            _current.reset(token)
+        runs.append(run)
+    return runs
+
+
+def run_scenarios(chains: list[Chain], *, fast: bool, jobs: int) -> list[ScenarioRun]:
+    """Run scenario chains, in parallel in fast mode, and print output in chain order."""
+    if not fast:
+        return [run for chain in chains for run in _run_chain(chain, fast=False)]
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        futures = [pool.submit(_run_chain, chain, fast=True) for chain in chains]
+        runs = [run for future in futures for run in future.result()]
+    for run in runs:
+        for line in run.lines:
+            logger.info(line)
+    return runs
+
+
+def _report_timings(runs: list[ScenarioRun], wall_s: float, report_path: Path | None) -> None:
+    rows = [run.timing() for run in runs]
+    paused_s = sum(run.clock.slept_s for run in runs)
+    logger.info("%sTiming report (fast mode):%s", Colors.BOLD, Colors.RESET)
+    for row in rows:
+        logger.info(
+            "  %-20s wall %7.1f ms  pauses skipped %5.1f s  commands %d (%.1f ms)",
+            row["scenario"],
+            row["wall_ms"],
+            row["simulated_pause_s"],
+            row["commands"],
+            row["command_ms"],
+        )
+    logger.info("  total wall %.1f ms for %.1f s of scripted pauses", wall_s * 1000, paused_s)
+    if report_path is not None:
+        report_path.parent.mkdir(parents=True, exist_ok=True)
+        report = {
+            "wall_ms": round(wall_s * 1000, 1),
+            "simulated_pause_s": round(paused_s, 1),
+            "scenarios": rows,
+        }
+        report_path.write_text(json.dumps(report, indent=2) + "\n")
+
+
+def main() -> int:
     """Run the scripted simulation."""
     _configure_logging()
+    parser = argparse.ArgumentParser(description="Simulated Claude Code + NotebookLM walkthrough")
+    parser.add_argument(
+        "--fast",
+        action="store_true",
+        help="Virtual clock, in-process commands and parallel scenarios, with a timing report.",
+    )
+    parser.add_argument("--jobs", type=int, default=4, help="Parallel scenario chains (--fast).")
+    parser.add_argument("--report", type=Path, default=None, help="Write timings as JSON here.")
+    args = parser.parse_args()
+
+    if not PLUGIN_SCRIPT.exists():
+        logger.error(
+            "Plugin script not found at %s; install the NotebookLM plugin "
+            "or point NLM_PLUGIN_SCRIPTS at its scripts directory.",
+            PLUGIN_SCRIPT,
+        )
+        return 1
+
+    started = time.perf_counter()
     notebook_id = "8e98a4d8-f778-4dfc-88e8-2d59e48b1069"
     notebook_url = f"https://notebooklm.google.com/notebook/{notebook_id}"
 
@@ -231,18 +421,28 @@ def main() -> None:
     _emit("  • NotebookLM plugin installed and configured")
     _emit(f"  • Your notebook: {notebook_id}{Colors.RESET}\n")
 
-    if sys.stdin.isatty():
+    if sys.stdin.isatty() and not args.fast:
         input(f"{Colors.GREEN}Press Enter to start the simulation...{Colors.RESET}")
     else:
         _emit(f"{Colors.GREEN}Press Enter to start the simulation...{Colors.RESET}")
         _emit("(Non-interactive mode detected; continuing.)")
 
-    _scenario_first_time_setup()
-    _scenario_add_notebook(notebook_url)
-    _scenario_querying()
-    _scenario_multiple()
-    _scenario_summary(notebook_id)
+    # Every plugin command depends on the ones before it (auth, then add, then ask),
+    # so they stay in one serial chain; only the command-free summary runs beside it.
+    chains: list[Chain] = [
+        [
+            ("first-time-setup", _scenario_first_time_setup),
+            ("add-notebook", lambda: _scenario_add_notebook(notebook_url)),
+            ("querying", _scenario_querying),
+            ("multiple-notebooks", _scenario_multiple),
+        ],
+        [("summary", lambda: _scenario_summary(notebook_id))],
+    ]
+    runs = run_scenarios(chains, fast=args.fast, jobs=args.jobs)
+    if args.fast:
+        _report_timings(runs, time.perf_counter() - started, args.report)
+    return 0
 
 
 if __name__ == "__main__":
-    main()
+    raise SystemExit(main())
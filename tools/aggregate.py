@@ -0,0 +1,211 @@
+"""Merge per-notebook answers into one reproducible report.
+
+Answers are ordered by notebook title, citations are de-duplicated across
+notebooks and numbered in order of first use, and timeouts, errors and skipped
+notebooks are listed separately. The same input always yields the same Markdown
+and JSON, with no model call involved.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from nlm_fanout import NotebookAnswer
+
+logger = logging.getLogger("aggregate")
+
+CITATION_KEY_FIELDS = ("source_id", "id", "url", "source", "title")
+CITATION_LABEL_FIELDS = ("source", "title", "url", "source_id", "id")
+
+
+@dataclass
+class Citation:
+    """One distinct source cited by one or more notebooks."""
+
+    number: int
+    key: str
+    label: str
+    notebooks: list[str] = field(default_factory=list)
+
+
+@dataclass
+class AnsweredNotebook:
+    """A notebook that answered, with references into the citation list."""
+
+    notebook_id: str
+    title: str
+    answer: str
+    citations: list[int]
+    cached: bool
+    elapsed_ms: float
+    matched_question: str = ""
+    similarity: float | None = None
+
+
+@dataclass
+class Report:
+    """Aggregated outcome of one multi-notebook question."""
+
+    question: str
+    answered: list[AnsweredNotebook] = field(default_factory=list)
+    citations: list[Citation] = field(default_factory=list)
+    failures: list[NotebookAnswer] = field(default_factory=list)
+
+    def to_dict(self) -> dict[str, Any]:
+        """Return a JSON-serializable view."""
+        return {
+            "question": self.question,
+            "answered": [vars(item) for item in self.answered],
+            "citations": [vars(item) for item in self.citations],
+            "failures": [
+                {
+                    "notebook_id": item.notebook_id,
+                    "title": item.title,
+                    "status": item.status,
+                    "error": item.error,
+                    "attempts": item.attempts,
+                }
+                for item in self.failures
+            ],
+        }
+
+    def to_markdown(self) -> str:
+        """Render the report as Markdown."""
+        lines = [f"# {self.question}", ""]
+        for item in self.answered:
+            refs = "".join(f"[{number}]" for number in item.citations)
+            flags = ", cached" if item.cached else ""
+            if item.matched_question:
+                score = "" if item.similarity is None else f", similarity {item.similarity:.2f}"
+                flags += f', answered for "{item.matched_question}"{score}'
+            lines += [
+                f"## {item.title} ({item.notebook_id})",
+                f"_{item.elapsed_ms:.0f} ms{flags}_",
+                "",
+                f"{item.answer.strip()} {refs}".rstrip(),
+                "",
+            ]
+        if self.citations:
+            lines += ["## Sources", ""]
+            lines += [
+                f"{item.number}. {item.label} ({', '.join(item.notebooks)})"
+                for item in self.citations
+            ]
+            lines.append("")
+        if self.failures:
+            lines += ["## Not answered", ""]
+            lines += [
+                f"- {item.title} ({item.notebook_id}): {item.status}"
+                + (f", {item.error}" if item.error else "")
+                for item in self.failures
+            ]
+            lines.append("")
+        return "\n".join(lines).rstrip() + "\n"
+
+
+def _citation_field(citation: Any, fields: tuple[str, ...]) -> str:  # noqa: ANN401
+    if isinstance(citation, dict):
+        for name in fields:
+            if citation.get(name):
+                return str(citation[name])
+        return json.dumps(citation, sort_keys=True)
+    return str(citation)
+
+
+def citation_key(citation: Any) -> str:  # noqa: ANN401
+    """Return the identity used to de-duplicate a citation across notebooks."""
+    return _citation_field(citation, CITATION_KEY_FIELDS).strip().lower()
+
+
+def citation_label(citation: Any) -> str:  # noqa: ANN401
+    """Return a human-readable name for a citation."""
+    return _citation_field(citation, CITATION_LABEL_FIELDS).strip()
+
+
+def aggregate(question: str, answers: list[NotebookAnswer]) -> Report:
+    """Build a report from fan-out answers, independent of their arrival order."""
+    report = Report(question=question)
+    by_key: dict[str, Citation] = {}
+    for item in sorted(answers, key=lambda a: (a.title.lower(), a.notebook_id)):
+        if item.status != "ok":
+            report.failures.append(item)
+            continue
+        numbers: list[int] = []
+        for raw in item.citations or []:
+            key = citation_key(raw)
+            citation = by_key.get(key)
+            if citation is None:
+                citation = Citation(len(by_key) + 1, key, citation_label(raw))
+                by_key[key] = citation
+                report.citations.append(citation)
+            if item.title not in citation.notebooks:
+                citation.notebooks.append(item.title)
+            if citation.number not in numbers:
+                numbers.append(citation.number)
+        report.answered.append(
+            AnsweredNotebook(
+                notebook_id=item.notebook_id,
+                title=item.title,
+                answer=item.answer,
+                citations=numbers,
+                cached=item.cached,
+                elapsed_ms=round(item.elapsed_ms, 1),
+                matched_question=item.matched_question,
+                similarity=item.similarity,
+            ),
+        )
+    return report
+
+
+def read_ndjson(path: Path) -> tuple[str, list[NotebookAnswer]]:
+    """Read the question and answers from a streamed ``ASK_OUTPUT=ndjson`` log."""
+    question = ""
+    answers = []
+    for line in path.read_text().splitlines():
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        if not isinstance(record, dict):
+            continue
+        kind = record.pop("type", "")
+        if kind == "answer":
+            answers.append(NotebookAnswer(**record))
+        elif kind == "summary":
+            question = str(record.get("question", ""))
+    return question, answers
+
+
+def _configure_logging() -> None:
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+def main() -> int:
+    """Aggregate a saved NDJSON ask-all stream into Markdown or JSON."""
+    _configure_logging()
+    parser = argparse.ArgumentParser(description="Aggregate NotebookLM fan-out answers")
+    parser.add_argument("path", type=Path, help="NDJSON output of ASK_OUTPUT=ndjson ask-all.")
+    parser.add_argument("--format", choices=["markdown", "json"], default="markdown")
+    args = parser.parse_args()
+
+    question, answers = read_ndjson(args.path)
+    report = aggregate(question, answers)
+    if args.format == "json":
+        logger.info(json.dumps(report.to_dict(), indent=2))
+    else:
+        logger.info(report.to_markdown())
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,502 @@
+"""Persistent SQLite cache for ``notebook_query`` answers.
+
+Besides exact matches on the normalized question, a question can be served from a
+near-duplicate asked earlier of the same notebook: each cached question gets a
+MinHash signature over its stemmed content words and word pairs, banded for LSH
+lookup. A candidate whose estimated Jaccard similarity reaches
+``NLM_NEAR_DUP_THRESHOLD`` (default 0.8) is returned with the matched question and
+score; ``NLM_NEAR_DUP=0`` turns this off.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import itertools
+import json
+import logging
+import os
+import re
+import sqlite3
+import sys
+import time
+from typing import TYPE_CHECKING, Any
+
+from nlm_state import env_flag, state_dir
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from mcp_client import McpStdioClient
+
+logger = logging.getLogger("answer_cache")
+
+DEFAULT_TTL_S = 24 * 60 * 60
+DEFAULT_MAX_ENTRIES = 2000
+DEFAULT_NEAR_DUP_THRESHOLD = 0.8
+KEY_EXCLUDED_ARGS = {"notebook_id", "question"}
+MINHASH_PERMUTATIONS = 64
+MINHASH_BANDS = 16
+MERSENNE_PRIME = (1 << 61) - 1
+STOPWORDS = frozenset(
+    "a about an and any are as at be can could do does for from how i in is it me my of on "  # noqa: SIM905
+    "or our should the this that to was we what when where which who why will with would you "
+    "your".split(),
+)
+SUFFIXES = ("ments", "ment", "ings", "ing", "ions", "ion", "ies", "es", "ed", "s")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS answers (
+    key TEXT PRIMARY KEY,
+    notebook_id TEXT NOT NULL,
+    question TEXT NOT NULL,
+    normalized TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS answers_notebook ON answers (notebook_id);
+CREATE INDEX IF NOT EXISTS answers_accessed ON answers (accessed_at);
+CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS signatures (key TEXT PRIMARY KEY, signature TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS bands (
+    notebook_id TEXT NOT NULL,
+    band INTEGER NOT NULL,
+    bucket TEXT NOT NULL,
+    key TEXT NOT NULL,
+    PRIMARY KEY (notebook_id, band, bucket, key)
+);
+"""
+
+
+def normalize_question(question: str) -> str:
+    """Lower-case, collapse whitespace and drop trailing punctuation."""
+    collapsed = re.sub(r"\s+", " ", question.strip().lower())
+    return collapsed.rstrip(" ?!.")
+
+
+def _stem(word: str) -> str:
+    for suffix in SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:  # noqa: PLR2004
+            word = word[: -len(suffix)]
+            break
+    return word.removesuffix("e") if len(word) > 3 else word  # noqa: PLR2004
+
+
+def question_terms(question: str) -> list[str]:
+    """Return the stemmed content words of a question, in order."""
+    words = re.findall(r"[a-z0-9]+", question.lower())
+    return [_stem(word) for word in words if word not in STOPWORDS]
+
+
+def question_shingles(question: str) -> set[str]:
+    """Return the question's content words plus adjacent word pairs."""
+    terms = question_terms(question)
+    return set(terms) | {f"{a} {b}" for a, b in itertools.pairwise(terms)}
+
+
+def _hash64(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest(), "big")
+
+
+_PERMUTATIONS = [
+    (_hash64(f"a{index}") | 1, _hash64(f"b{index}")) for index in range(MINHASH_PERMUTATIONS)
+]
+
+
+def minhash(shingles: set[str]) -> list[int]:
+    """Return the MinHash signature of a shingle set (empty for an empty set)."""
+    if not shingles:
+        return []
+    hashes = [_hash64(shingle) for shingle in shingles]
+    return [min((a * h + b) % MERSENNE_PRIME for h in hashes) for a, b in _PERMUTATIONS]
+
+
+def signature_similarity(left: list[int], right: list[int]) -> float:
+    """Estimate Jaccard similarity from two signatures."""
+    if not left or len(left) != len(right):
+        return 0.0
+    return sum(a == b for a, b in zip(left, right, strict=True)) / len(left)
+
+
+def _band_buckets(signature: list[int]) -> list[str]:
+    rows = len(signature) // MINHASH_BANDS
+    return [
+        hashlib.sha1(  # noqa: S324
+            json.dumps(signature[band * rows : (band + 1) * rows]).encode(),
+        ).hexdigest()[:16]
+        for band in range(MINHASH_BANDS)
+    ]
+
+
+def _sources(payload: Any) -> list[Any]:  # noqa: ANN401
+    if not isinstance(payload, dict):
+        return []
+    notebook = payload.get("notebook", payload)
+    if not isinstance(notebook, dict):
+        return []
+    sources = notebook.get("sources") or []
+    return sources if isinstance(sources, list) else []
+
+
+def source_fingerprint(notebook_payload: Any) -> str:  # noqa: ANN401
+    """Hash the source IDs and count from a ``notebook_get`` payload."""
+    ids = []
+    for source in _sources(notebook_payload):
+        if isinstance(source, dict):
+            ids.append(str(source.get("id") or source.get("source_id") or source.get("title")))
+        else:
+            ids.append(str(source))
+    digest = hashlib.sha256("\n".join([str(len(ids)), *sorted(ids)]).encode())
+    return digest.hexdigest()[:16]
+
+
+async def fetch_fingerprint(
+    client: McpStdioClient,
+    notebook_id: str,
+    *,
+    timeout_s: float | None = None,
+) -> str | None:
+    """Fetch the current source fingerprint for a notebook via ``notebook_get``.
+
+    Returns None when ``notebook_get`` fails, so a throttled or failed lookup is
+    never mistaken for a notebook without sources.
+    """
+    result = await client.call_tool(
+        "notebook_get",
+        {"notebook_id": notebook_id},
+        timeout_s=timeout_s,
+    )
+    if result.is_error:
+        return None
+    return source_fingerprint(result.payload())
+
+
+def cache_key(args: dict[str, Any]) -> str:
+    """Build the cache key from notebook, normalized question and remaining args."""
+    extra = {k: v for k, v in args.items() if k not in KEY_EXCLUDED_ARGS}
+    material = "\0".join(
+        [
+            str(args.get("notebook_id", "")),
+            normalize_question(str(args.get("question", ""))),
+            json.dumps(extra, sort_keys=True),
+        ],
+    )
+    return hashlib.sha256(material.encode()).hexdigest()
+
+
+def is_cacheable(args: dict[str, Any]) -> bool:
+    """Follow-ups inside a chat session depend on history and are never cached."""
+    return "session_id" not in args and bool(args.get("notebook_id")) and "question" in args
+
+
+def _plain_question(args: dict[str, Any]) -> bool:
+    """Return True when only the notebook and question vary, so rewordings are comparable."""
+    return not set(args) - KEY_EXCLUDED_ARGS
+
+
+def _annotate(payload: str, matched: str, similarity: float) -> str:
+    """Tag a near-duplicate hit with the question it was answered for."""
+    data = json.loads(payload)
+    if isinstance(data, dict):
+        data = {**data, "matched_question": matched, "similarity": round(similarity, 3)}
+    return json.dumps(data)
+
+
+class AnswerCache:
+    """TTL + LRU bounded answer store, invalidated by source fingerprint changes."""
+
+    def __init__(
+        self,
+        path: Path | None = None,
+        *,
+        ttl_s: float = DEFAULT_TTL_S,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        near_dup_threshold: float | None = DEFAULT_NEAR_DUP_THRESHOLD,
+    ) -> None:
+        """Open (or create) the cache database; a None threshold disables near-duplicates."""
+        self.path = path or state_dir() / "answers.sqlite"
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self.near_dup_threshold = near_dup_threshold
+        self._db = sqlite3.connect(self.path, timeout=10)
+        self._db.executescript(SCHEMA)
+
+    @classmethod
+    def from_env(cls) -> AnswerCache | None:
+        """Return a cache configured from the environment, or None when ``NLM_CACHE=0``."""
+        if not env_flag("NLM_CACHE"):
+            return None
+        return cls(
+            ttl_s=float(os.environ.get("NLM_CACHE_TTL", DEFAULT_TTL_S)),
+            max_entries=int(os.environ.get("NLM_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)),
+            near_dup_threshold=float(
+                os.environ.get("NLM_NEAR_DUP_THRESHOLD", DEFAULT_NEAR_DUP_THRESHOLD),
+            )
+            if env_flag("NLM_NEAR_DUP")
+            else None,
+        )
+
+    def close(self) -> None:
+        """Close the database connection."""
+        self._db.close()
+
+    def get(self, args: dict[str, Any], fingerprint: str) -> Any | None:  # noqa: ANN401
+        """Return a cached payload, or None on a miss, expiry or fingerprint change."""
+        notebook_id = str(args.get("notebook_id", ""))
+        now = time.time()
+        with self._db:
+            stale = self._db.execute(
+                "DELETE FROM answers WHERE notebook_id = ? AND fingerprint != ?",
+                (notebook_id, fingerprint),
+            ).rowcount
+            if stale:
+                self._bump("invalidated", stale)
+            key = cache_key(args)
+            row = self._db.execute(
+                "SELECT payload, created_at FROM answers WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl_s:
+                near = self._near_duplicate(args, now)
+                if near is None:
+                    self._bump("misses")
+                    return None
+                key, payload, matched, similarity = near
+                self._bump("near_hits")
+                row = (_annotate(payload, matched, similarity), now)
+            else:
+                self._bump("hits")
+            self._db.execute("UPDATE answers SET accessed_at = ? WHERE key = ?", (now, key))
+        return json.loads(row[0])
+
+    def similar(
+        self,
+        notebook_id: str,
+        question: str,
+        *,
+        limit: int = 5,
+    ) -> list[tuple[str, float]]:
+        """Return earlier questions to ``notebook_id`` most like ``question``, best first."""
+        signature = minhash(question_shingles(question))
+        if not signature:
+            return []
+        rows = self._candidates(notebook_id, signature, time.time())
+        scored = [
+            (asked, signature_similarity(signature, json.loads(stored)))
+            for _, _, asked, stored in rows
+        ]
+        return sorted(scored, key=lambda item: (-item[1], item[0]))[:limit]
+
+    def _candidates(
+        self,
+        notebook_id: str,
+        signature: list[int],
+        now: float,
+    ) -> list[tuple[str, str, str, str]]:
+        """Return ``(key, payload, question, signature)`` rows sharing an LSH band."""
+        buckets = _band_buckets(signature)
+        placeholders = " OR ".join("(b.band = ? AND b.bucket = ?)" for _ in buckets)
+        params: list[Any] = [notebook_id, now - self.ttl_s]
+        for band, bucket in enumerate(buckets):
+            params += [band, bucket]
+        query = (
+            "SELECT DISTINCT a.key, a.payload, a.question, s.signature FROM bands b "  # noqa: S608
+            "JOIN answers a ON a.key = b.key JOIN signatures s ON s.key = b.key "
+            f"WHERE b.notebook_id = ? AND a.created_at >= ? AND ({placeholders})"
+        )
+        return self._db.execute(query, params).fetchall()
+
+    def _near_duplicate(
+        self,
+        args: dict[str, Any],
+        now: float,
+    ) -> tuple[str, str, str, float] | None:
+        """Return ``(key, payload, question, similarity)`` for the closest earlier question."""
+        if self.near_dup_threshold is None or not _plain_question(args):
+            return None
+        signature = minhash(question_shingles(str(args["question"])))
+        if not signature:
+            return None
+        best = None
+        for key, payload, asked, stored in self._candidates(
+            str(args["notebook_id"]),
+            signature,
+            now,
+        ):
+            similarity = signature_similarity(signature, json.loads(stored))
+            if similarity >= self.near_dup_threshold and (best is None or similarity > best[3]):
+                best = (key, payload, asked, similarity)
+        return best
+
+    def _index_question(self, key: str, notebook_id: str, question: str) -> None:
+        signature = minhash(question_shingles(question))
+        if not signature:
+            return
+        self._db.execute(
+            "INSERT OR REPLACE INTO signatures VALUES (?, ?)",
+            (key, json.dumps(signature)),
+        )
+        self._db.executemany(
+            "INSERT OR IGNORE INTO bands VALUES (?, ?, ?, ?)",
+            [
+                (notebook_id, band, bucket, key)
+                for band, bucket in enumerate(_band_buckets(signature))
+            ],
+        )
+
+    def put(self, args: dict[str, Any], fingerprint: str, payload: Any) -> None:  # noqa: ANN401
+        """Store a payload and evict least-recently-used entries beyond the size bound."""
+        now = time.time()
+        question = str(args.get("question", ""))
+        with self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO answers VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    cache_key(args),
+                    str(args.get("notebook_id", "")),
+                    question,
+                    normalize_question(question),
+                    fingerprint,
+                    json.dumps(payload),
+                    now,
+                    now,
+                ),
+            )
+            if _plain_question(args):
+                self._index_question(cache_key(args), str(args.get("notebook_id", "")), question)
+            self._db.execute("DELETE FROM answers WHERE created_at < ?", (now - self.ttl_s,))
+            evicted = self._db.execute(
+                "DELETE FROM answers WHERE key IN ("
+                "SELECT key FROM answers ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            ).rowcount
+            if evicted:
+                self._bump("evictions", evicted)
+            self._db.execute("DELETE FROM signatures WHERE key NOT IN (SELECT key FROM answers)")
+            self._db.execute("DELETE FROM bands WHERE key NOT IN (SELECT key FROM answers)")
+
+    def stats(self) -> dict[str, int]:
+        """Return hit/miss/eviction counters and the current entry count."""
+        counters = dict(self._db.execute("SELECT name, value FROM stats").fetchall())
+        entries = self._db.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+        return {
+            "entries": entries,
+            "hits": counters.get("hits", 0),
+            "misses": counters.get("misses", 0),
+            "near_hits": counters.get("near_hits", 0),
+            "invalidated": counters.get("invalidated", 0),
+            "evictions": counters.get("evictions", 0),
+        }
+
+    def entries(self) -> list[dict[str, Any]]:
+        """Return every unexpired entry's key, notebook, question and payload."""
+        rows = self._db.execute(
+            "SELECT key, notebook_id, question, payload, created_at FROM answers "
+            "WHERE created_at >= ? ORDER BY created_at",
+            (time.time() - self.ttl_s,),
+        ).fetchall()
+        return [
+            {
+                "key": key,
+                "notebook_id": notebook_id,
+                "question": question,
+                "payload": json.loads(payload),
+                "created_at": created_at,
+            }
+            for key, notebook_id, question, payload, created_at in rows
+        ]
+
+    def clear(self) -> None:
+        """Drop every entry and reset the counters."""
+        with self._db:
+            self._db.execute("DELETE FROM answers")
+            self._db.execute("DELETE FROM signatures")
+            self._db.execute("DELETE FROM bands")
+            self._db.execute("DELETE FROM stats")
+
+    def _bump(self, name: str, amount: int = 1) -> None:
+        self._db.execute(
+            "INSERT INTO stats VALUES (?, ?) ON CONFLICT(name) DO UPDATE SET value = value + ?",
+            (name, amount, amount),
+        )
+
+
+async def cached_query(
+    client: McpStdioClient,
+    cache: AnswerCache | None,
+    args: dict[str, Any],
+    *,
+    timeout_s: float | None = None,
+) -> tuple[Any, bool, bool]:
+    """Run ``notebook_query`` through the cache.
+
+    ``timeout_s`` bounds the fingerprint lookup and the query together. When the
+    fingerprint cannot be fetched the cache is bypassed for this call.
+    Returns ``(payload, is_error, cache_hit)``.
+    """
+    fingerprint = None
+    if cache is not None and is_cacheable(args):
+        started = time.monotonic()
+        fingerprint = await fetch_fingerprint(
+            client,
+            str(args["notebook_id"]),
+            timeout_s=timeout_s,
+        )
+        if fingerprint is not None:
+            cached = cache.get(args, fingerprint)
+            if cached is not None:
+                return cached, False, True
+        if timeout_s is not None:
+            timeout_s = max(0.0, timeout_s - (time.monotonic() - started))
+    result = await client.call_tool("notebook_query", args, timeout_s=timeout_s)
+    payload = result.payload()
+    if fingerprint and not result.is_error and cache is not None:
+        cache.put(args, fingerprint, payload)
+    return payload, result.is_error, False
+
+
+def _configure_logging() -> None:
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+def main() -> int:
+    """Show cache statistics, clear the cache, or list earlier questions like one."""
+    _configure_logging()
+    parser = argparse.ArgumentParser(description="NotebookLM answer cache")
+    parser.add_argument("action", choices=["stats", "clear", "similar"])
+    parser.add_argument("question", nargs="?", default="", help="Question for similar.")
+    parser.add_argument("--notebook", default="", help="Notebook ID for similar.")
+    args = parser.parse_args()
+
+    cache = AnswerCache()
+    try:
+        if args.action == "clear":
+            cache.clear()
+            logger.info("Cleared answer cache at %s", cache.path)
+            return 0
+        if args.action == "similar":
+            if not args.question or not args.notebook:
+                parser.error("similar needs a question and --notebook")
+            matches = cache.similar(args.notebook, args.question)
+            for asked, similarity in matches:
+                logger.info("%.2f  %s", similarity, asked)
+            return 0 if matches else 1
+        stats = cache.stats()
+        hits = stats["hits"] + stats["near_hits"]
+        lookups = hits + stats["misses"]
+        hit_rate = round(hits / lookups, 3) if lookups else 0.0
+        report = {"path": str(cache.path), **stats, "hit_rate": hit_rate}
+        logger.info(json.dumps(report, indent=2))
+    finally:
+        cache.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
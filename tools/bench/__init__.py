@@ -0,0 +1 @@
+"""Benchmarks for the NotebookLM task tools against the local stand-in server."""
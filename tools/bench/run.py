@@ -0,0 +1,364 @@
+"""Benchmark codex_tasks and nlm_tasks entry points against the fake NotebookLM server.
+
+Every scenario runs offline against ``tests/fake_notebooklm_mcp.py``. End-to-end
+numbers launch the real entry points as subprocesses; stage numbers drive the same
+library code in-process. Per-run results are written as JSON under ``.pixi-cache``
+and compared against the committed ``tools/bench/baseline.json``, failing when p50
+or p95 regresses beyond the threshold.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterator
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT / "tools"))
+
+from mcp_client import McpStdioClient  # noqa: E402
+from nlm_fanout import FanoutOptions, ask_notebooks  # noqa: E402
+from notebook_catalog import NotebookCatalog  # noqa: E402
+from notebooklm_auth_check_rpc import check_auth  # noqa: E402
+
+logger = logging.getLogger("bench")
+
+FAKE_SERVER = ROOT / "tests" / "fake_notebooklm_mcp.py"
+RESULTS_DIR = ROOT / ".pixi-cache" / "bench"
+BASELINE = Path(__file__).resolve().parent / "baseline.json"
+DEFAULT_QUERY_LATENCY = {"dist": "lognormal", "median_ms": 200, "sigma": 0.3}
+DEFAULT_MIN_DELTA_MS = 5.0
+QUESTION = "How can we improve the Codex implementation in this repo?"
+
+
+def fake_config(notebooks: int) -> dict[str, Any]:
+    """Return the stand-in server config used for a run."""
+    return {
+        "seed": 42,
+        "notebooks": notebooks,
+        "default": {"latency": {"dist": "fixed", "ms": 5}},
+        "tools": {"notebook_query": {"latency": DEFAULT_QUERY_LATENCY, "response_bytes": 2000}},
+    }
+
+
+@contextlib.contextmanager
+def bench_env(notebooks: int, state_dir: Path) -> Iterator[dict[str, str]]:
+    """Point the tools at the fake server with isolated, cache-free state."""
+    overrides = {
+        "NLM_MCP_COMMAND": f"{sys.executable} {FAKE_SERVER}",
+        "FAKE_NLM_CONFIG": json.dumps(fake_config(notebooks)),
+        "NLM_STATE_DIR": str(state_dir),
+        "NLM_TRANSPORT": "direct",
+        "NLM_CACHE": "0",
+        "NLM_RATE_LIMIT": "0",
+    }
+    saved = {key: os.environ.get(key) for key in overrides}
+    os.environ.update(overrides)
+    try:
+        yield os.environ.copy()
+    finally:
+        for key, value in saved.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    """Linearly interpolated percentile of ``samples``."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(
+    name: str,
+    samples_ms: list[float],
+    *,
+    ops_per_sample: int = 1,
+    stages: dict[str, list[float]] | None = None,
+) -> dict[str, Any]:
+    """Build a result record with percentiles, throughput and stage means."""
+    total_s = sum(samples_ms) / 1000
+    return {
+        "name": name,
+        "samples_ms": [round(sample, 2) for sample in samples_ms],
+        "p50_ms": round(percentile(samples_ms, 50), 2),
+        "p95_ms": round(percentile(samples_ms, 95), 2),
+        "p99_ms": round(percentile(samples_ms, 99), 2),
+        "mean_ms": round(statistics.fmean(samples_ms), 2) if samples_ms else 0.0,
+        "throughput_per_s": round(ops_per_sample * len(samples_ms) / total_s, 2)
+        if total_s
+        else 0.0,
+        "stages_ms": {
+            stage: round(statistics.fmean(values), 2) for stage, values in (stages or {}).items()
+        },
+    }
+
+
+def _time_subprocess(cmd: list[str], env: dict[str, str]) -> float:
+    started = time.perf_counter()
+    subprocess.run(cmd, check=True, cwd=ROOT, env=env, capture_output=True)  # noqa: S603
+    return (time.perf_counter() - started) * 1000
+
+
+def _repeat(iterations: int, func: Callable[[], float]) -> list[float]:
+    return [func() for _ in range(iterations)]
+
+
+async def _ask_all_stages(state_dir: Path, options: FanoutOptions) -> dict[str, float]:
+    """Run one in-process ask-all and time its stages."""
+    stages: dict[str, float] = {}
+    mark = time.perf_counter()
+    client = McpStdioClient.from_config()
+    await client.start()
+    stages["start"] = (time.perf_counter() - mark) * 1000
+    try:
+        mark = time.perf_counter()
+        catalog = NotebookCatalog(state_dir / f"catalog-{time.perf_counter_ns()}.json")
+        await catalog.ensure(client, force=True)
+        stages["catalog"] = (time.perf_counter() - mark) * 1000
+        mark = time.perf_counter()
+        await ask_notebooks(client, catalog.select(""), QUESTION, options)
+        stages["queries"] = (time.perf_counter() - mark) * 1000
+    finally:
+        mark = time.perf_counter()
+        await client.close()
+        stages["close"] = (time.perf_counter() - mark) * 1000
+    stages["total"] = sum(stages.values())
+    return stages
+
+
+def bench_ask_all(
+    notebooks: int,
+    concurrency: int,
+    iterations: int,
+    state_dir: Path,
+) -> list[dict[str, Any]]:
+    """Benchmark ask-all in-process (by stage) and end-to-end via codex_tasks."""
+    results = []
+    label = f"notebooks={notebooks}/concurrency={concurrency}"
+    state_dir = state_dir / f"ask-all-{notebooks}-{concurrency}"
+    state_dir.mkdir()
+    with bench_env(notebooks, state_dir) as env:
+        options = FanoutOptions(concurrency=concurrency, timeout_s=30, retries=0)
+        runs = [asyncio.run(_ask_all_stages(state_dir, options)) for _ in range(iterations)]
+        stages = {key: [run[key] for run in runs] for key in runs[0] if key != "total"}
+        results.append(
+            summarize(
+                f"ask-all/stages/{label}",
+                [run["total"] for run in runs],
+                ops_per_sample=notebooks,
+                stages=stages,
+            ),
+        )
+        env["ASK_CONCURRENCY"] = str(concurrency)
+        cmd = [sys.executable, str(ROOT / "tools" / "codex_tasks.py"), "ask-all"]
+        samples = _repeat(iterations, lambda: _time_subprocess(cmd, env))
+        results.append(summarize(f"ask-all/e2e/{label}", samples, ops_per_sample=notebooks))
+    return results
+
+
+def bench_notebook_query(iterations: int, state_dir: Path) -> list[dict[str, Any]]:
+    """Benchmark the nlm-notebook-query entry point end-to-end."""
+    with bench_env(1, state_dir) as env:
+        catalog_file = state_dir / "catalog-query.json"
+        asyncio.run(_refresh_catalog(catalog_file))
+        notebook_id = NotebookCatalog(catalog_file).entries()[0]["id"]
+        args = json.dumps({"notebook_id": notebook_id, "question": QUESTION})
+        cmd = [
+            sys.executable,
+            str(ROOT / "tools" / "nlm_tasks.py"),
+            "notebook_query",
+            "--args",
+            args,
+        ]
+        samples = _repeat(iterations, lambda: _time_subprocess(cmd, env))
+    return [summarize("nlm-notebook-query/e2e", samples)]
+
+
+async def _refresh_catalog(path: Path) -> None:
+    async with McpStdioClient.from_config() as client:
+        await NotebookCatalog(path).refresh(client)
+
+
+def bench_auth_check(iterations: int, state_dir: Path) -> list[dict[str, Any]]:
+    """Benchmark the auth check in-process and via the pixi entry point.
+
+    Uses a synthetic auth file with long-lived session cookies, so the offline
+    expiry path is measured rather than Google.
+    """
+    auth_file = state_dir / "auth.json"
+    expires = time.time() + 30 * 86400
+    cookies = [{"name": "SID", "value": "bench", "expires": expires}]
+    auth_file.write_text(json.dumps({"cookies": cookies}))
+    with bench_env(0, state_dir) as env:
+        env["AUTH_FILE"] = str(auth_file)
+
+        def _in_process() -> float:
+            started = time.perf_counter()
+            check_auth(auth_file)
+            return (time.perf_counter() - started) * 1000
+
+        cmd = [sys.executable, str(ROOT / "tools" / "codex_tasks.py"), "auth-check-rpc"]
+        return [
+            summarize("auth-check-rpc/in-process", _repeat(iterations, _in_process)),
+            summarize(
+                "auth-check-rpc/e2e",
+                _repeat(iterations, lambda: _time_subprocess(cmd, env)),
+            ),
+        ]
+
+
+def compare(
+    results: list[dict[str, Any]],
+    baseline: list[dict[str, Any]],
+    threshold: float,
+    min_delta_ms: float = 0.0,
+) -> list[str]:
+    """Return regressions where p50 or p95 exceeds the baseline by more than ``threshold``.
+
+    Slowdowns smaller than ``min_delta_ms`` are ignored, so sub-millisecond jitter in
+    a shared baseline does not count as a regression.
+    """
+    previous = {item["name"]: item for item in baseline}
+    regressions = []
+    for item in results:
+        base = previous.get(item["name"])
+        if base is None:
+            continue
+        for metric in ("p50_ms", "p95_ms"):
+            if (
+                base[metric]
+                and item[metric] > base[metric] * (1 + threshold)
+                and item[metric] - base[metric] >= min_delta_ms
+            ):
+                change = (item[metric] / base[metric] - 1) * 100
+                regressions.append(
+                    f"{item['name']} {metric}: {base[metric]:.1f} -> {item[metric]:.1f} "
+                    f"(+{change:.0f}%)",
+                )
+    return regressions
+
+
+def _int_list(value: str) -> list[int]:
+    return [int(part) for part in value.split(",") if part.strip()]
+
+
+def _configure_logging() -> None:
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+def main() -> int:
+    """Run the benchmark matrix, write results and compare with the baseline."""
+    _configure_logging()
+    parser = argparse.ArgumentParser(description="Benchmark NotebookLM task tools offline.")
+    parser.add_argument("--notebooks", default="5,20", help="Comma-separated notebook counts.")
+    parser.add_argument(
+        "--concurrency",
+        default="1,4,8",
+        help="Comma-separated concurrency levels.",
+    )
+    parser.add_argument("--iterations", type=int, default=3)
+    parser.add_argument("--output", type=Path, default=RESULTS_DIR / "results.json")
+    parser.add_argument(
+        "--baseline",
+        type=Path,
+        default=BASELINE,
+        help="Baseline to compare with (and write with --save-baseline); tracked in git.",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=float(os.environ.get("BENCH_REGRESSION_THRESHOLD", "0.2")),
+        help="Allowed fractional slowdown before a metric counts as a regression.",
+    )
+    parser.add_argument(
+        "--min-delta-ms",
+        type=float,
+        default=float(os.environ.get("BENCH_MIN_DELTA_MS", DEFAULT_MIN_DELTA_MS)),
+        help="Ignore slowdowns smaller than this many milliseconds.",
+    )
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="Write this run's results as the new baseline.",
+    )
+    args = parser.parse_args()
+
+    results: list[dict[str, Any]] = []
+    with tempfile.TemporaryDirectory(prefix="nlm-bench-") as tmp:
+        state_dir = Path(tmp)
+        results.extend(bench_auth_check(args.iterations, state_dir))
+        results.extend(bench_notebook_query(args.iterations, state_dir))
+        for notebooks in _int_list(args.notebooks):
+            for concurrency in _int_list(args.concurrency):
+                results.extend(bench_ask_all(notebooks, concurrency, args.iterations, state_dir))
+
+    for item in results:
+        logger.info(
+            "%-48s p50 %8.1f  p95 %8.1f  p99 %8.1f ms  %7.2f/s",
+            item["name"],
+            item["p50_ms"],
+            item["p95_ms"],
+            item["p99_ms"],
+            item["throughput_per_s"],
+        )
+        if item["stages_ms"]:
+            stages = ", ".join(f"{k} {v:.1f}" for k, v in item["stages_ms"].items())
+            logger.info("%-48s stages: %s", "", stages)
+
+    report = {
+        "created_at": datetime.now(UTC).isoformat(),
+        "python": sys.version.split()[0],
+        "iterations": args.iterations,
+        "results": results,
+    }
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(report, indent=2))
+    logger.info("Wrote %s", args.output)
+
+    if args.save_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(report, indent=2))
+        logger.info("Saved baseline to %s", args.baseline)
+        return 0
+    if not args.baseline.exists():
+        logger.info("No baseline at %s; run with --save-baseline to create one.", args.baseline)
+        return 0
+
+    baseline = json.loads(args.baseline.read_text()).get("results", [])
+    regressions = compare(results, baseline, args.threshold, args.min_delta_ms)
+    if regressions:
+        logger.error("Regressions beyond %.0f%%:", args.threshold * 100)
+        for line in regressions:
+            logger.error("  %s", line)
+        return 1
+    logger.info("No regressions beyond %.0f%% against %s", args.threshold * 100, args.baseline)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,59 +1,157 @@
-"""Reject bash scripts and non-Pixi calls in the repo."""
+"""Reject bash scripts and non-Pixi calls in the repo.
+
+The tree is walked once, pruning ignored directories before descending. Docs are
+scanned in parallel, and each doc's findings are cached in
+``.pixi-cache/check_no_bash.json`` by modification time and size, so unchanged
+files are not read again. The cache is discarded whenever this checker changes.
+"""
 
 from __future__ import annotations
 
+import argparse
+import hashlib
+import json
 import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Any
 
 logger = logging.getLogger(__name__)
 
 ROOT = Path(__file__).resolve().parents[1]
 IGNORE_DIRS = {".git", "node_modules", ".pixi", "__pycache__"}
+DOC_EXTS = {".md", ".txt"}
+CACHE_PATH = ROOT / ".pixi-cache" / "check_no_bash.json"
+MARKERS = (".sh", "make ", "bash ", "/bin/")
+
+
+def walk_repo(root: Path = ROOT) -> tuple[list[Path], list[Path]]:
+    """Return the bash scripts and docs under ``root`` in one pruned walk."""
+    scripts: list[Path] = []
+    docs: list[Path] = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(name for name in dirnames if name not in IGNORE_DIRS)
+        for name in sorted(filenames):
+            path = Path(dirpath, name)
+            if name.endswith(".sh"):
+                scripts.append(path)
+            elif path.suffix in DOC_EXTS:
+                docs.append(path)
+    return scripts, docs
 
 
 def find_bash_scripts() -> list[Path]:
     """Collect bash script files under the repo."""
-    scripts = []
-    for path in ROOT.rglob("*.sh"):
-        if not path.is_file():
-            continue
-        if any(part in IGNORE_DIRS for part in path.parts):
-            continue
-        scripts.append(path)
-    return scripts
-
-
-def scan_docs() -> list[str]:
-    """Scan docs for references to bash or make usage."""
-    issues: list[str] = []
-    doc_exts = {".md", ".txt"}
-    for path in ROOT.rglob("*"):
-        if not path.is_file() or path.suffix not in doc_exts:
-            continue
-        if any(part in IGNORE_DIRS for part in path.parts):
-            continue
-        rel = path.relative_to(ROOT)
-        for idx, line in enumerate(path.read_text().splitlines(), start=1):
-            stripped = line.strip()
-            if ".sh" in stripped and "scripts/" in stripped:
-                issues.append(f"{rel}:{idx}: references a .sh script -> {stripped}")
-            if stripped.startswith("make "):
-                issues.append(f"{rel}:{idx}: uses make; use pixi run -> {stripped}")
-            if stripped.startswith(("bash ", "/bin/bash", "/bin/sh")):
-                issues.append(f"{rel}:{idx}: uses bash/sh; use pixi run -> {stripped}")
+    return walk_repo()[0]
+
+
+def scan_doc(path: Path) -> list[str]:
+    """Return the bash/make usages in one doc."""
+    text = path.read_text(errors="replace")
+    if not any(marker in text for marker in MARKERS):
+        return []
+    rel = path.relative_to(ROOT)
+    issues = []
+    for idx, line in enumerate(text.splitlines(), start=1):
+        stripped = line.strip()
+        if ".sh" in stripped and "scripts/" in stripped:
+            issues.append(f"{rel}:{idx}: references a .sh script -> {stripped}")
+        if stripped.startswith("make "):
+            issues.append(f"{rel}:{idx}: uses make; use pixi run -> {stripped}")
+        if stripped.startswith(("bash ", "/bin/bash", "/bin/sh")):
+            issues.append(f"{rel}:{idx}: uses bash/sh; use pixi run -> {stripped}")
     return issues
 
 
+def _checker_version() -> str:
+    return hashlib.sha256(Path(__file__).read_bytes()).hexdigest()[:16]
+
+
+class ScanCache:
+    """Per-file findings keyed by path, valid while mtime and size are unchanged."""
+
+    def __init__(self, path: Path = CACHE_PATH, *, enabled: bool = True) -> None:
+        """Load the cache unless disabled or written by a different checker version."""
+        self.path = path
+        self.enabled = enabled
+        self.version = _checker_version()
+        self.files: dict[str, dict[str, Any]] = {}
+        if enabled and path.exists():
+            try:
+                data = json.loads(path.read_text())
+            except json.JSONDecodeError:
+                data = {}
+            if data.get("version") == self.version:
+                self.files = data.get("files", {})
+
+    @staticmethod
+    def _stat_key(path: Path) -> list[int]:
+        stat = path.stat()
+        return [stat.st_mtime_ns, stat.st_size]
+
+    def lookup(self, path: Path) -> list[str] | None:
+        """Return cached findings for an unchanged file, else None."""
+        entry = self.files.get(str(path.relative_to(ROOT)))
+        if entry is None or entry["stat"] != self._stat_key(path):
+            return None
+        return list(entry["issues"])
+
+    def store(self, path: Path, issues: list[str]) -> None:
+        """Remember a file's findings."""
+        self.files[str(path.relative_to(ROOT))] = {"stat": self._stat_key(path), "issues": issues}
+
+    def save(self, docs: list[Path]) -> None:
+        """Write entries for the current docs only, dropping deleted files."""
+        if not self.enabled:
+            return
+        live = {str(path.relative_to(ROOT)) for path in docs}
+        files = {rel: entry for rel, entry in self.files.items() if rel in live}
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_text(json.dumps({"version": self.version, "files": files}))
+            tmp.replace(self.path)
+        except OSError as exc:
+            logger.warning("Could not write scan cache %s: %s", self.path, exc)
+
+
+def scan_docs(docs: list[Path] | None = None, cache: ScanCache | None = None) -> list[str]:
+    """Scan docs for references to bash or make usage, skipping cached unchanged files."""
+    docs = walk_repo()[1] if docs is None else docs
+    cache = cache or ScanCache(enabled=False)
+    results: dict[Path, list[str]] = {}
+    stale = []
+    for path in docs:
+        cached = cache.lookup(path)
+        if cached is None:
+            stale.append(path)
+        else:
+            results[path] = cached
+    if stale:
+        with ThreadPoolExecutor() as pool:
+            for path, issues in zip(stale, pool.map(scan_doc, stale), strict=True):
+                cache.store(path, issues)
+                results[path] = issues
+    return [issue for path in docs for issue in results[path]]
+
+
 def main() -> int:
     """Run checks and emit failures."""
     logging.basicConfig(level=logging.INFO, format="%(message)s")
+    parser = argparse.ArgumentParser(description="Block bash scripts and non-pixi calls")
+    parser.add_argument("--no-cache", action="store_true", help="Rescan every doc.")
+    args = parser.parse_args()
+
+    scripts, docs = walk_repo()
     failures = []
-    scripts = find_bash_scripts()
     if scripts:
         failures.append("Bash scripts are not allowed:")
         failures.extend([f"- {p.relative_to(ROOT)}" for p in scripts])
 
-    failures.extend(scan_docs())
+    cache = ScanCache(enabled=not args.no_cache)
+    failures.extend(scan_docs(docs, cache))
+    cache.save(docs)
 
     if failures:
         logger.error("\n".join(failures))
@@ -3,14 +3,31 @@
 from __future__ import annotations
 
 import argparse
+import asyncio
+import json
+import logging
 import os
 import shutil
-import subprocess
 import sys
 import tempfile
+import time
 from pathlib import Path
 
+import rate_limit
+import tracing
+from aggregate import aggregate
+from mcp_client import DEFAULT_SERVER, McpStartError, load_server_config, resolve_transport
+from nlm_fanout import FanoutOptions, NotebookAnswer
+from nlm_fanout import ask_all as fanout_ask_all
+from notebook_catalog import NotebookCatalog, force_refresh_requested, parse_notebook_ids
+from notebook_health import HealthStore
+from notebooklm_auth_check_rpc import check_auth
+from notebooklm_auth_check_rpc import main as auth_check_main
+
+logger = logging.getLogger("codex_tasks")
+
 ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_QUESTION = "How can we improve the Codex implementation in this repo?"
 
 
 def _run(
@@ -19,12 +36,13 @@ def _run(
     cwd: Path | None = None,
     env: dict[str, str] | None = None,
 ) -> None:
-    """Run a subprocess and propagate failures."""
-    subprocess.run(cmd, check=True, cwd=cwd, env=env)  # noqa: S603
+    """Run a traced subprocess and propagate failures."""
+    tracing.run(cmd, check=True, cwd=cwd, env=env)
 
 
 def _codex_exec(prompt: str, env: dict[str, str]) -> None:
-    """Execute a Codex prompt with the current environment."""
+    """Execute a Codex prompt with the current environment, paced by the shared limiter."""
+    rate_limit.pace_launch()
     _run(["codex", "--enable", "skills", "exec", prompt], env=env)
 
 
@@ -33,6 +51,37 @@ def _base_env() -> dict[str, str]:
     return os.environ.copy()
 
 
+def _catalog_hint(notebook_ids: str) -> str:
+    """Describe the selected notebooks from a fresh local catalog, or return ``""``.
+
+    A non-empty hint lets Codex skip ``notebook_list``; it is only produced when the
+    catalog is within its TTL, every requested notebook resolves, and no forced
+    refresh (``NLM_CATALOG_REFRESH=1``) was requested.
+    """
+    if force_refresh_requested():
+        return ""
+    catalog = NotebookCatalog.from_env()
+    if not catalog.is_fresh():
+        return ""
+    wanted = parse_notebook_ids(notebook_ids)
+    entries = [catalog.lookup(key) for key in wanted] if wanted else catalog.entries()
+    if not entries or any(entry is None for entry in entries):
+        return ""
+    return "; ".join(
+        f"'{entry['title']}' (notebook_id: {entry['id']})" for entry in entries if entry
+    )
+
+
+def _health_hint() -> str:
+    """Name notebooks whose circuit breaker is open, or return ``""``."""
+    health = HealthStore.from_env()
+    if health is None:
+        return ""
+    return "; ".join(
+        f"'{item.title}' (notebook_id: {item.notebook_id})" for item in health.open_notebooks()
+    )
+
+
 def _prompt_common(
     question: str,
     notebook_ids: str,
@@ -40,61 +89,154 @@ def _prompt_common(
     allow_subagents: bool,
 ) -> str:
     """Build the standard notebook query prompt."""
+    hint = _catalog_hint(notebook_ids)
     prefix = (
         "Use the notebooklm-patterns skill with the notebooklm-rpc server. "
         "Assume cookies were created via notebooklm-mcp-auth --file. "
-        "List notebooks with mcp__notebooklm-rpc__notebook_list"
     )
+    if hint:
+        prefix += (
+            "Do not call mcp__notebooklm-rpc__notebook_list; the local notebook catalog already "
+            f"resolved the selected notebooks: {hint}."
+        )
+    else:
+        prefix += "List notebooks with mcp__notebooklm-rpc__notebook_list"
     if allow_subagents:
         prefix += (
             " If subagents or task parallelism are available, spawn one subagent per selected "
             "notebook. If subagents are unavailable, run the notebook queries sequentially."
         )
 
+    guardrails = (
+        "Aggregate responses labeled by notebook name and include citations. "
+        "If any response is off-topic, retry once with a narrower prompt that starts with: "
+        f"'Answer ONLY about: {question}'. If it still drifts, report a likely "
+        "notebook-content mismatch."
+    )
+    skip = _health_hint()
+    if skip:
+        guardrails += (
+            f" Skip these notebooks, which keep timing out, and report them as skipped: {skip}."
+        )
+
+    if hint:
+        return (
+            f"{prefix} Ask each selected notebook via mcp__notebooklm-rpc__notebook_query using "
+            f"'{question}'. {guardrails}"
+        )
+
     if notebook_ids:
         return (
             f"{prefix}, then filter to these notebook IDs (comma-separated): "
             f"'{notebook_ids}'. "
             f"Ask each selected notebook via mcp__notebooklm-rpc__notebook_query using "
-            f"'{question}'. "
-            "Aggregate responses labeled by notebook name and include citations. "
-            "If any response is off-topic, retry once with a narrower prompt that starts with: "
-            f"'Answer ONLY about: {question}'. If it still drifts, report a likely "
-            "notebook-content mismatch."
+            f"'{question}'. {guardrails}"
         )
 
     return (
         f"{prefix}, then ask each notebook via mcp__notebooklm-rpc__notebook_query using "
-        f"'{question}'. "
-        "Aggregate responses labeled by notebook name and include citations. "
-        "If any response is off-topic, retry once with a narrower prompt that starts with: "
-        f"'Answer ONLY about: {question}'. If it still drifts, report a likely "
-        "notebook-content mismatch."
+        f"'{question}'. {guardrails}"
     )
 
 
-def ask_all() -> None:
-    """Query all notebooks sequentially."""
-    env = _base_env()
-    question = env.get("QUESTION", "How can we improve the Codex implementation in this repo?")
-    notebook_ids = env.get("NOTEBOOK_IDS", "")
-    _codex_exec(_prompt_common(question, notebook_ids, allow_subagents=False), env)
+def _use_direct(env: dict[str, str]) -> bool:
+    """Return True when ask-all should fan out over MCP stdio instead of Codex.
+
+    The server config is only read for ``auto`` and ``direct``; when it is missing,
+    ``auto`` falls back to Codex and ``direct`` re-raises.
+    """
+    transport = env.get("NLM_TRANSPORT", "auto")
+    if transport == "codex":
+        return False
+    try:
+        command = str(load_server_config(DEFAULT_SERVER)["command"])
+    except (FileNotFoundError, KeyError):
+        if transport == "direct":
+            raise
+        return False
+    return resolve_transport(transport, command) == "direct"
+
+
+def _emit_ndjson(answer: NotebookAnswer) -> None:
+    """Write one answer as an NDJSON record the moment it arrives."""
+    logger.info(json.dumps({"type": "answer", **answer.to_dict()}))
+
+
+def _ndjson_summary(question: str, answers: list[NotebookAnswer], elapsed_ms: float) -> str:
+    """Build the closing NDJSON record for a streamed fan-out."""
+    statuses: dict[str, int] = {}
+    for item in answers:
+        statuses[item.status] = statuses.get(item.status, 0) + 1
+    slowest = max(answers, key=lambda item: item.elapsed_ms, default=None)
+    return json.dumps(
+        {
+            "type": "summary",
+            "question": question,
+            "notebooks": len(answers),
+            "statuses": statuses,
+            "cached": sum(item.cached for item in answers),
+            "elapsed_ms": round(elapsed_ms, 1),
+            "slowest": slowest.notebook_id if slowest else None,
+        },
+    )
+
 
+def _ask_all_direct(env: dict[str, str], question: str, notebook_ids: str) -> int:
+    """Fan the question out to notebooks concurrently with per-notebook deadlines.
+
+    ``ASK_OUTPUT=ndjson`` streams one JSON line per notebook as it answers, then a
+    summary line. Otherwise the answers are merged locally once every notebook is
+    done and printed as a Markdown report (``ASK_OUTPUT=json`` for the JSON form).
+    Returns 1 when no notebook answered.
+    """
+    options = FanoutOptions.from_env(env)
+    output = env.get("ASK_OUTPUT", "text")
+    if output != "ndjson":
+        answers = asyncio.run(fanout_ask_all(question, notebook_ids, options))
+        report = aggregate(question, answers)
+        if output == "json":
+            logger.info(json.dumps(report.to_dict(), indent=2))
+        else:
+            logger.info(report.to_markdown())
+    else:
+        started = time.perf_counter()
+        answers = asyncio.run(
+            fanout_ask_all(question, notebook_ids, options, on_answer=_emit_ndjson),
+        )
+        logger.info(_ndjson_summary(question, answers, (time.perf_counter() - started) * 1000))
+    return 0 if any(answer.status == "ok" for answer in answers) else 1
 
-def ask_all_subagents() -> None:
-    """Query notebooks with subagents when available."""
+
+@tracing.traced("ask-all")
+def _ask_all(*, allow_subagents: bool) -> int:
+    """Query notebooks via the MCP fan-out, or via a Codex prompt as the fallback."""
     env = _base_env()
-    question = env.get("QUESTION", "How can we improve the Codex implementation in this repo?")
+    question = env.get("QUESTION", DEFAULT_QUESTION)
     notebook_ids = env.get("NOTEBOOK_IDS", "")
-    _codex_exec(_prompt_common(question, notebook_ids, allow_subagents=True), env)
+    if _use_direct(env):
+        try:
+            return _ask_all_direct(env, question, notebook_ids)
+        except McpStartError:
+            if env.get("NLM_TRANSPORT") == "direct":
+                raise
+            logger.warning("MCP server failed to start; falling back to Codex.")
+    _codex_exec(_prompt_common(question, notebook_ids, allow_subagents=allow_subagents), env)
+    return 0
 
 
-def ask_all_rpc() -> None:
+def ask_all() -> int:
+    """Query all notebooks."""
+    return _ask_all(allow_subagents=False)
+
+
+def ask_all_subagents() -> int:
+    """Query notebooks with subagents when Codex is the transport."""
+    return _ask_all(allow_subagents=True)
+
+
+def ask_all_rpc() -> int:
     """Query all notebooks via the RPC MCP server."""
-    env = _base_env()
-    question = env.get("QUESTION", "How can we improve the Codex implementation in this repo?")
-    notebook_ids = env.get("NOTEBOOK_IDS", "")
-    _codex_exec(_prompt_common(question, notebook_ids, allow_subagents=False), env)
+    return _ask_all(allow_subagents=False)
 
 
 def _install_skill(skill_url: str, dest_dir: Path) -> None:
@@ -168,10 +310,15 @@ def validate_setup() -> None:
 
     prompt = (
         "Use the notebooklm-patterns skill with notebooklm-rpc. "
-        "If RPC auth is not configured, stop and report the failure. Then list all notebooks"
+        "If RPC auth is not configured, stop and report the failure."
     )
-    if notebook_ids:
-        prompt += f", filter to these notebook IDs (comma-separated): '{notebook_ids}'."
+    hint = _catalog_hint(notebook_ids)
+    if hint:
+        prompt += f" Skip notebook_list; the local notebook catalog resolved: {hint}."
+    else:
+        prompt += " Then list all notebooks"
+        if notebook_ids:
+            prompt += f", filter to these notebook IDs (comma-separated): '{notebook_ids}'."
     prompt += (
         f" Ask each selected notebook (via notebook_id): '{question}'. Aggregate responses labeled "
         "by notebook name and include citations. If any response is off-topic, retry once with a "
@@ -212,11 +359,18 @@ def skill_e2e() -> None:
 
     _init_git_repo(test_root)
 
+    hint = _catalog_hint(notebook_url.rstrip("/").rsplit("/", 1)[-1])
+    if hint:
+        locate = f"Skip notebook_list; the local notebook catalog located {notebook_url}: {hint}. "
+    else:
+        locate = (
+            f"List notebooks and locate {notebook_url} if present. If it is not present, stop "
+            "and report that the notebook was not found. "
+        )
     prompt = (
         "Use the notebooklm-patterns skill with notebooklm-rpc. "
         "If RPC auth is not configured, stop and report the failure. "
-        f"List notebooks and locate {notebook_url} if present. If it is not present, stop and "
-        "report that the notebook was not found. "
+        f"{locate}"
         f"Select {notebook_id}, then ask: 'What is this notebook about?' Return a 3-bullet summary "
         "with citations."
     )
@@ -224,6 +378,7 @@ def skill_e2e() -> None:
     _codex_exec(prompt, env)
 
 
+@tracing.traced("bootstrap-auth")
 def bootstrap_auth() -> None:
     """Force an auth check via the Codex agent."""
     env = _base_env()
@@ -234,7 +389,7 @@ def bootstrap_auth() -> None:
     _codex_exec(prompt, env)
 
 
-def bootstrap_parallel() -> None:
+def bootstrap_parallel() -> int:
     """Run auth and then query all notebooks with subagents."""
     env = _base_env()
     question = env.get(
@@ -243,7 +398,7 @@ def bootstrap_parallel() -> None:
     )
     env["QUESTION"] = question
     bootstrap_auth()
-    ask_all_subagents()
+    return ask_all_subagents()
 
 
 def notebooklm_integration() -> None:
@@ -251,15 +406,28 @@ def notebooklm_integration() -> None:
     env = _base_env()
     env["QUESTION"] = env.get("QUESTION", "Summarize the key sources in this notebook.")
     env["NOTEBOOK_IDS"] = env.get("NOTEBOOK_IDS", "pytest-patterns")
+    hint = _catalog_hint(env["NOTEBOOK_IDS"])
+    if hint:
+        select = f"Skip notebook_list; the local notebook catalog resolved: {hint}. "
+    else:
+        select = (
+            "Then list notebooks and filter to these notebook IDs (comma-separated): "
+            f"'{env['NOTEBOOK_IDS']}'. "
+        )
     prompt = (
         "Use the notebooklm-patterns skill with notebooklm-rpc. "
-        "If RPC auth is not configured, stop and report the failure. Then list notebooks and "
-        "filter to these notebook IDs (comma-separated): '{NOTEBOOK_IDS}'. Ask each selected "
-        "notebook (via notebook_id) this question: '{QUESTION}'. Aggregate responses labeled by "
-        "notebook name and include citations. If any response is off-topic, retry once with a "
-        "narrower prompt that starts with: 'Answer ONLY about: {QUESTION}'. If it still drifts, "
-        "report a likely notebook-content mismatch."
-    ).format(**env)
+        f"If RPC auth is not configured, stop and report the failure. {select}"
+        f"Ask each selected notebook (via notebook_id) this question: '{env['QUESTION']}'. "
+        "Aggregate responses labeled by notebook name and include citations. If any response is "
+        "off-topic, retry once with a narrower prompt that starts with: "
+        f"'Answer ONLY about: {env['QUESTION']}'. If it still drifts, report a likely "
+        "notebook-content mismatch."
+    )
+    skip = _health_hint()
+    if skip:
+        prompt += (
+            f" Skip these notebooks, which keep timing out, and report them as skipped: {skip}."
+        )
     _codex_exec(prompt, env)
 
 
@@ -272,12 +440,9 @@ def auth_rpc() -> None:
     cookie_file = os.environ.get("COOKIE_FILE", "")
 
     if not force_reauth and auth_file.exists() and auth_file.stat().st_size > 0:
-        check_script = ROOT / "tools" / "notebooklm_auth_check_rpc.py"
-        try:
-            _run([sys.executable, str(check_script)])
-        except subprocess.CalledProcessError:
-            pass
-        else:
+        result = check_auth(auth_file)
+        logger.info("Auth check: %s (via %s).", result.reason, result.source)
+        if result.valid:
             return
 
     cmd = ["notebooklm-mcp-auth", "--file"]
@@ -287,12 +452,22 @@ def auth_rpc() -> None:
 
 
 def auth_check_rpc() -> None:
-    """Run the RPC auth health check."""
-    _run([sys.executable, str(ROOT / "tools" / "notebooklm_auth_check_rpc.py")])
+    """Run the RPC auth health check in-process."""
+    if auth_check_main() != 0:
+        raise SystemExit(1)
+
+
+def _configure_logging() -> None:
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
 
 
 def main() -> int:
     """Dispatch Codex task commands."""
+    _configure_logging()
     parser = argparse.ArgumentParser(description="Codex NotebookLM Pixi tasks")
     sub = parser.add_subparsers(dest="command", required=True)
 
@@ -323,8 +498,8 @@ def main() -> int:
         "auth-rpc": auth_rpc,
         "auth-check-rpc": auth_check_rpc,
     }
-    commands[args.command]()
-    return 0
+    with tracing.span(f"codex_tasks {args.command}"):
+        return commands[args.command]() or 0
 
 
 if __name__ == "__main__":
@@ -0,0 +1,284 @@
+"""Speak MCP JSON-RPC over stdio to a configured MCP server."""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import json
+import os
+import shlex
+import shutil
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Self
+
+import rate_limit
+import tracing
+
+ROOT = Path(__file__).resolve().parents[1]
+SERVERS_FILE = ROOT / "mcp-config" / "servers.json"
+DEFAULT_SERVER = "notebooklm-rpc"
+PROTOCOL_VERSION = "2024-11-05"
+CLIENT_INFO = {"name": "notebooklm-claude-integration", "version": "0.1.0"}
+TRANSPORTS = ("auto", "direct", "codex")
+
+
+class McpError(RuntimeError):
+    """Raised when the MCP server returns an error or exits unexpectedly."""
+
+
+class McpStartError(McpError):
+    """Raised when the MCP server cannot be launched or initialized."""
+
+
+@dataclass
+class ToolResult:
+    """Result of a single MCP tool call."""
+
+    tool: str
+    content: list[dict[str, Any]]
+    structured: Any
+    is_error: bool
+    latency_ms: float
+
+    def payload(self) -> Any:  # noqa: ANN401
+        """Return structured content, or text content decoded as JSON when possible."""
+        if self.structured is not None:
+            return self.structured
+        texts = [item.get("text", "") for item in self.content if item.get("type") == "text"]
+        text = "\n".join(texts)
+        try:
+            return json.loads(text)
+        except json.JSONDecodeError:
+            return text
+
+
+def load_server_config(name: str = DEFAULT_SERVER) -> dict[str, Any]:
+    """Load a server definition from mcp-config/servers.json.
+
+    ``NLM_MCP_COMMAND`` replaces the NotebookLM server's command line, e.g. to point
+    the tools at ``tests/fake_notebooklm_mcp.py``.
+    """
+    if not SERVERS_FILE.exists():
+        message = f"Source file not found: {SERVERS_FILE}"
+        raise FileNotFoundError(message)
+    servers = json.loads(SERVERS_FILE.read_text())
+    if name not in servers:
+        message = f"MCP server {name!r} not defined in {SERVERS_FILE}"
+        raise KeyError(message)
+    config = dict(servers[name])
+    override = os.environ.get("NLM_MCP_COMMAND", "")
+    if name == DEFAULT_SERVER and override:
+        command, *args = shlex.split(override)
+        config.update(command=command, args=args)
+    return config
+
+
+def server_command(config: dict[str, Any]) -> list[str]:
+    """Return the argv for a server definition."""
+    return [str(config["command"]), *(str(arg) for arg in config.get("args", []))]
+
+
+def server_env(config: dict[str, Any]) -> dict[str, str]:
+    """Return the process environment for a server, expanding ``${VAR}`` references."""
+    env = os.environ.copy()
+    for key, value in config.get("env", {}).items():
+        env[key] = os.path.expandvars(str(value))
+    return env
+
+
+def resolve_transport(transport: str, command: str) -> str:
+    """Resolve ``auto`` to ``direct`` when the server command is on PATH, else ``codex``."""
+    if transport not in TRANSPORTS:
+        message = f"Unknown transport {transport!r}; expected one of {', '.join(TRANSPORTS)}"
+        raise ValueError(message)
+    if transport != "auto":
+        return transport
+    return "direct" if shutil.which(command) else "codex"
+
+
+class McpStdioClient:
+    """A single MCP session over a child process's stdin/stdout.
+
+    Requests are multiplexed by JSON-RPC id, so concurrent ``call_tool`` awaits
+    share one server process.
+    """
+
+    def __init__(self, command: list[str], env: dict[str, str] | None = None) -> None:
+        """Store the server command; call ``start`` (or use ``async with``) to launch it."""
+        self.command = command
+        self.env = env
+        self._proc: asyncio.subprocess.Process | None = None
+        self._reader: asyncio.Task[None] | None = None
+        self._pending: dict[int, asyncio.Future[dict[str, Any]]] = {}
+        self._next_id = 0
+        self._write_lock = asyncio.Lock()
+        self.server_info: dict[str, Any] = {}
+
+    @classmethod
+    def from_config(cls, name: str = DEFAULT_SERVER) -> Self:
+        """Build a client for a server defined in mcp-config/servers.json."""
+        config = load_server_config(name)
+        return cls(server_command(config), env=server_env(config))
+
+    async def __aenter__(self) -> Self:
+        """Start the server and complete the MCP handshake."""
+        await self.start()
+        return self
+
+    async def __aexit__(self, *_exc: object) -> None:
+        """Shut the server down."""
+        await self.close()
+
+    async def start(self) -> None:
+        """Launch the server process and send ``initialize``."""
+        with tracing.span(f"mcp start {self.command[0]}", "mcp", command=self.command[0]):
+            executable = shutil.which(self.command[0])
+            if executable is None:
+                message = f"MCP server command not found on PATH: {self.command[0]}"
+                raise McpStartError(message)
+            self._proc = await asyncio.create_subprocess_exec(
+                executable,
+                *self.command[1:],
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                env=self.env,
+                limit=2**24,
+            )
+            self._reader = asyncio.create_task(self._read_loop())
+            try:
+                result = await self.request(
+                    "initialize",
+                    {
+                        "protocolVersion": PROTOCOL_VERSION,
+                        "capabilities": {},
+                        "clientInfo": CLIENT_INFO,
+                    },
+                )
+            except McpError as exc:
+                await self.close()
+                message = f"MCP initialize failed for {self.command[0]}: {exc}"
+                raise McpStartError(message) from exc
+            self.server_info = result.get("serverInfo", {})
+            await self._send({"jsonrpc": "2.0", "method": "notifications/initialized"})
+
+    async def close(self) -> None:
+        """Close stdin and wait for the server to exit."""
+        proc = self._proc
+        if proc is None:
+            return
+        self._proc = None
+        if proc.stdin is not None:
+            proc.stdin.close()
+        try:
+            await asyncio.wait_for(proc.wait(), timeout=5)
+        except TimeoutError:
+            proc.kill()
+            await proc.wait()
+        if self._reader is not None:
+            self._reader.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._reader
+        self._fail_pending(McpError("MCP session closed"))
+
+    async def request(
+        self,
+        method: str,
+        params: dict[str, Any] | None = None,
+        *,
+        timeout_s: float | None = None,
+    ) -> dict[str, Any]:
+        """Send a JSON-RPC request and wait for its result."""
+        self._next_id += 1
+        request_id = self._next_id
+        future: asyncio.Future[dict[str, Any]] = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        message: dict[str, Any] = {"jsonrpc": "2.0", "id": request_id, "method": method}
+        if params is not None:
+            message["params"] = params
+        try:
+            await self._send(message)
+            response = await asyncio.wait_for(future, timeout=timeout_s)
+        finally:
+            self._pending.pop(request_id, None)
+        if "error" in response:
+            error = response["error"]
+            message_text = f"{method} failed: {error.get('message', error)}"
+            raise McpError(message_text)
+        return response.get("result", {})
+
+    async def list_tools(self) -> list[dict[str, Any]]:
+        """Return the server's tool definitions."""
+        result = await self.request("tools/list")
+        return result.get("tools", [])
+
+    async def call_tool(
+        self,
+        tool: str,
+        args: dict[str, Any] | None = None,
+        *,
+        timeout_s: float | None = None,
+    ) -> ToolResult:
+        """Call a tool under the shared rate limit and measure its round-trip latency."""
+        limiter = rate_limit.shared_limiter()
+        with tracing.span(tool, "mcp", args_hash=tracing.args_hash(args or {})) as span:
+            queued = time.perf_counter()
+            async with limiter.slot() if limiter else contextlib.nullcontext() as slot:
+                started = time.perf_counter()
+                result = await self.request(
+                    "tools/call",
+                    {"name": tool, "arguments": args or {}},
+                    timeout_s=timeout_s,
+                )
+                latency_ms = (time.perf_counter() - started) * 1000
+                content = result.get("content", [])
+                is_error = bool(result.get("isError"))
+                text = "".join(str(item.get("text", "")) for item in content)
+                if slot is not None and is_error and rate_limit.is_throttle_message(text):
+                    slot.outcome = "throttled"
+            span.set(
+                output_bytes=len(text),
+                is_error=is_error,
+                rate_limit_wait_ms=round((started - queued) * 1000, 3),
+            )
+            if is_error:
+                span.status = "error"
+        return ToolResult(
+            tool=tool,
+            content=content,
+            structured=result.get("structuredContent"),
+            is_error=is_error,
+            latency_ms=latency_ms,
+        )
+
+    async def _send(self, message: dict[str, Any]) -> None:
+        proc = self._proc
+        if proc is None or proc.stdin is None:
+            message_text = "MCP session is not running"
+            raise McpError(message_text)
+        data = json.dumps(message, separators=(",", ":")).encode() + b"\n"
+        async with self._write_lock:
+            proc.stdin.write(data)
+            await proc.stdin.drain()
+
+    async def _read_loop(self) -> None:
+        proc = self._proc
+        if proc is None or proc.stdout is None:
+            return
+        while line := await proc.stdout.readline():
+            try:
+                message = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if "method" in message:
+                continue
+            future = self._pending.get(message.get("id"))
+            if future is not None and not future.done():
+                future.set_result(message)
+        self._fail_pending(McpError("MCP server exited"))
+
+    def _fail_pending(self, exc: Exception) -> None:
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(exc)
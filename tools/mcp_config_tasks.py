@@ -1,4 +1,13 @@
-"""Install MCP server configurations for Claude Desktop and Code."""
+"""Install MCP server configurations for Claude Desktop and Code.
+
+``install-code`` is an idempotent sync: the servers Claude Code already has in
+user scope are read from ``~/.claude.json`` and compared with
+``mcp-config/servers.json``, and only additions and changes reach the
+``claude mcp`` CLI, one call at a time because each rewrites ``~/.claude.json``;
+``claude mcp list`` is then re-read to confirm the result matches the plan.
+Registered servers that are not in ``servers.json`` are left alone unless
+``--prune`` is passed. ``--dry-run`` prints the plan without applying it.
+"""
 
 from __future__ import annotations
 
@@ -7,17 +16,24 @@ import contextlib
 import json
 import logging
 import os
+import re
 import shutil
 import subprocess
 import sys
+from dataclasses import dataclass, field
 from datetime import UTC, datetime
 from pathlib import Path
 
+import tracing
+
 logger = logging.getLogger(__name__)
 
 ROOT = Path(__file__).resolve().parents[1]
 CONFIG_DIR = ROOT / "mcp-config"
 SOURCE_FILE = CONFIG_DIR / "servers.json"
+STDIO_DEFAULTS: dict[str, object] = {"type": "stdio", "args": [], "env": {}}
+# ``claude mcp list`` prints one ``<name>: <command or url> - <health>`` line per server.
+LIST_LINE = re.compile(r"^([^\s:]+): ", re.MULTILINE)
 
 
 def _load_servers() -> dict[str, dict[str, object]]:
@@ -29,8 +45,8 @@ def _load_servers() -> dict[str, dict[str, object]]:
 
 
 def _run(cmd: list[str]) -> None:
-    """Run a CLI command."""
-    subprocess.run(cmd, check=True)  # noqa: S603
+    """Run a traced CLI command."""
+    tracing.run(cmd, check=True, capture_output=True, text=True)
 
 
 def _desktop_config_path() -> Path:
@@ -52,74 +68,242 @@ def _desktop_config_path() -> Path:
     return Path.home() / ".config" / "Claude" / "claude_desktop_config.json"
 
 
-def install_desktop() -> None:
+def install_desktop(*, dry_run: bool = False) -> None:
     """Write MCP configs to the Claude Desktop config file."""
     logging.basicConfig(level=logging.INFO, format="%(message)s")
     servers = _load_servers()
     config_path = _desktop_config_path()
-    config_path.parent.mkdir(parents=True, exist_ok=True)
+    payload = {"mcpServers": servers}
+
+    if config_path.exists():
+        with contextlib.suppress(json.JSONDecodeError):
+            if json.loads(config_path.read_text()) == payload:
+                logger.info("Claude Desktop config already up to date: %s", config_path)
+                return
+    if dry_run:
+        logger.info("Would install %s MCP servers to %s", len(servers), config_path)
+        return
 
+    config_path.parent.mkdir(parents=True, exist_ok=True)
     if config_path.exists():
         stamp = datetime.now(UTC).strftime("%Y%m%d_%H%M%S")
         backup = config_path.with_suffix(f".backup.{stamp}")
         shutil.copy2(config_path, backup)
         logger.info("Created backup: %s", backup)
 
-    payload = {"mcpServers": servers}
     config_path.write_text(json.dumps(payload, indent=2))
     logger.info("Installed %s MCP servers to %s", len(servers), config_path)
 
 
-def install_code() -> None:
-    """Register MCP servers with the Claude Code CLI."""
+def _claude_config_path() -> Path:
+    """Return the Claude Code config file that holds user-scoped MCP servers."""
+    config_dir = os.environ.get("CLAUDE_CONFIG_DIR")
+    return Path(config_dir) / ".claude.json" if config_dir else Path.home() / ".claude.json"
+
+
+def _registered_servers() -> dict[str, dict[str, object]] | None:
+    """Return the user-scoped servers Claude Code has registered, or None if unreadable."""
+    path = _claude_config_path()
+    if not path.exists():
+        return {}
+    try:
+        data = json.loads(path.read_text())
+    except (OSError, json.JSONDecodeError) as exc:
+        logger.warning("Could not read %s (%s); re-registering every server", path, exc)
+        return None
+    servers = data.get("mcpServers") if isinstance(data, dict) else None
+    return servers if isinstance(servers, dict) else {}
+
+
+def _code_payload(server_config: dict[str, object]) -> dict[str, object]:
+    """Return the ``add-json`` payload for a server definition."""
+    payload = dict(server_config)
+    payload.pop("description", None)
+    return payload
+
+
+def _normalized(config: dict[str, object]) -> dict[str, object]:
+    """Fill the fields ``claude mcp add-json`` adds to stdio servers when it stores them."""
+    config = _code_payload(config)
+    if "command" in config:
+        for key, value in STDIO_DEFAULTS.items():
+            config.setdefault(key, value)
+    return config
+
+
+@dataclass
+class SyncPlan:
+    """Differences between ``servers.json`` and the servers Claude Code has registered."""
+
+    add: list[str] = field(default_factory=list)
+    change: list[str] = field(default_factory=list)
+    remove: list[str] = field(default_factory=list)
+    unchanged: list[str] = field(default_factory=list)
+    unmanaged: list[str] = field(default_factory=list)
+
+    def actions(self) -> list[tuple[str, str]]:
+        """Return ``(action, name)`` pairs that need a CLI call."""
+        return [
+            *(("add", name) for name in self.add),
+            *(("change", name) for name in self.change),
+            *(("remove", name) for name in self.remove),
+        ]
+
+    def summary(self) -> str:
+        """Describe the plan in one line."""
+        return (
+            f"{len(self.add)} to add, {len(self.change)} to change, "
+            f"{len(self.remove)} to remove, {len(self.unchanged)} unchanged"
+        )
+
+
+def plan_sync(
+    desired: dict[str, dict[str, object]],
+    registered: dict[str, dict[str, object]] | None,
+    *,
+    prune: bool = False,
+) -> SyncPlan:
+    """Compare desired and registered servers; None for ``registered`` replaces all."""
+    plan = SyncPlan()
+    for name, config in desired.items():
+        if registered is None:
+            plan.change.append(name)
+        elif name not in registered:
+            plan.add.append(name)
+        elif _normalized(registered[name]) != _normalized(config):
+            plan.change.append(name)
+        else:
+            plan.unchanged.append(name)
+    for name in sorted(set(registered or {}) - set(desired)):
+        (plan.remove if prune else plan.unmanaged).append(name)
+    return plan
+
+
+def _log_plan(plan: SyncPlan, servers: dict[str, dict[str, object]]) -> None:
+    logger.info("Claude Code MCP servers: %s", plan.summary())
+    markers = {"add": "+", "change": "~", "remove": "-"}
+    for action, name in plan.actions():
+        desc = servers.get(name, {}).get("description", "")
+        logger.info("  %s %s%s", markers[action], name, f": {desc}" if desc else "")
+    for name in plan.unmanaged:
+        logger.info("  = %s (not in servers.json; kept, pass --prune to remove)", name)
+
+
+def _apply(claude_path: str, action: str, name: str, server_config: dict[str, object]) -> None:
+    """Run the CLI calls for one planned action."""
+    if action == "change":
+        with contextlib.suppress(subprocess.CalledProcessError):
+            _run([claude_path, "mcp", "remove", name, "--scope", "user"])
+    elif action == "remove":
+        _run([claude_path, "mcp", "remove", name, "--scope", "user"])
+        return
+    _run(
+        [
+            claude_path,
+            "mcp",
+            "add-json",
+            name,
+            json.dumps(_code_payload(server_config)),
+            "--scope",
+            "user",
+        ],
+    )
+
+
+def _listed_servers(claude_path: str) -> set[str]:
+    """Return the server names ``claude mcp list`` reports."""
+    result = tracing.run(
+        [claude_path, "mcp", "list"],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    return {match.group(1) for match in LIST_LINE.finditer(result.stdout)}
+
+
+def _verify(
+    claude_path: str,
+    plan: SyncPlan,
+    servers: dict[str, dict[str, object]],
+    *,
+    prune: bool,
+) -> list[str]:
+    """Re-read what Claude Code has registered; return the names that do not match the plan."""
+    listed = _listed_servers(claude_path)
+    wrong = [name for name in (*plan.add, *plan.change) if name not in listed]
+    wrong += [name for name in plan.remove if name in listed]
+    registered = _registered_servers()
+    if registered is not None:
+        wrong += [name for _, name in plan_sync(servers, registered, prune=prune).actions()]
+    return sorted(set(wrong))
+
+
+def install_code(*, dry_run: bool = False, prune: bool = False) -> None:
+    """Sync MCP servers registered with the Claude Code CLI to ``servers.json``."""
     logging.basicConfig(level=logging.INFO, format="%(message)s")
     servers = _load_servers()
+    plan = plan_sync(servers, _registered_servers(), prune=prune)
+    _log_plan(plan, servers)
+    actions = plan.actions()
+    if dry_run or not actions:
+        return
+
     claude_path = shutil.which("claude")
     if claude_path is None:
         message = "Claude Code CLI not found. Install with: npm install -g @anthropic/claude-code"
         raise RuntimeError(message)
 
-    for name, server_config in servers.items():
-        config_payload = dict(server_config)
-        config_payload.pop("description", None)
-        with contextlib.suppress(subprocess.CalledProcessError):
-            _run([claude_path, "mcp", "remove", name])
-        _run(
-            [
-                claude_path,
-                "mcp",
-                "add-json",
-                name,
-                json.dumps(config_payload),
-                "--scope",
-                "user",
-            ],
+    # Every ``claude mcp`` write rewrites ~/.claude.json, so the calls run one at a time.
+    failures = []
+    for action, name in actions:
+        try:
+            _apply(claude_path, action, name, servers.get(name, {}))
+        except subprocess.CalledProcessError as exc:
+            failures.append(name)
+            logger.error("Failed to %s %s: %s", action, name, (exc.stderr or "").strip())  # noqa: TRY400
+        else:
+            logger.info("%s %s", "Removed" if action == "remove" else "Installed", name)
+    if failures:
+        message = f"Could not sync MCP servers: {', '.join(failures)}"
+        raise RuntimeError(message)
+    mismatched = _verify(claude_path, plan, servers, prune=prune)
+    if mismatched:
+        message = (
+            f"Registered MCP servers do not match the plan after sync: {', '.join(mismatched)}"
         )
-        desc = servers.get(name, {}).get("description", "No description")
-        logger.info("Installed %s: %s", name, desc)
+        raise RuntimeError(message)
 
 
-def update_all() -> None:
+def update_all(*, dry_run: bool = False, prune: bool = False) -> None:
     """Install MCP configs for both Desktop and Code."""
-    install_desktop()
-    install_code()
+    install_desktop(dry_run=dry_run)
+    install_code(dry_run=dry_run, prune=prune)
 
 
 def main() -> int:
     """Parse CLI args and execute the requested task."""
     parser = argparse.ArgumentParser(description="MCP config tasks")
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--dry-run", action="store_true", help="Print the plan only.")
+    sync = argparse.ArgumentParser(add_help=False, parents=[common])
+    sync.add_argument(
+        "--prune",
+        action="store_true",
+        help="Remove registered servers that are not in servers.json.",
+    )
     sub = parser.add_subparsers(dest="command", required=True)
-    sub.add_parser("install-desktop")
-    sub.add_parser("install-code")
-    sub.add_parser("update-all")
+    sub.add_parser("install-desktop", parents=[common])
+    sub.add_parser("install-code", parents=[sync])
+    sub.add_parser("update-all", parents=[sync])
 
     args = parser.parse_args()
-    if args.command == "install-desktop":
-        install_desktop()
-    elif args.command == "install-code":
-        install_code()
-    elif args.command == "update-all":
-        update_all()
+    with tracing.span(f"mcp_config_tasks {args.command}"):
+        if args.command == "install-desktop":
+            install_desktop(dry_run=args.dry_run)
+        elif args.command == "install-code":
+            install_code(dry_run=args.dry_run, prune=args.prune)
+        elif args.command == "update-all":
+            update_all(dry_run=args.dry_run, prune=args.prune)
     return 0
 
 
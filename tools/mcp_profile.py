@@ -0,0 +1,237 @@
+"""Profile MCP server startup and prefetch ``npx`` packages.
+
+Each server in ``mcp-config/servers.json`` is launched locally and timed to a
+successful ``initialize`` and ``tools/list``. Servers started with ``npx`` are
+first launched cold, against an empty temporary npm cache, then their package is
+prefetched into the real cache with ``npm exec --yes`` and they are launched
+again warm, so the report shows how much of the first-session startup the
+prefetch removes. Other servers are simply launched twice.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any
+
+import tracing
+from mcp_client import (
+    SERVERS_FILE,
+    McpError,
+    McpStdioClient,
+    load_server_config,
+    server_command,
+    server_env,
+)
+
+logger = logging.getLogger("mcp_profile")
+
+DEFAULT_TIMEOUT_S = 120.0
+NPX_COMMANDS = {"npx", "npx.cmd"}
+
+
+@dataclass
+class Startup:
+    """One launch: time to ``initialize`` and to ``tools/list``, from process start."""
+
+    initialize_ms: float | None = None
+    tools_list_ms: float | None = None
+    tools: int = 0
+    error: str = ""
+
+
+@dataclass
+class ServerProfile:
+    """Cold and warm startup for one configured server."""
+
+    name: str
+    command: list[str]
+    package: str = ""
+    cold: Startup = field(default_factory=Startup)
+    warm: Startup = field(default_factory=Startup)
+    prefetch_ms: float | None = None
+    prefetch_error: str = ""
+
+
+def npx_package(config: dict[str, Any]) -> str:
+    """Return the package an ``npx`` server runs, or "" for other commands."""
+    if str(config.get("command", "")) not in NPX_COMMANDS:
+        return ""
+    for arg in config.get("args", []):
+        text = str(arg)
+        if text.startswith("--package="):
+            return text.split("=", 1)[1]
+        if not text.startswith("-"):
+            return text
+    return ""
+
+
+async def measure_startup(
+    command: list[str],
+    env: dict[str, str],
+    timeout_s: float = DEFAULT_TIMEOUT_S,
+) -> Startup:
+    """Launch a server, time ``initialize`` and ``tools/list``, then shut it down."""
+    startup = Startup()
+    client = McpStdioClient(command, env=env)
+    started = time.perf_counter()
+    try:
+        await asyncio.wait_for(client.start(), timeout=timeout_s)
+        startup.initialize_ms = (time.perf_counter() - started) * 1000
+        remaining = max(0.0, timeout_s - startup.initialize_ms / 1000)
+        tools = await asyncio.wait_for(client.list_tools(), timeout=remaining)
+        startup.tools_list_ms = (time.perf_counter() - started) * 1000
+        startup.tools = len(tools)
+    except TimeoutError:
+        startup.error = f"timed out after {timeout_s:g}s"
+    except (McpError, OSError) as exc:
+        startup.error = str(exc)
+    finally:
+        await client.close()
+    return startup
+
+
+def prefetch(package: str, timeout_s: float = DEFAULT_TIMEOUT_S) -> tuple[float, str]:
+    """Install ``package`` into the npm cache the way ``npx -y`` would, without starting it."""
+    npm = shutil.which("npm")
+    if npm is None:
+        return 0.0, "npm not found on PATH"
+    started = time.perf_counter()
+    error = ""
+    try:
+        tracing.run(
+            [npm, "exec", "--yes", f"--package={package}", "--", "node", "--version"],
+            check=True,
+            capture_output=True,
+            text=True,
+            timeout=timeout_s,
+        )
+    except subprocess.CalledProcessError as exc:
+        lines = (exc.stderr or "").strip().splitlines()
+        error = lines[0] if lines else f"npm exited with {exc.returncode}"
+    except subprocess.TimeoutExpired:
+        error = f"timed out after {timeout_s:g}s"
+    return (time.perf_counter() - started) * 1000, error
+
+
+async def profile_server(
+    name: str,
+    *,
+    cold: bool = True,
+    timeout_s: float = DEFAULT_TIMEOUT_S,
+) -> ServerProfile:
+    """Profile one server: cold launch, prefetch (``npx`` only), warm launch."""
+    config = load_server_config(name)
+    command = server_command(config)
+    env = server_env(config)
+    profile = ServerProfile(name=name, command=command, package=npx_package(config))
+    with tracing.span(f"mcp_profile {name}", "task", command=command[0]):
+        if cold:
+            if profile.package:
+                with tempfile.TemporaryDirectory(prefix="mcp-profile-npm-") as cache:
+                    cold_env = {**env, "npm_config_cache": cache}
+                    profile.cold = await measure_startup(command, cold_env, timeout_s)
+            else:
+                profile.cold = await measure_startup(command, env, timeout_s)
+        if profile.package:
+            profile.prefetch_ms, profile.prefetch_error = await asyncio.to_thread(
+                prefetch,
+                profile.package,
+                timeout_s,
+            )
+        profile.warm = await measure_startup(command, env, timeout_s)
+    return profile
+
+
+def _format_ms(value: float | None) -> str:
+    return "-" if value is None else f"{value:.0f}"
+
+
+def _format_startup(startup: Startup) -> str:
+    if startup.error:
+        return f"error: {startup.error}"
+    return (
+        f"initialize {_format_ms(startup.initialize_ms)} ms, "
+        f"tools/list {_format_ms(startup.tools_list_ms)} ms ({startup.tools} tools)"
+    )
+
+
+def _log_profile(profile: ServerProfile, *, cold: bool) -> None:
+    logger.info("%s: %s", profile.name, " ".join(profile.command))
+    if cold:
+        logger.info("  cold:     %s", _format_startup(profile.cold))
+    if profile.package:
+        result = f"error: {profile.prefetch_error}" if profile.prefetch_error else "ok"
+        logger.info(
+            "  prefetch: %s in %s ms (%s)",
+            profile.package,
+            _format_ms(profile.prefetch_ms),
+            result,
+        )
+    logger.info("  warm:     %s", _format_startup(profile.warm))
+    if cold and profile.cold.tools_list_ms is not None and profile.warm.tools_list_ms is not None:
+        saved = profile.cold.tools_list_ms - profile.warm.tools_list_ms
+        logger.info("  saved:    %s ms", _format_ms(saved))
+
+
+def _configure_logging() -> None:
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+async def _run(names: list[str], *, cold: bool, timeout_s: float, as_json: bool) -> int:
+    failed = 0
+    for name in names:
+        profile = await profile_server(name, cold=cold, timeout_s=timeout_s)
+        failed += bool(profile.warm.error)
+        if as_json:
+            logger.info(json.dumps(asdict(profile)))
+        else:
+            _log_profile(profile, cold=cold)
+    return 1 if failed else 0
+
+
+def main() -> int:
+    """Profile cold and warm startup of the configured MCP servers."""
+    _configure_logging()
+    parser = argparse.ArgumentParser(description="MCP server startup profiler")
+    parser.add_argument("servers", nargs="*", help="Server names (default: all in servers.json).")
+    parser.add_argument(
+        "--warm-only",
+        action="store_true",
+        help="Skip the cold launch; prefetch and time the warm start only.",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=float(os.environ.get("MCP_PROFILE_TIMEOUT", DEFAULT_TIMEOUT_S)),
+        help="Seconds to wait for each launch to answer tools/list.",
+    )
+    parser.add_argument("--json", action="store_true", help="Print one JSON profile per server.")
+    args = parser.parse_args()
+
+    configured = list(json.loads(SERVERS_FILE.read_text()))
+    unknown = sorted(set(args.servers) - set(configured))
+    if unknown:
+        parser.error(f"not in {SERVERS_FILE.name}: {', '.join(unknown)}")
+    names = args.servers or configured
+    with tracing.span("mcp_profile"):
+        return asyncio.run(
+            _run(names, cold=not args.warm_only, timeout_s=args.timeout, as_json=args.json),
+        )
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
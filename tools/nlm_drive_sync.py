@@ -0,0 +1,282 @@
+"""Sync only the Drive sources that changed since the last sync.
+
+``source_list_drive`` is read for each selected notebook and every Drive source's
+revision/modified-time fingerprint is compared with ``drive_index.json`` in the
+state directory. Sources whose fingerprint moved, that the server flags as
+stale, or that have never been synced are passed to ``source_sync_drive`` in
+batches; the rest are skipped.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sys
+import time
+from dataclasses import asdict, dataclass
+from typing import TYPE_CHECKING, Any
+
+from mcp_client import DEFAULT_SERVER, McpError, McpStdioClient
+from nlm_state import state_dir
+from notebook_catalog import NotebookCatalog, force_refresh_requested
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+logger = logging.getLogger("nlm_drive_sync")
+
+DEFAULT_BATCH_SIZE = 20
+DEFAULT_CONCURRENCY = 4
+FINGERPRINT_FIELDS = (
+    "revision",
+    "revision_id",
+    "version",
+    "modified_at",
+    "modifiedTime",
+    "last_modified",
+)
+
+
+@dataclass
+class SyncReport:
+    """Counts for one differential sync."""
+
+    notebooks: int = 0
+    drive_sources: int = 0
+    changed: int = 0
+    synced: int = 0
+    skipped: int = 0
+    failed: int = 0
+    failed_notebooks: int = 0
+
+
+def drive_sources(payload: Any) -> list[dict[str, Any]]:  # noqa: ANN401
+    """Return the source dicts from a ``source_list_drive`` payload."""
+    items = payload.get("sources", []) if isinstance(payload, dict) else payload
+    return [item for item in items or [] if isinstance(item, dict)]
+
+
+def source_id(source: dict[str, Any]) -> str:
+    """Return a Drive source's ID."""
+    return str(source.get("id") or source.get("source_id") or "")
+
+
+def fingerprint(source: dict[str, Any]) -> str:
+    """Hash the revision and modification fields the server reports for a source."""
+    fields = {key: source[key] for key in FINGERPRINT_FIELDS if source.get(key) is not None}
+    return hashlib.sha256(json.dumps(fields, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def flagged_stale(source: dict[str, Any]) -> bool:
+    """Return True when the server itself marks the source as out of date."""
+    if source.get("stale") or source.get("is_stale") or source.get("needs_sync"):
+        return True
+    return source.get("is_fresh") is False or source.get("fresh") is False
+
+
+class DriveIndex:
+    """Last-synced fingerprint per Drive source, stored as JSON."""
+
+    def __init__(self, path: Path | None = None) -> None:
+        """Load the index if it exists."""
+        self.path = path or state_dir() / "drive_index.json"
+        self.sources: dict[str, dict[str, Any]] = {}
+        if self.path.exists():
+            try:
+                self.sources = json.loads(self.path.read_text()).get("sources", {})
+            except json.JSONDecodeError:
+                self.sources = {}
+
+    def changed(self, source: dict[str, Any]) -> bool:
+        """Return True when ``source`` needs a sync."""
+        entry = self.sources.get(source_id(source))
+        return entry is None or entry["fingerprint"] != fingerprint(source) or flagged_stale(source)
+
+    def record(self, notebook_id: str, source: dict[str, Any]) -> None:
+        """Remember a source's current fingerprint."""
+        self.sources[source_id(source)] = {
+            "notebook_id": notebook_id,
+            "title": source.get("title", ""),
+            "fingerprint": fingerprint(source),
+            "synced_at": time.time(),
+        }
+
+    def forget_missing(self, notebook_id: str, listed: set[str]) -> None:
+        """Drop entries for a notebook's sources that are no longer listed."""
+        for sid in [
+            sid
+            for sid, entry in self.sources.items()
+            if entry["notebook_id"] == notebook_id and sid not in listed
+        ]:
+            del self.sources[sid]
+
+    def save(self) -> None:
+        """Write the index atomically."""
+        tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps({"sources": self.sources}, indent=2))
+        tmp.replace(self.path)
+
+
+async def _list_drive(client: McpStdioClient, notebook_id: str) -> list[dict[str, Any]]:
+    result = await client.call_tool("source_list_drive", {"notebook_id": notebook_id})
+    if result.is_error:
+        message = f"source_list_drive failed for {notebook_id}: {result.payload()}"
+        raise McpError(message)
+    return drive_sources(result.payload())
+
+
+class DriveSync:
+    """Diff and sync Drive sources over one MCP session, updating a shared index."""
+
+    def __init__(
+        self,
+        client: McpStdioClient,
+        index: DriveIndex,
+        *,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        dry_run: bool = False,
+    ) -> None:
+        """Bind the session and index; ``dry_run`` only diffs."""
+        self.client = client
+        self.index = index
+        self.batch_size = max(1, batch_size)
+        self.dry_run = dry_run
+        self.report = SyncReport()
+
+    async def _sync_batches(self, notebook_id: str, source_ids: list[str]) -> set[str]:
+        """Sync ``source_ids`` in batches and return the IDs that synced."""
+        synced: set[str] = set()
+        for start in range(0, len(source_ids), self.batch_size):
+            batch = source_ids[start : start + self.batch_size]
+            result = await self.client.call_tool(
+                "source_sync_drive",
+                {"source_ids": batch, "confirm": True},
+            )
+            if result.is_error:
+                self.report.failed += len(batch)
+                logger.error("source_sync_drive failed for %s: %s", notebook_id, result.payload())
+                continue
+            self.report.synced += len(batch)
+            synced.update(batch)
+        return synced
+
+    async def sync_notebook(self, notebook: dict[str, Any]) -> None:
+        """Diff one notebook's Drive sources against the index and sync the changed ones."""
+        notebook_id = notebook["id"]
+        sources = await _list_drive(self.client, notebook_id)
+        self.index.forget_missing(notebook_id, {source_id(source) for source in sources})
+        changed = [source_id(source) for source in sources if self.index.changed(source)]
+        self.report.notebooks += 1
+        self.report.drive_sources += len(sources)
+        self.report.changed += len(changed)
+        self.report.skipped += len(sources) - len(changed)
+        if changed:
+            logger.info(
+                "%s: %d of %d Drive sources changed.",
+                notebook["title"],
+                len(changed),
+                len(sources),
+            )
+        if self.dry_run or not changed:
+            return
+        synced = await self._sync_batches(notebook_id, changed)
+        if synced:
+            # Record post-sync fingerprints, since syncing can itself bump modification times.
+            for source in await _list_drive(self.client, notebook_id):
+                if source_id(source) in synced and not flagged_stale(source):
+                    self.index.record(notebook_id, source)
+
+
+async def differential_sync(
+    client: McpStdioClient,
+    notebooks: list[dict[str, Any]],
+    *,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    dry_run: bool = False,
+) -> SyncReport:
+    """Sync changed Drive sources across ``notebooks``."""
+    index = DriveIndex()
+    sync = DriveSync(client, index, batch_size=batch_size, dry_run=dry_run)
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def one(notebook: dict[str, Any]) -> None:
+        async with semaphore:
+            try:
+                await sync.sync_notebook(notebook)
+            except (McpError, TimeoutError) as exc:
+                error = str(exc) or type(exc).__name__
+            else:
+                return
+            sync.report.failed_notebooks += 1
+            logger.error("Drive sync for %s failed: %s", notebook["title"], error)
+
+    try:
+        await asyncio.gather(*(one(notebook) for notebook in notebooks))
+    finally:
+        if not dry_run:
+            index.save()
+    return sync.report
+
+
+async def _run(parsed: argparse.Namespace) -> SyncReport:
+    async with McpStdioClient.from_config(parsed.server) as client:
+        catalog = NotebookCatalog.from_env()
+        async with catalog.ensured(client, force=force_refresh_requested()):
+            return await differential_sync(
+                client,
+                catalog.select(parsed.notebooks),
+                batch_size=parsed.batch_size,
+                concurrency=parsed.concurrency,
+                dry_run=parsed.dry_run,
+            )
+
+
+def _configure_logging() -> None:
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+def main() -> int:
+    """Run a differential Drive sync."""
+    _configure_logging()
+    parser = argparse.ArgumentParser(description="Differential NotebookLM Drive sync")
+    parser.add_argument(
+        "--notebooks",
+        default=os.environ.get("NOTEBOOK_IDS", ""),
+        help="Comma-separated notebook IDs or titles (default: all).",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=int(os.environ.get("NLM_DRIVE_SYNC_BATCH", DEFAULT_BATCH_SIZE)),
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=int(os.environ.get("NLM_DRIVE_SYNC_CONCURRENCY", DEFAULT_CONCURRENCY)),
+    )
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would sync.")
+    parser.add_argument("--server", default=DEFAULT_SERVER)
+    parsed = parser.parse_args()
+
+    confirmed = os.environ.get("NLM_CONFIRM") == "1"
+    if not confirmed:
+        parsed.dry_run = True
+    report = asyncio.run(_run(parsed))
+    logger.info(json.dumps(asdict(report)))
+    if not confirmed and report.changed:
+        logger.error("source_sync_drive requires confirmation. Re-run with NLM_CONFIRM=1.")
+        return 1
+    return 1 if report.failed or report.failed_notebooks else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,225 @@
+"""Query many NotebookLM notebooks concurrently over one MCP session."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import asdict, dataclass, replace
+from typing import TYPE_CHECKING, Any
+
+from answer_cache import AnswerCache
+from mcp_client import DEFAULT_SERVER, McpError, McpStdioClient
+from notebook_catalog import NotebookCatalog, force_refresh_requested
+from notebook_health import HealthStore
+from session_pool import SessionPool, pooled_query
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+DEFAULT_CONCURRENCY = 4
+DEFAULT_TIMEOUT_S = 120.0
+DEFAULT_RETRIES = 1
+
+
+@dataclass
+class NotebookAnswer:
+    """Outcome of one notebook's ``notebook_query``."""
+
+    notebook_id: str
+    title: str
+    status: str
+    answer: str = ""
+    citations: list[Any] | None = None
+    error: str = ""
+    attempts: int = 0
+    elapsed_ms: float = 0.0
+    cached: bool = False
+    matched_question: str = ""
+    similarity: float | None = None
+
+    def to_dict(self) -> dict[str, Any]:
+        """Return a JSON-serializable view."""
+        return asdict(self)
+
+
+@dataclass
+class FanoutOptions:
+    """Tuning knobs for a multi-notebook query."""
+
+    concurrency: int = DEFAULT_CONCURRENCY
+    timeout_s: float = DEFAULT_TIMEOUT_S
+    retries: int = DEFAULT_RETRIES
+
+    @classmethod
+    def from_env(cls, env: dict[str, str]) -> FanoutOptions:
+        """Read ``ASK_CONCURRENCY``, ``ASK_TIMEOUT`` and ``ASK_RETRIES``."""
+        return cls(
+            concurrency=int(env.get("ASK_CONCURRENCY", DEFAULT_CONCURRENCY)),
+            timeout_s=float(env.get("ASK_TIMEOUT", DEFAULT_TIMEOUT_S)),
+            retries=int(env.get("ASK_RETRIES", DEFAULT_RETRIES)),
+        )
+
+
+def _answer_fields(payload: Any) -> tuple[str, list[Any] | None]:  # noqa: ANN401
+    if isinstance(payload, dict):
+        citations = payload.get("citations") or payload.get("sources_used")
+        return str(payload.get("answer", "")), citations
+    return str(payload), None
+
+
+def _near_duplicate_fields(payload: Any) -> tuple[str, float | None]:  # noqa: ANN401
+    """Return the cached question a near-duplicate hit was answered for, and its similarity."""
+    if isinstance(payload, dict) and payload.get("matched_question"):
+        similarity = payload.get("similarity")
+        return str(payload["matched_question"]), (
+            float(similarity) if isinstance(similarity, int | float) else None
+        )
+    return "", None
+
+
+async def query_notebook(  # noqa: PLR0913
+    client: McpStdioClient,
+    notebook: dict[str, str],
+    question: str,
+    options: FanoutOptions,
+    *,
+    cache: AnswerCache | None = None,
+    sessions: SessionPool | None = None,
+) -> NotebookAnswer:
+    """Ask one notebook, retrying timeouts up to ``options.retries`` times."""
+    started = time.perf_counter()
+    result = NotebookAnswer(notebook_id=notebook["id"], title=notebook["title"], status="timeout")
+    args = {"notebook_id": notebook["id"], "question": question}
+    while result.attempts <= options.retries:
+        result.attempts += 1
+        try:
+            payload, is_error, result.cached = await pooled_query(
+                client,
+                cache,
+                sessions,
+                args,
+                timeout_s=options.timeout_s,
+            )
+        except TimeoutError:
+            result.status = "timeout"
+            result.error = f"no answer within {options.timeout_s:.0f}s"
+            continue
+        except McpError as exc:
+            result.status = "error"
+            result.error = str(exc)
+            break
+        if is_error:
+            result.status = "error"
+            result.error = str(payload)
+            break
+        result.status = "ok"
+        result.error = ""
+        result.answer, result.citations = _answer_fields(payload)
+        result.matched_question, result.similarity = _near_duplicate_fields(payload)
+        break
+    result.elapsed_ms = (time.perf_counter() - started) * 1000
+    return result
+
+
+async def ask_notebooks(  # noqa: PLR0913
+    client: McpStdioClient,
+    notebooks: list[dict[str, str]],
+    question: str,
+    options: FanoutOptions,
+    *,
+    cache: AnswerCache | None = None,
+    health: HealthStore | None = None,
+    sessions: SessionPool | None = None,
+    on_answer: Callable[[NotebookAnswer], None] | None = None,
+) -> list[NotebookAnswer]:
+    """Query notebooks with at most ``options.concurrency`` requests in flight.
+
+    Results are returned in the order of ``notebooks``; ``on_answer`` is called
+    with each one as soon as it arrives. With a ``health`` store, notebooks whose
+    circuit is open come back as ``skipped`` without a query, and recently slow
+    ones get no retries (see ``notebook_health``). ``sessions`` carries each
+    notebook's warm chat session between questions (see ``session_pool``).
+    """
+    semaphore = asyncio.Semaphore(max(1, options.concurrency))
+
+    async def _query_with_health(notebook: dict[str, str]) -> NotebookAnswer:
+        planned = options
+        if health is not None:
+            plan = health.plan(notebook["id"], options.timeout_s, options.retries)
+            if plan.skip:
+                return NotebookAnswer(
+                    notebook_id=notebook["id"],
+                    title=notebook["title"],
+                    status="skipped",
+                    error=plan.reason,
+                )
+            planned = replace(options, timeout_s=plan.timeout_s, retries=plan.retries)
+        async with semaphore:
+            answer = await query_notebook(
+                client,
+                notebook,
+                question,
+                planned,
+                cache=cache,
+                sessions=sessions,
+            )
+        if health is not None and not answer.cached:
+            health.record(
+                notebook["id"],
+                title=notebook["title"],
+                status=answer.status,
+                elapsed_ms=answer.elapsed_ms,
+                error=answer.error,
+            )
+        return answer
+
+    async def _bounded(notebook: dict[str, str]) -> NotebookAnswer:
+        answer = await _query_with_health(notebook)
+        if on_answer is not None:
+            on_answer(answer)
+        return answer
+
+    return list(await asyncio.gather(*(_bounded(notebook) for notebook in notebooks)))
+
+
+async def ask_all(
+    question: str,
+    notebook_ids: str,
+    options: FanoutOptions,
+    *,
+    server: str = DEFAULT_SERVER,
+    on_answer: Callable[[NotebookAnswer], None] | None = None,
+) -> list[NotebookAnswer]:
+    """Resolve notebooks from the local catalog, then fan ``question`` out to them.
+
+    The catalog is only refreshed via ``notebook_list`` when it is stale (in the
+    background while queries run) or ``NLM_CATALOG_REFRESH=1``. Answers go through
+    the on-disk answer cache unless ``NLM_CACHE=0``, and per-notebook circuit
+    breaker state is updated unless ``NLM_BREAKER=0``. With ``NLM_REUSE_SESSION=1``
+    each notebook is asked in its warm chat session.
+    """
+    cache = AnswerCache.from_env()
+    health = HealthStore.from_env()
+    sessions = SessionPool.from_env()
+    catalog = NotebookCatalog.from_env()
+    async with (
+        McpStdioClient.from_config(server) as client,
+        catalog.ensured(client, force=force_refresh_requested()),
+    ):
+        notebooks = catalog.select(notebook_ids)
+        try:
+            return await ask_notebooks(
+                client,
+                notebooks,
+                question,
+                options,
+                cache=cache,
+                health=health,
+                sessions=sessions,
+                on_answer=on_answer,
+            )
+        finally:
+            if cache is not None:
+                cache.close()
+            if health is not None:
+                health.save()
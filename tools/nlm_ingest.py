@@ -0,0 +1,305 @@
+"""Bulk-add text files or URLs to a notebook, skipping anything already ingested.
+
+Every input is hashed (normalized text content, or a canonical URL). Inputs that
+repeat, that the checkpoint already records for the notebook, or whose URL or
+title is already among the notebook's sources are skipped (a title only counts
+when the checkpoint has no entry for it, so edited files are added again by
+their new content hash); the rest are added
+with bounded concurrency. Each added source is appended to
+``ingest/<notebook_id>.jsonl`` in the state directory, so a failed run resumes
+by simply running it again.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+from urllib.parse import urlsplit, urlunsplit
+
+from mcp_client import DEFAULT_SERVER, McpError, McpStdioClient
+from nlm_state import state_dir
+from notebook_catalog import NotebookCatalog, force_refresh_requested
+
+logger = logging.getLogger("nlm_ingest")
+
+DEFAULT_CONCURRENCY = 4
+DEFAULT_PATTERNS = "*.txt,*.md"
+
+
+@dataclass
+class IngestInput:
+    """One file or URL to add."""
+
+    kind: str
+    title: str
+    value: str
+    digest: str
+
+
+@dataclass
+class IngestReport:
+    """Counts for one ingest run."""
+
+    added: int = 0
+    duplicate_input: int = 0
+    already_present: int = 0
+    failed: list[dict[str, str]] = field(default_factory=list)
+
+    def to_dict(self) -> dict[str, Any]:
+        """Return a JSON-serializable view."""
+        return {
+            "added": self.added,
+            "duplicate_input": self.duplicate_input,
+            "already_present": self.already_present,
+            "failed": len(self.failed),
+        }
+
+
+def canonical_url(url: str) -> str:
+    """Lower-case scheme and host, drop the fragment and any trailing slash."""
+    parts = urlsplit(url.strip())
+    path = parts.path.rstrip("/")
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, parts.query, ""))
+
+
+def _digest(kind: str, material: str) -> str:
+    return hashlib.sha256(f"{kind}\0{material}".encode()).hexdigest()
+
+
+def read_text_inputs(directory: Path, patterns: str) -> list[IngestInput]:
+    """Collect matching files under ``directory``, titled by relative path."""
+    files: set[Path] = set()
+    for pattern in (part.strip() for part in patterns.split(",")):
+        if pattern:
+            files.update(path for path in directory.rglob(pattern) if path.is_file())
+    inputs = []
+    for path in sorted(files):
+        text = path.read_text(errors="replace")
+        normalized = "\n".join(line.rstrip() for line in text.strip().splitlines())
+        if not normalized:
+            continue
+        title = str(path.relative_to(directory))
+        inputs.append(IngestInput("text", title, text, _digest("text", normalized)))
+    return inputs
+
+
+def read_url_inputs(url_file: Path) -> list[IngestInput]:
+    """Read one URL per line, skipping blanks and ``#`` comments."""
+    inputs = []
+    for line in url_file.read_text().splitlines():
+        url = line.strip()
+        if url and not url.startswith("#"):
+            canonical = canonical_url(url)
+            inputs.append(IngestInput("url", url, url, _digest("url", canonical)))
+    return inputs
+
+
+class IngestCheckpoint:
+    """Append-only record of sources added to one notebook, keyed by input hash."""
+
+    def __init__(self, notebook_id: str, path: Path | None = None) -> None:
+        """Load previously recorded sources for ``notebook_id``."""
+        self.path = path or state_dir() / "ingest" / f"{notebook_id}.jsonl"
+        self.entries: dict[str, dict[str, Any]] = {}
+        self.by_title: dict[str, dict[str, Any]] = {}
+        if self.path.exists():
+            for line in self.path.read_text().splitlines():
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # a line torn by a crash mid-write
+                self.entries[entry["digest"]] = entry
+                self.by_title[entry["title"]] = entry
+
+    def record(self, item: IngestInput, source_id: str) -> None:
+        """Append one added source."""
+        entry = {
+            "digest": item.digest,
+            "kind": item.kind,
+            "title": item.title,
+            "source_id": source_id,
+            "added_at": time.time(),
+        }
+        self.entries[item.digest] = entry
+        self.by_title[item.title] = entry
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open("a") as handle:
+            handle.write(json.dumps(entry) + "\n")
+
+
+def _present_keys(notebook_payload: Any) -> tuple[set[str], set[str]]:  # noqa: ANN401
+    """Return the notebook's source IDs and its source titles/canonical URLs."""
+    if not isinstance(notebook_payload, dict):
+        return set(), set()
+    notebook = notebook_payload.get("notebook", notebook_payload)
+    sources = notebook.get("sources") if isinstance(notebook, dict) else None
+    ids: set[str] = set()
+    keys: set[str] = set()
+    for source in sources or []:
+        if not isinstance(source, dict):
+            continue
+        ids.add(str(source.get("id") or source.get("source_id") or ""))
+        for key in ("title", "url"):
+            if source.get(key):
+                keys.add(str(source[key]))
+                keys.add(canonical_url(str(source[key])))
+    return ids, keys
+
+
+def plan(
+    inputs: list[IngestInput],
+    checkpoint: IngestCheckpoint,
+    notebook_payload: Any,  # noqa: ANN401
+    report: IngestReport,
+) -> list[IngestInput]:
+    """Drop repeated inputs and ones already in the notebook; return what to add.
+
+    A file the checkpoint has recorded under the same title is compared by digest, so an
+    edited file is added again; titles alone only match inputs the checkpoint has never seen.
+    """
+    source_ids, present = _present_keys(notebook_payload)
+    seen: set[str] = set()
+    todo = []
+    for item in inputs:
+        if item.digest in seen:
+            report.duplicate_input += 1
+            continue
+        seen.add(item.digest)
+        recorded = checkpoint.entries.get(item.digest)
+        if recorded and recorded["source_id"] in source_ids:
+            report.already_present += 1
+            continue
+        if item.title not in checkpoint.by_title and item.title in present:
+            report.already_present += 1
+            continue
+        if item.kind == "url" and canonical_url(item.value) in present:
+            report.already_present += 1
+            continue
+        todo.append(item)
+    return todo
+
+
+async def _add(client: McpStdioClient, notebook_id: str, item: IngestInput) -> str:
+    if item.kind == "url":
+        tool, args = "notebook_add_url", {"notebook_id": notebook_id, "url": item.value}
+    else:
+        tool = "notebook_add_text"
+        args = {"notebook_id": notebook_id, "text": item.value, "title": item.title}
+    result = await client.call_tool(tool, args)
+    payload = result.payload()
+    if result.is_error:
+        message = f"{tool} failed: {payload}"
+        raise McpError(message)
+    return (
+        str(payload.get("source_id") or payload.get("id") or "")
+        if isinstance(payload, dict)
+        else ""
+    )
+
+
+async def ingest(
+    client: McpStdioClient,
+    notebook_id: str,
+    inputs: list[IngestInput],
+    *,
+    concurrency: int,
+    dry_run: bool = False,
+) -> IngestReport:
+    """Add every new input to ``notebook_id`` with at most ``concurrency`` calls in flight."""
+    report = IngestReport()
+    checkpoint = IngestCheckpoint(notebook_id)
+    notebook = await client.call_tool("notebook_get", {"notebook_id": notebook_id})
+    if notebook.is_error:
+        message = f"notebook_get failed: {notebook.payload()}"
+        raise McpError(message)
+    todo = plan(inputs, checkpoint, notebook.payload(), report)
+    logger.info(
+        "%d inputs: %d to add, %d already present, %d repeated.",
+        len(inputs),
+        len(todo),
+        report.already_present,
+        report.duplicate_input,
+    )
+    if dry_run:
+        return report
+
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def add_one(item: IngestInput) -> None:
+        async with semaphore:
+            try:
+                source_id = await _add(client, notebook_id, item)
+            except (McpError, TimeoutError) as exc:
+                error = str(exc) or type(exc).__name__
+            else:
+                checkpoint.record(item, source_id)
+                report.added += 1
+                return
+            report.failed.append({"title": item.title, "error": error})
+            logger.error("Failed to add %s: %s", item.title, error)
+
+    await asyncio.gather(*(add_one(item) for item in todo))
+    return report
+
+
+async def _run(parsed: argparse.Namespace, inputs: list[IngestInput]) -> IngestReport:
+    async with McpStdioClient.from_config(parsed.server) as client:
+        catalog = NotebookCatalog.from_env()
+        async with catalog.ensured(client, force=force_refresh_requested()):
+            entry = catalog.lookup(parsed.notebook)
+            notebook_id = entry["id"] if entry else parsed.notebook
+            return await ingest(
+                client,
+                notebook_id,
+                inputs,
+                concurrency=parsed.concurrency,
+                dry_run=parsed.dry_run,
+            )
+
+
+def _configure_logging() -> None:
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+def main() -> int:
+    """Ingest a directory of text files or a URL list into one notebook."""
+    _configure_logging()
+    parser = argparse.ArgumentParser(description="Bulk NotebookLM source ingestion")
+    parser.add_argument("--notebook", required=True, help="Target notebook ID or title.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--dir", type=Path, help="Directory of text files to add.")
+    source.add_argument("--urls", type=Path, help="File with one URL per line.")
+    parser.add_argument("--pattern", default=DEFAULT_PATTERNS, help="Globs for --dir files.")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=int(os.environ.get("NLM_INGEST_CONCURRENCY", DEFAULT_CONCURRENCY)),
+    )
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would be added.")
+    parser.add_argument("--server", default=DEFAULT_SERVER)
+    parsed = parser.parse_args()
+
+    if parsed.dir is not None:
+        inputs = read_text_inputs(parsed.dir, parsed.pattern)
+    else:
+        inputs = read_url_inputs(parsed.urls)
+    report = asyncio.run(_run(parsed, inputs))
+    logger.info(json.dumps(report.to_dict()))
+    return 1 if report.failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
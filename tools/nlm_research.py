@@ -0,0 +1,399 @@
+"""Start research across notebooks, poll every job in one loop, import as each completes.
+
+Job state is saved to ``research/<run>.json`` in the state directory after every
+transition, so re-running the same command resumes the run instead of starting
+duplicate research.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import random
+import sys
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any
+
+from mcp_client import DEFAULT_SERVER, McpError, McpStdioClient
+from nlm_state import state_dir
+from notebook_catalog import NotebookCatalog, force_refresh_requested
+
+logger = logging.getLogger("nlm_research")
+
+DEFAULT_POLL_INITIAL_S = 5.0
+DEFAULT_POLL_MAX_S = 120.0
+DEFAULT_TIMEOUT_S = 1800.0
+DEFAULT_CONCURRENCY = 4
+DEFAULT_MAX_ERRORS = 5
+DONE_STATUSES = {"completed", "complete", "done", "success"}
+FAILED_STATUSES = {"failed", "error", "cancelled"}
+
+
+@dataclass
+class Backoff:
+    """Exponential poll intervals with proportional jitter."""
+
+    initial_s: float = DEFAULT_POLL_INITIAL_S
+    max_s: float = DEFAULT_POLL_MAX_S
+    factor: float = 2.0
+    jitter: float = 0.2
+    rng: random.Random = field(default_factory=random.Random, repr=False)
+
+    @classmethod
+    def from_env(cls, prefix: str) -> Backoff:
+        """Read ``<prefix>_POLL_INITIAL`` and ``<prefix>_POLL_MAX`` seconds."""
+        return cls(
+            initial_s=float(os.environ.get(f"{prefix}_POLL_INITIAL", DEFAULT_POLL_INITIAL_S)),
+            max_s=float(os.environ.get(f"{prefix}_POLL_MAX", DEFAULT_POLL_MAX_S)),
+        )
+
+    def delay(self, polls: int) -> float:
+        """Seconds to wait before the next poll after ``polls`` unfinished polls."""
+        base = min(self.max_s, self.initial_s * self.factor**polls)
+        return base * self.rng.uniform(1 - self.jitter, 1 + self.jitter)
+
+
+@dataclass
+class ResearchJob:
+    """One notebook's research task as persisted in the run state."""
+
+    notebook_id: str
+    title: str
+    query: str
+    status: str = "pending"
+    task_id: str = ""
+    polls: int = 0
+    errors: int = 0
+    next_poll_at: float = 0.0
+    imported: int = 0
+    error: str = ""
+    started_at: float = 0.0
+    finished_at: float = 0.0
+
+    @property
+    def active(self) -> bool:
+        """Return True while the job still needs a start, poll or import."""
+        return self.status in {"pending", "starting", "running", "completed"}
+
+
+class ResearchRun:
+    """Jobs for one (notebooks, query, mode) combination, saved atomically."""
+
+    def __init__(self, path: Path, jobs: list[ResearchJob]) -> None:
+        """Wrap the jobs stored at ``path``."""
+        self.path = path
+        self.jobs = jobs
+
+    @staticmethod
+    def default_path(notebook_ids: list[str], query: str, options: dict[str, Any]) -> Path:
+        """Derive the state file from the run's inputs so a re-run finds it."""
+        material = json.dumps([sorted(notebook_ids), query, options], sort_keys=True)
+        run_id = hashlib.sha256(material.encode()).hexdigest()[:12]
+        return state_dir() / "research" / f"{run_id}.json"
+
+    @classmethod
+    def load(cls, path: Path) -> ResearchRun | None:
+        """Load a saved run, or None when there is none."""
+        if not path.exists():
+            return None
+        data = json.loads(path.read_text())
+        return cls(path, [ResearchJob(**job) for job in data["jobs"]])
+
+    def save(self) -> None:
+        """Write the run state atomically."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps({"jobs": [asdict(job) for job in self.jobs]}, indent=2))
+        tmp.replace(self.path)
+
+    def retry_failed(self) -> None:
+        """Send failed jobs back to polling (if started) or starting (if not)."""
+        for job in self.jobs:
+            if job.status == "failed":
+                job.status = "running" if job.task_id else "pending"
+                job.error = ""
+                job.errors = 0
+                job.next_poll_at = 0.0
+
+    def summary(self) -> dict[str, int]:
+        """Count jobs by status."""
+        counts: dict[str, int] = {}
+        for job in self.jobs:
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return counts
+
+
+def _status_of(payload: Any) -> str:  # noqa: ANN401
+    status = str(payload.get("status", "")) if isinstance(payload, dict) else ""
+    if status.lower() in DONE_STATUSES:
+        return "completed"
+    if status.lower() in FAILED_STATUSES:
+        return "failed"
+    return "running"
+
+
+def _task_id_of(payload: Any) -> str:  # noqa: ANN401
+    if not isinstance(payload, dict):
+        return ""
+    return str(payload.get("task_id") or payload.get("research_id") or "")
+
+
+def _same_query(payload: Any, query: str) -> bool:  # noqa: ANN401
+    """Return True when a ``research_status`` payload reports the task for ``query``."""
+    if not isinstance(payload, dict):
+        return False
+    reported = str(payload.get("query") or "")
+    return " ".join(reported.lower().split()) == " ".join(query.lower().split())
+
+
+class Orchestrator:
+    """Drive a :class:`ResearchRun` to completion over one MCP session."""
+
+    def __init__(
+        self,
+        client: McpStdioClient,
+        run: ResearchRun,
+        backoff: Backoff,
+        start_args: dict[str, Any],
+        *,
+        max_errors: int = DEFAULT_MAX_ERRORS,
+    ) -> None:
+        """Bind the session, run state, poll policy and extra ``research_start`` args.
+
+        A job whose poll or import fails ``max_errors`` times in a row is marked failed.
+        """
+        self.client = client
+        self.run = run
+        self.backoff = backoff
+        self.start_args = start_args
+        self.max_errors = max_errors
+
+    async def _call(self, tool: str, args: dict[str, Any]) -> Any:  # noqa: ANN401
+        result = await self.client.call_tool(tool, args)
+        if result.is_error:
+            message = f"{tool} failed: {result.payload()}"
+            raise McpError(message)
+        return result.payload()
+
+    def _schedule(self, job: ResearchJob, attempts: int | None = None) -> None:
+        job.next_poll_at = time.time() + self.backoff.delay(
+            job.polls if attempts is None else attempts,
+        )
+
+    async def _start(self, job: ResearchJob) -> None:
+        if job.status == "starting":
+            # Interrupted between research_start and saving its task ID: adopt the
+            # notebook's latest task rather than starting a duplicate, but only when
+            # it is research for this query; anything else starts a fresh task.
+            with contextlib.suppress(McpError):
+                payload = await self._call("research_status", {"notebook_id": job.notebook_id})
+                if _same_query(payload, job.query):
+                    job.task_id = _task_id_of(payload)
+        if not job.task_id:
+            job.status = "starting"
+            self.run.save()
+            args = {**self.start_args, "notebook_id": job.notebook_id, "query": job.query}
+            job.task_id = _task_id_of(await self._call("research_start", args))
+            job.started_at = time.time()
+        job.status = "running"
+        self._schedule(job)
+        self.run.save()
+        logger.info("Started research on %s (task %s).", job.title, job.task_id)
+
+    async def _poll(self, job: ResearchJob) -> None:
+        payload = await self._call(
+            "research_status",
+            {"notebook_id": job.notebook_id, "task_id": job.task_id, "max_wait": 0},
+        )
+        job.polls += 1
+        job.errors = 0
+        job.error = ""
+        status = _status_of(payload)
+        if status == "running":
+            self._schedule(job)
+            return
+        job.status = status
+        job.finished_at = time.time()
+        if status == "failed":
+            job.error = str(payload.get("error") or payload.get("message") or "research failed")
+        self.run.save()
+
+    async def _import(self, job: ResearchJob) -> None:
+        payload = await self._call(
+            "research_import",
+            {"notebook_id": job.notebook_id, "task_id": job.task_id},
+        )
+        job.imported = int(payload.get("imported", 0)) if isinstance(payload, dict) else 0
+        job.status = "imported"
+        self.run.save()
+        logger.info("Imported %d sources into %s.", job.imported, job.title)
+
+    def _record_error(self, job: ResearchJob, error: str) -> None:
+        """Retry a failed poll or import with backoff until the error budget is spent."""
+        job.errors += 1
+        job.error = error
+        if job.errors >= self.max_errors:
+            job.status = "failed"
+        else:
+            self._schedule(job, job.errors)
+            logger.warning(
+                "Research on %s hit an error (%d/%d), retrying: %s",
+                job.title,
+                job.errors,
+                self.max_errors,
+                error,
+            )
+        self.run.save()
+
+    async def _advance(self, job: ResearchJob) -> None:
+        """Take the next step for one job, recording failures on the job itself."""
+        try:
+            if job.status in {"pending", "starting"}:
+                await self._start(job)
+            elif job.status == "running":
+                await self._poll(job)
+            if job.status == "completed":
+                await self._import(job)
+        except (McpError, TimeoutError) as exc:
+            error = str(exc) or type(exc).__name__
+            if job.task_id and job.status in {"running", "completed"}:
+                self._record_error(job, error)
+            else:
+                job.status = "failed"
+                job.error = error
+                self.run.save()
+        if job.status == "failed":
+            logger.error("Research on %s failed: %s", job.title, job.error)
+
+    async def drive(self, *, concurrency: int, timeout_s: float) -> None:
+        """Start, poll and import until every job settles or ``timeout_s`` passes."""
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        deadline = time.monotonic() + timeout_s
+
+        async def step(job: ResearchJob) -> None:
+            async with semaphore:
+                await self._advance(job)
+
+        while active := [job for job in self.run.jobs if job.active]:
+            now = time.time()
+            due = [job for job in active if job.next_poll_at <= now]
+            if due:
+                await asyncio.gather(*(step(job) for job in due))
+                continue
+            wait_s = min(job.next_poll_at for job in active) - now
+            if time.monotonic() + wait_s > deadline:
+                logger.warning(
+                    "Timed out with %d jobs still running; re-run to resume.",
+                    len(active),
+                )
+                return
+            await asyncio.sleep(wait_s)
+
+
+async def run_research(
+    parsed: argparse.Namespace,
+    *,
+    server: str = DEFAULT_SERVER,
+) -> ResearchRun:
+    """Start or resume the run described by the CLI arguments."""
+    start_args = {"source": parsed.source, "mode": parsed.mode}
+    async with McpStdioClient.from_config(server) as client:
+        catalog = NotebookCatalog.from_env()
+        async with catalog.ensured(client, force=force_refresh_requested()):
+            notebooks = catalog.select(parsed.notebooks)
+            ids = [notebook["id"] for notebook in notebooks]
+            path = parsed.state or ResearchRun.default_path(ids, parsed.query, start_args)
+            run = ResearchRun.load(path)
+            if run is None:
+                jobs = [
+                    ResearchJob(notebook_id=nb["id"], title=nb["title"], query=parsed.query)
+                    for nb in notebooks
+                ]
+                run = ResearchRun(path, jobs)
+                run.save()
+            else:
+                logger.info("Resuming %s: %s", path, json.dumps(run.summary()))
+                run.retry_failed()
+            orchestrator = Orchestrator(
+                client,
+                run,
+                Backoff.from_env("NLM_RESEARCH"),
+                start_args,
+                max_errors=parsed.max_errors,
+            )
+            await orchestrator.drive(concurrency=parsed.concurrency, timeout_s=parsed.timeout)
+    return run
+
+
+def _configure_logging() -> None:
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+def main() -> int:
+    """Run (or resume) research across notebooks, or show a saved run."""
+    _configure_logging()
+    parser = argparse.ArgumentParser(description="NotebookLM research orchestrator")
+    parser.add_argument("action", choices=["run", "status"])
+    parser.add_argument(
+        "--notebooks",
+        default=os.environ.get("NOTEBOOK_IDS", ""),
+        help="Comma-separated notebook IDs or titles (NOTEBOOK_IDS).",
+    )
+    parser.add_argument("--query", default=os.environ.get("RESEARCH_QUERY", ""))
+    parser.add_argument("--source", default=os.environ.get("RESEARCH_SOURCE", "web"))
+    parser.add_argument("--mode", default=os.environ.get("RESEARCH_MODE", "fast"))
+    parser.add_argument("--state", type=Path, help="Run state file (derived from inputs).")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=int(os.environ.get("NLM_RESEARCH_CONCURRENCY", DEFAULT_CONCURRENCY)),
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=float(os.environ.get("NLM_RESEARCH_TIMEOUT", DEFAULT_TIMEOUT_S)),
+        help="Seconds to keep polling before leaving the run to resume later.",
+    )
+    parser.add_argument(
+        "--max-errors",
+        type=int,
+        default=int(os.environ.get("NLM_RESEARCH_MAX_ERRORS", DEFAULT_MAX_ERRORS)),
+        help="Consecutive poll/import errors before a job is marked failed.",
+    )
+    parser.add_argument("--server", default=DEFAULT_SERVER)
+    parsed = parser.parse_args()
+
+    if parsed.action == "status":
+        if parsed.state is not None:
+            run = ResearchRun.load(parsed.state)
+            if run is None:
+                logger.error("No research run at %s", parsed.state)
+                return 1
+            logger.info(json.dumps([asdict(job) for job in run.jobs], indent=2))
+            return 0
+        for path in sorted((state_dir() / "research").glob("*.json")):
+            run = ResearchRun.load(path)
+            if run is not None:
+                logger.info("%s %s", path, json.dumps(run.summary()))
+        return 0
+
+    if not parsed.notebooks or not parsed.query:
+        parser.error("run needs --notebooks (or NOTEBOOK_IDS) and --query (or RESEARCH_QUERY)")
+    run = asyncio.run(run_research(parsed, server=parsed.server))
+    logger.info(json.dumps({"state": str(run.path), **run.summary()}))
+    return 0 if all(job.status == "imported" for job in run.jobs) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
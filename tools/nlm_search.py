@@ -0,0 +1,389 @@
+"""Local full-text search over notebooks, sources and cached answers.
+
+``update`` fills an SQLite FTS5 index (``search.sqlite`` in the state directory)
+from ``notebook_list``, ``notebook_describe``, ``source_describe`` and the answer
+cache. It is incremental: a notebook is only described again when its title,
+source count or update time changed, a source only when it is new, and answers
+only when they are new to the cache; anything that disappeared is dropped.
+``search`` ranks matches with BM25 and never touches the network.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import re
+import sqlite3
+import sys
+import time
+from dataclasses import asdict, dataclass
+from typing import TYPE_CHECKING, Any
+
+from answer_cache import AnswerCache
+from mcp_client import DEFAULT_SERVER, McpError, McpStdioClient
+from nlm_state import state_dir
+from notebook_catalog import NotebookCatalog
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+logger = logging.getLogger("nlm_search")
+
+DEFAULT_CONCURRENCY = 4
+DEFAULT_LIMIT = 10
+KINDS = ("notebook", "source", "answer")
+
+SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS docs USING fts5(
+    kind UNINDEXED,
+    notebook_id UNINDEXED,
+    title,
+    body,
+    tokenize = 'porter unicode61'
+);
+CREATE TABLE IF NOT EXISTS indexed (
+    ref TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    notebook_id TEXT NOT NULL,
+    title TEXT NOT NULL,
+    version TEXT NOT NULL,
+    doc_rowid INTEGER NOT NULL,
+    indexed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS indexed_notebook ON indexed (notebook_id, kind);
+"""
+
+
+@dataclass
+class UpdateReport:
+    """Counts for one incremental index update."""
+
+    notebooks: int = 0
+    sources: int = 0
+    answers: int = 0
+    unchanged: int = 0
+    removed: int = 0
+    failed: int = 0
+
+
+@dataclass
+class SearchHit:
+    """One ranked match."""
+
+    kind: str
+    ref: str
+    title: str
+    notebook_id: str
+    notebook_title: str
+    snippet: str
+    score: float
+
+
+def _text(value: Any) -> str:  # noqa: ANN401
+    if isinstance(value, list):
+        return " ".join(_text(item) for item in value)
+    if isinstance(value, dict):
+        return " ".join(_text(item) for item in value.values())
+    return "" if value is None else str(value)
+
+
+def _describe_text(payload: Any) -> str:  # noqa: ANN401
+    """Return the searchable text of a ``*_describe`` payload."""
+    if not isinstance(payload, dict):
+        return _text(payload)
+    return " ".join(
+        _text(payload.get(key)) for key in ("summary", "description", "keywords", "topics")
+    )
+
+
+def _notebook_sources(payload: Any) -> list[dict[str, Any]]:  # noqa: ANN401
+    notebook = payload.get("notebook", payload) if isinstance(payload, dict) else {}
+    sources = notebook.get("sources") if isinstance(notebook, dict) else None
+    return [source for source in sources or [] if isinstance(source, dict)]
+
+
+def match_expression(query: str) -> str:
+    """Turn free text into an FTS5 query: every word must match, the last as a prefix."""
+    words = re.findall(r"\w+", query)
+    if not words:
+        return ""
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+class SearchIndex:
+    """FTS5 documents plus the version of each indexed object."""
+
+    def __init__(self, path: Path | None = None) -> None:
+        """Open (or create) the index database."""
+        self.path = path or state_dir() / "search.sqlite"
+        self._db = sqlite3.connect(self.path, timeout=10)
+        self._db.executescript(SCHEMA)
+
+    def close(self) -> None:
+        """Close the database connection."""
+        self._db.close()
+
+    def versions(self, kind: str) -> dict[str, str]:
+        """Return ``{ref: version}`` for every indexed object of ``kind``."""
+        rows = self._db.execute("SELECT ref, version FROM indexed WHERE kind = ?", (kind,))
+        return dict(rows.fetchall())
+
+    def refs(self, kind: str, notebook_id: str) -> set[str]:
+        """Return the refs of ``kind`` indexed under one notebook."""
+        rows = self._db.execute(
+            "SELECT ref FROM indexed WHERE kind = ? AND notebook_id = ?",
+            (kind, notebook_id),
+        )
+        return {row[0] for row in rows.fetchall()}
+
+    def upsert(  # noqa: PLR0913, PLR0917
+        self,
+        ref: str,
+        kind: str,
+        notebook_id: str,
+        title: str,
+        body: str,
+        version: str,
+    ) -> None:
+        """Replace the document for ``ref``."""
+        with self._db:
+            self._delete(ref)
+            cursor = self._db.execute(
+                "INSERT INTO docs (kind, notebook_id, title, body) VALUES (?, ?, ?, ?)",
+                (kind, notebook_id, title, body),
+            )
+            self._db.execute(
+                "INSERT INTO indexed VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (ref, kind, notebook_id, title, version, cursor.lastrowid, time.time()),
+            )
+
+    def remove(self, refs: set[str]) -> int:
+        """Drop the documents for ``refs`` and return how many existed."""
+        with self._db:
+            return sum(self._delete(ref) for ref in refs)
+
+    def _delete(self, ref: str) -> int:
+        row = self._db.execute("SELECT doc_rowid FROM indexed WHERE ref = ?", (ref,)).fetchone()
+        if row is None:
+            return 0
+        self._db.execute("DELETE FROM docs WHERE rowid = ?", (row[0],))
+        self._db.execute("DELETE FROM indexed WHERE ref = ?", (ref,))
+        return 1
+
+    def search(self, query: str, *, kind: str = "", limit: int = DEFAULT_LIMIT) -> list[SearchHit]:
+        """Return the best BM25 matches for ``query``, titles weighted above bodies."""
+        expression = match_expression(query)
+        if not expression:
+            return []
+        rows = self._db.execute(
+            "SELECT i.kind, i.ref, i.title, i.notebook_id, COALESCE(n.title, ''), "
+            "snippet(docs, 3, '[', ']', '...', 12), bm25(docs, 0.0, 0.0, 4.0, 1.0) AS score "
+            "FROM docs JOIN indexed i ON i.doc_rowid = docs.rowid "
+            "LEFT JOIN indexed n ON n.ref = i.notebook_id AND n.kind = 'notebook' "
+            "WHERE docs MATCH ? AND (? = '' OR i.kind = ?) ORDER BY score LIMIT ?",
+            (expression, kind, kind, limit),
+        ).fetchall()
+        return [SearchHit(*row[:6], score=round(-row[6], 3)) for row in rows]
+
+
+class IndexUpdater:
+    """Bring the index in line with the server and the answer cache."""
+
+    def __init__(
+        self,
+        client: McpStdioClient,
+        index: SearchIndex,
+        *,
+        concurrency: int = DEFAULT_CONCURRENCY,
+    ) -> None:
+        """Bind the MCP session and index; ``concurrency`` bounds describe calls."""
+        self.client = client
+        self.index = index
+        self.semaphore = asyncio.Semaphore(max(1, concurrency))
+        self.report = UpdateReport()
+
+    async def _call(self, tool: str, args: dict[str, Any]) -> Any:  # noqa: ANN401
+        async with self.semaphore:
+            result = await self.client.call_tool(tool, args)
+        if result.is_error:
+            message = f"{tool} failed: {result.payload()}"
+            raise McpError(message)
+        return result.payload()
+
+    async def _index_source(self, notebook_id: str, source: dict[str, Any]) -> None:
+        sid = str(source.get("id") or source.get("source_id") or "")
+        title = str(source.get("title") or sid)
+        payload = await self._call("source_describe", {"source_id": sid})
+        body = " ".join([_describe_text(payload), str(source.get("url") or "")])
+        self.index.upsert(sid, "source", notebook_id, title, body, title)
+        self.report.sources += 1
+
+    async def _index_notebook(self, entry: dict[str, Any], version: str) -> None:
+        notebook_id = entry["id"]
+        described, listing = await asyncio.gather(
+            self._call("notebook_describe", {"notebook_id": notebook_id}),
+            self._call("notebook_get", {"notebook_id": notebook_id}),
+        )
+        sources = _notebook_sources(listing)
+        known = self.index.refs("source", notebook_id)
+        current = {str(s.get("id") or s.get("source_id") or "") for s in sources}
+        self.report.removed += self.index.remove(known - current)
+        await asyncio.gather(
+            *(
+                self._index_source(notebook_id, source)
+                for source in sources
+                if str(source.get("id") or source.get("source_id") or "") not in known
+            ),
+        )
+        # Recorded last, so a notebook whose sources failed is retried next update.
+        title = str(entry.get("title") or notebook_id)
+        self.index.upsert(
+            notebook_id,
+            "notebook",
+            notebook_id,
+            title,
+            _describe_text(described),
+            version,
+        )
+        self.report.notebooks += 1
+
+    async def update_notebooks(self, entries: list[dict[str, Any]]) -> None:
+        """Re-index notebooks whose listing changed and drop ones no longer listed."""
+        versions = self.index.versions("notebook")
+
+        async def one(entry: dict[str, Any]) -> None:
+            version = json.dumps(
+                [entry.get("title"), entry.get("source_count"), entry.get("updated_at")],
+            )
+            if versions.get(entry["id"]) == version:
+                self.report.unchanged += 1
+                return
+            try:
+                await self._index_notebook(entry, version)
+            except (McpError, TimeoutError) as exc:
+                error = str(exc) or type(exc).__name__
+            else:
+                return
+            self.report.failed += 1
+            logger.warning("Indexing %s failed: %s", entry.get("title", entry["id"]), error)
+
+        await asyncio.gather(*(one(entry) for entry in entries))
+        listed = {entry["id"] for entry in entries}
+        for notebook_id in set(versions) - listed:
+            stale = {notebook_id} | self.index.refs("source", notebook_id)
+            self.report.removed += self.index.remove(stale | self.index.refs("answer", notebook_id))
+
+    def update_answers(self, cache: AnswerCache | None, notebook_ids: set[str]) -> None:
+        """Index cached answers for listed notebooks; drop ones no longer cached.
+
+        With the cache disabled (``cache`` is None) indexed answers are left as they are.
+        """
+        if cache is None:
+            return
+        versions = self.index.versions("answer")
+        entries = [entry for entry in cache.entries() if entry["notebook_id"] in notebook_ids]
+        for entry in entries:
+            if entry["key"] in versions:
+                continue
+            payload = entry["payload"]
+            answer = payload.get("answer", "") if isinstance(payload, dict) else payload
+            self.index.upsert(
+                entry["key"],
+                "answer",
+                entry["notebook_id"],
+                entry["question"],
+                _text(answer),
+                entry["key"],
+            )
+            self.report.answers += 1
+        self.report.removed += self.index.remove(set(versions) - {e["key"] for e in entries})
+
+
+async def update_index(
+    client: McpStdioClient,
+    index: SearchIndex,
+    *,
+    concurrency: int = DEFAULT_CONCURRENCY,
+) -> UpdateReport:
+    """Refresh the catalog, then incrementally index notebooks, sources and answers."""
+    catalog = NotebookCatalog.from_env()
+    await catalog.refresh(client)
+    updater = IndexUpdater(client, index, concurrency=concurrency)
+    entries = catalog.entries()
+    await updater.update_notebooks(entries)
+    cache = AnswerCache.from_env()
+    try:
+        updater.update_answers(cache, {entry["id"] for entry in entries})
+    finally:
+        if cache is not None:
+            cache.close()
+    return updater.report
+
+
+async def _update(server: str, concurrency: int) -> UpdateReport:
+    index = SearchIndex()
+    try:
+        async with McpStdioClient.from_config(server) as client:
+            return await update_index(client, index, concurrency=concurrency)
+    finally:
+        index.close()
+
+
+def _configure_logging() -> None:
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+def main() -> int:
+    """Update the local search index or search it."""
+    _configure_logging()
+    parser = argparse.ArgumentParser(description="Local NotebookLM full-text search")
+    parser.add_argument("action", choices=["update", "search"])
+    parser.add_argument("query", nargs="*", help="Search terms.")
+    parser.add_argument("--kind", choices=KINDS, default="", help="Only return this kind.")
+    parser.add_argument("--limit", type=int, default=DEFAULT_LIMIT)
+    parser.add_argument("--json", action="store_true", help="Print hits as JSON lines.")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=int(os.environ.get("NLM_SEARCH_CONCURRENCY", DEFAULT_CONCURRENCY)),
+    )
+    parser.add_argument("--server", default=DEFAULT_SERVER)
+    args = parser.parse_args()
+
+    if args.action == "update":
+        report = asyncio.run(_update(args.server, args.concurrency))
+        logger.info(json.dumps(asdict(report)))
+        return 1 if report.failed else 0
+
+    query = " ".join(args.query)
+    if not query:
+        parser.error("search needs a query")
+    index = SearchIndex()
+    started = time.perf_counter()
+    try:
+        hits = index.search(query, kind=args.kind, limit=args.limit)
+    finally:
+        index.close()
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    for hit in hits:
+        if args.json:
+            logger.info(json.dumps(asdict(hit)))
+            continue
+        where = f" in {hit.notebook_title}" if hit.kind != "notebook" and hit.notebook_title else ""
+        logger.info("%-8s %s%s (%s)\n         %s", hit.kind, hit.title, where, hit.ref, hit.snippet)
+    if not args.json:
+        logger.info("%d hits in %.1f ms", len(hits), elapsed_ms)
+    return 0 if hits else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
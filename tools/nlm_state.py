@@ -0,0 +1,23 @@
+"""Locate per-user state shared by the NotebookLM task tools."""
+
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+DEFAULT_STATE_DIR = "~/.cache/notebooklm-claude-integration"
+
+
+def state_dir() -> Path:
+    """Return the state directory (``NLM_STATE_DIR``), creating it if needed."""
+    path = Path(os.environ.get("NLM_STATE_DIR", DEFAULT_STATE_DIR)).expanduser()
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def env_flag(name: str, *, default: bool = True) -> bool:
+    """Read a ``0``/``1`` style environment flag."""
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() not in {"0", "false", "no", "off", ""}
@@ -0,0 +1,406 @@
+"""Create studio artifacts for many notebooks from a manifest and track them to completion.
+
+The manifest is JSONL, one ``{"notebook": "<id or title>", "type": "audio", "options": {...}}``
+per line (``type`` is ``audio``, ``video``, ``infographic``, ``slide_deck`` or a create tool
+name). Creations are submitted under a rate limit while a single loop polls
+``studio_status`` once per notebook; artifact IDs and statuses are recorded in
+``<manifest>.state.json`` so an interrupted run resumes where it stopped.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import sys
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+from mcp_client import DEFAULT_SERVER, McpError, McpStdioClient
+from nlm_research import DONE_STATUSES, FAILED_STATUSES, Backoff
+from notebook_catalog import NotebookCatalog, force_refresh_requested
+
+logger = logging.getLogger("nlm_studio")
+
+ARTIFACT_TYPES = {
+    "audio": "audio_overview_create",
+    "video": "video_overview_create",
+    "infographic": "infographic_create",
+    "slide_deck": "slide_deck_create",
+}
+DEFAULT_RATE_PER_MIN = 6.0
+DEFAULT_TIMEOUT_S = 3600.0
+
+
+@dataclass
+class StudioItem:
+    """One manifest line and the artifact created for it."""
+
+    index: int
+    notebook: str
+    type: str
+    options: dict[str, Any] = field(default_factory=dict)
+    notebook_id: str = ""
+    title: str = ""
+    status: str = "pending"
+    artifact_id: str = ""
+    error: str = ""
+    submit_started_at: float = 0.0
+    submitted_at: float = 0.0
+    finished_at: float = 0.0
+
+    @property
+    def tool(self) -> str:
+        """The create tool for this item's artifact type."""
+        return ARTIFACT_TYPES.get(self.type, self.type)
+
+    @property
+    def artifact_type(self) -> str:
+        """The artifact type as ``studio_status`` reports it."""
+        names = {tool: name for name, tool in ARTIFACT_TYPES.items()}
+        return names.get(self.type, self.type)
+
+
+def read_manifest(path: Path) -> list[StudioItem]:
+    """Parse manifest lines, skipping blanks and ``#`` comments."""
+    items: list[StudioItem] = []
+    for number, line in enumerate(path.read_text().splitlines(), start=1):
+        if not line.strip() or line.lstrip().startswith("#"):
+            continue
+        record = json.loads(line)
+        if not isinstance(record, dict) or not record.get("notebook") or not record.get("type"):
+            message = f"{path}:{number}: each line needs 'notebook' and 'type'"
+            raise ValueError(message)
+        item = StudioItem(
+            index=len(items),
+            notebook=str(record["notebook"]),
+            type=str(record["type"]),
+            options=dict(record.get("options") or {}),
+        )
+        if item.tool not in ARTIFACT_TYPES.values():
+            message = f"{path}:{number}: unknown artifact type {item.type!r}"
+            raise ValueError(message)
+        items.append(item)
+    return items
+
+
+class StudioRun:
+    """Manifest items with their artifact state, saved next to the manifest."""
+
+    def __init__(self, path: Path, items: list[StudioItem]) -> None:
+        """Wrap the items stored at ``path``."""
+        self.path = path
+        self.items = items
+
+    @staticmethod
+    def state_path(manifest: Path) -> Path:
+        """Return the state file that accompanies ``manifest``."""
+        return manifest.with_name(f"{manifest.stem}.state.json")
+
+    @classmethod
+    def open(cls, manifest: Path) -> StudioRun:
+        """Resume saved state when it still matches the manifest, else start fresh."""
+        items = read_manifest(manifest)
+        path = cls.state_path(manifest)
+        if path.exists():
+            saved = [StudioItem(**item) for item in json.loads(path.read_text())["items"]]
+            spec = [(i.notebook, i.type, i.options) for i in items]
+            if [(i.notebook, i.type, i.options) for i in saved] == spec:
+                run = cls(path, saved)
+                run.retry_failed()
+                return run
+            logger.warning("Manifest changed since %s was written; starting over.", path)
+        return cls(path, items)
+
+    def save(self) -> None:
+        """Write the state atomically."""
+        tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps({"items": [asdict(item) for item in self.items]}, indent=2))
+        tmp.replace(self.path)
+
+    def retry_failed(self) -> None:
+        """Send failed items back to polling (if created) or submission (if not)."""
+        for item in self.items:
+            if item.status == "failed":
+                item.status = "in_progress" if item.artifact_id else "pending"
+                item.error = ""
+
+    def summary(self) -> dict[str, int]:
+        """Count items by status."""
+        counts: dict[str, int] = {}
+        for item in self.items:
+            counts[item.status] = counts.get(item.status, 0) + 1
+        return counts
+
+
+class SubmitPacer:
+    """Space studio create calls at least ``60 / per_minute`` seconds apart."""
+
+    def __init__(self, per_minute: float) -> None:
+        """Set the allowed rate."""
+        self.interval_s = 60.0 / per_minute if per_minute > 0 else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        """Block until the next call is allowed."""
+        async with self._lock:
+            delay = self._next - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._next = time.monotonic() + self.interval_s
+
+
+def _artifacts(payload: Any) -> list[dict[str, Any]]:  # noqa: ANN401
+    items = payload.get("artifacts", []) if isinstance(payload, dict) else payload
+    return [item for item in items or [] if isinstance(item, dict)]
+
+
+def _artifact_id(artifact: dict[str, Any]) -> str:
+    return str(artifact.get("artifact_id") or artifact.get("id") or "")
+
+
+def _created_at(artifact: dict[str, Any]) -> float | None:
+    """Return an artifact's creation time as epoch seconds, or None if it has none."""
+    value = artifact.get("created_at", artifact.get("create_time"))
+    if isinstance(value, int | float):
+        return float(value)
+    if isinstance(value, str) and value:
+        with contextlib.suppress(ValueError):
+            return datetime.fromisoformat(value).timestamp()
+    return None
+
+
+class StudioPipeline:
+    """Submit manifest items and poll ``studio_status`` over one MCP session."""
+
+    def __init__(
+        self,
+        client: McpStdioClient,
+        run: StudioRun,
+        pacer: SubmitPacer,
+        backoff: Backoff,
+    ) -> None:
+        """Bind the session, run state, submit pacing and poll policy."""
+        self.client = client
+        self.run = run
+        self.pacer = pacer
+        self.backoff = backoff
+        self._submitted = asyncio.Event()
+
+    async def _call(self, tool: str, args: dict[str, Any]) -> Any:  # noqa: ANN401
+        result = await self.client.call_tool(tool, args)
+        if result.is_error:
+            message = f"{tool} failed: {result.payload()}"
+            raise McpError(message)
+        return result.payload()
+
+    def _fail(self, item: StudioItem, error: str) -> None:
+        item.status = "failed"
+        item.error = error
+        item.finished_at = time.time()
+        self.run.save()
+        logger.error("%s for %s failed: %s", item.type, item.title, error)
+
+    async def _adopt(self, item: StudioItem) -> None:
+        """Claim an artifact created before an interruption instead of re-submitting.
+
+        Only unclaimed artifacts of the item's type created at or after its recorded
+        submit time qualify, so older artifacts in the notebook are never mistaken for it.
+        """
+        claimed = {i.artifact_id for i in self.run.items if i.artifact_id}
+        with contextlib.suppress(McpError):
+            payload = await self._call("studio_status", {"notebook_id": item.notebook_id})
+            for artifact in reversed(_artifacts(payload)):
+                artifact_id = _artifact_id(artifact)
+                created_at = _created_at(artifact)
+                if (
+                    artifact.get("type") == item.artifact_type
+                    and artifact_id not in claimed
+                    and created_at is not None
+                    and created_at >= item.submit_started_at
+                ):
+                    item.artifact_id = artifact_id
+                    break
+
+    async def _submit(self, item: StudioItem) -> None:
+        if item.status == "submitting":
+            await self._adopt(item)
+        if not item.artifact_id:
+            await self.pacer.wait()
+            item.status = "submitting"
+            item.submit_started_at = time.time()
+            self.run.save()
+            payload = await self._call(item.tool, {**item.options, "notebook_id": item.notebook_id})
+            item.artifact_id = _artifact_id(payload) if isinstance(payload, dict) else ""
+            item.submitted_at = time.time()
+            if not item.artifact_id:
+                self._fail(item, f"{item.tool} returned no artifact_id: {payload}")
+                return
+        item.status = "in_progress"
+        self.run.save()
+        logger.info("Submitted %s for %s (artifact %s).", item.type, item.title, item.artifact_id)
+
+    async def submit_all(self) -> None:
+        """Submit every unsubmitted item, one rate-limited call at a time."""
+        for item in self.run.items:
+            if item.status in {"pending", "submitting"}:
+                try:
+                    await self._submit(item)
+                except (McpError, TimeoutError) as exc:
+                    self._fail(item, str(exc) or type(exc).__name__)
+                self._submitted.set()
+
+    async def _poll_notebook(self, notebook_id: str) -> None:
+        payload = await self._call("studio_status", {"notebook_id": notebook_id})
+        by_id = {_artifact_id(artifact): artifact for artifact in _artifacts(payload)}
+        for item in self.run.items:
+            if item.notebook_id != notebook_id or item.status != "in_progress":
+                continue
+            artifact = by_id.get(item.artifact_id)
+            status = str(artifact.get("status", "")).lower() if artifact else ""
+            if status in DONE_STATUSES or status == "ready":
+                item.status = "completed"
+                item.finished_at = time.time()
+                logger.info(
+                    "%s for %s is ready (artifact %s).",
+                    item.type,
+                    item.title,
+                    item.artifact_id,
+                )
+            elif status in FAILED_STATUSES:
+                self._fail(item, str(artifact.get("error") or "generation failed"))
+        self.run.save()
+
+    async def poll_all(self, submitter: asyncio.Task[None], deadline: float) -> None:
+        """Poll each notebook with in-progress items until all settle or the deadline passes."""
+        polls: dict[str, int] = {}
+        next_at: dict[str, float] = {}
+        while True:
+            pending = [item for item in self.run.items if item.status == "in_progress"]
+            waiting = {item.notebook_id for item in pending}
+            if not waiting and submitter.done():
+                return
+            now = time.monotonic()
+            if now > deadline:
+                logger.warning(
+                    "Timed out with %d artifacts pending; re-run to resume.",
+                    len(pending),
+                )
+                return
+            due = [
+                nb for nb in waiting if next_at.setdefault(nb, now + self.backoff.delay(0)) <= now
+            ]
+            for notebook_id in due:
+                polls[notebook_id] = polls.get(notebook_id, 0) + 1
+                next_at[notebook_id] = now + self.backoff.delay(polls[notebook_id])
+            results = await asyncio.gather(
+                *(self._poll_notebook(nb) for nb in due),
+                return_exceptions=True,
+            )
+            for notebook_id, result in zip(due, results, strict=True):
+                if isinstance(result, Exception):
+                    logger.warning("studio_status for %s failed: %s", notebook_id, result)
+            wake = min((next_at[nb] for nb in waiting), default=now + self.backoff.initial_s)
+            self._submitted.clear()
+            with contextlib.suppress(TimeoutError):
+                await asyncio.wait_for(self._submitted.wait(), max(0.0, wake - time.monotonic()))
+
+    async def drive(self, *, timeout_s: float) -> None:
+        """Submit and poll concurrently."""
+        submitter = asyncio.create_task(self.submit_all())
+        try:
+            await self.poll_all(submitter, time.monotonic() + timeout_s)
+        finally:
+            if not submitter.done():
+                submitter.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await submitter
+
+
+def _resolve(run: StudioRun, catalog: NotebookCatalog) -> list[StudioItem]:
+    """Fill notebook IDs and titles from the catalog; return items it cannot resolve."""
+    missing = []
+    for item in run.items:
+        if item.notebook_id:
+            continue
+        entry = catalog.lookup(item.notebook)
+        if entry is None:
+            missing.append(item)
+            continue
+        item.notebook_id = entry["id"]
+        item.title = entry["title"]
+    return missing
+
+
+async def run_pipeline(parsed: argparse.Namespace, run: StudioRun) -> None:
+    """Resolve notebooks, then submit and poll every item in ``run``."""
+    async with McpStdioClient.from_config(parsed.server) as client:
+        catalog = NotebookCatalog.from_env()
+        async with catalog.ensured(client, force=force_refresh_requested()):
+            for item in _resolve(run, catalog):
+                item.status = "failed"
+                item.error = f"notebook {item.notebook!r} not found"
+                logger.error("Skipping %s: %s", item.type, item.error)
+            run.save()
+            pipeline = StudioPipeline(
+                client,
+                run,
+                SubmitPacer(parsed.rate),
+                Backoff.from_env("NLM_STUDIO"),
+            )
+            await pipeline.drive(timeout_s=parsed.timeout)
+
+
+def _configure_logging() -> None:
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+def main() -> int:
+    """Run (or resume) a studio manifest."""
+    _configure_logging()
+    parser = argparse.ArgumentParser(description="NotebookLM studio artifact pipeline")
+    parser.add_argument("manifest", type=Path, help="JSONL manifest of artifacts to create.")
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=float(os.environ.get("NLM_STUDIO_RATE", DEFAULT_RATE_PER_MIN)),
+        help="Maximum creation calls per minute.",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=float(os.environ.get("NLM_STUDIO_TIMEOUT", DEFAULT_TIMEOUT_S)),
+        help="Seconds to keep polling before leaving the run to resume later.",
+    )
+    parser.add_argument("--server", default=DEFAULT_SERVER)
+    parsed = parser.parse_args()
+
+    run = StudioRun.open(parsed.manifest)
+    to_submit = [item for item in run.items if item.status in {"pending", "submitting"}]
+    if to_submit and os.environ.get("NLM_CONFIRM") != "1":
+        for item in to_submit:
+            logger.info("would create %s for %s %s", item.type, item.notebook, item.options or "")
+        logger.error(
+            "%d artifact creations require confirmation. Re-run with NLM_CONFIRM=1.",
+            len(to_submit),
+        )
+        return 1
+
+    asyncio.run(run_pipeline(parsed, run))
+    logger.info(json.dumps({"state": str(run.path), **run.summary()}))
+    return 0 if all(item.status == "completed" for item in run.items) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
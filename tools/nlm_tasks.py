@@ -1,16 +1,37 @@
-"""Run NotebookLM MCP tools via Codex CLI using Pixi tasks."""
+"""Run NotebookLM MCP tools via Pixi tasks.
+
+Tools are called directly over MCP stdio when the ``notebooklm-mcp`` server is
+available, falling back to a Codex CLI prompt otherwise.
+"""
 
 from __future__ import annotations
 
 import argparse
+import asyncio
 import json
 import logging
 import os
 import shutil
 import subprocess
 import sys
+import time
+from pathlib import Path
 from typing import Any
 
+import rate_limit
+import tracing
+from answer_cache import AnswerCache
+from mcp_client import (
+    DEFAULT_SERVER,
+    TRANSPORTS,
+    McpError,
+    McpStartError,
+    McpStdioClient,
+    load_server_config,
+    resolve_transport,
+)
+from session_pool import SessionPool, pooled_query
+
 logger = logging.getLogger("nlm_tasks")
 
 CONFIRM_REQUIRED = {
@@ -66,33 +87,221 @@ def _run_codex(prompt: str) -> None:
     if not codex_path:
         message = "codex CLI not found on PATH"
         raise RuntimeError(message)
-    subprocess.run(  # noqa: S603
+    rate_limit.pace_launch()
+    tracing.run(
         [codex_path, "--enable", "skills", "exec", prompt],
         check=True,
     )
 
 
-def main() -> int:
-    """Execute the requested NotebookLM tool via Codex."""
-    _configure_logging()
-    parser = argparse.ArgumentParser(
-        description="Run a NotebookLM MCP tool via Codex CLI.",
-    )
-    parser.add_argument("tool", help="NotebookLM tool name (e.g. notebook_list)")
-    parser.add_argument(
-        "--args",
-        dest="args_json",
-        default=None,
-        help="Optional JSON object of tool arguments.",
+async def _call(
+    client: McpStdioClient,
+    cache: AnswerCache | None,
+    tool: str,
+    args: dict[str, Any],
+    *,
+    sessions: SessionPool | None = None,
+) -> tuple[Any, bool, bool]:
+    """Call one tool, routing ``notebook_query`` through the answer cache and session pool.
+
+    Returns ``(payload, is_error, cache_hit)``.
+    """
+    if tool == "notebook_query":
+        return await pooled_query(client, cache, sessions, args)
+    result = await client.call_tool(tool, args)
+    return result.payload(), result.is_error, False
+
+
+async def _run_direct(
+    server: str,
+    tool: str,
+    args: dict[str, Any],
+    *,
+    use_cache: bool,
+    reuse_session: bool | None = None,
+) -> bool:
+    """Call a tool over one MCP stdio session and log its payload and latency."""
+    query = tool == "notebook_query"
+    cache = AnswerCache.from_env() if use_cache and query else None
+    sessions = SessionPool.from_env(reuse=reuse_session) if query else None
+    started = time.perf_counter()
+    try:
+        async with McpStdioClient.from_config(server) as client:
+            payload, is_error, hit = await _call(client, cache, tool, args, sessions=sessions)
+    finally:
+        if cache is not None:
+            cache.close()
+    latency_ms = (time.perf_counter() - started) * 1000
+    logger.info(json.dumps(payload, indent=2))
+    logger.info("%s completed in %.1f ms%s", tool, latency_ms, " (cached)" if hit else "")
+    return not is_error
+
+
+def _confirm_error(tool: str) -> str:
+    """Return an error message when ``tool`` needs ``NLM_CONFIRM=1`` and lacks it."""
+    if tool in CONFIRM_REQUIRED and os.environ.get("NLM_CONFIRM") != "1":
+        return f"Tool {tool} requires confirmation. Re-run with NLM_CONFIRM=1."
+    return ""
+
+
+def _parse_batch_line(index: int, line: str) -> dict[str, Any]:
+    """Parse one ``{tool, args}`` batch record, recording problems under ``error``."""
+    record: dict[str, Any] = {"index": index, "tool": "", "args": {}}
+    try:
+        parsed = json.loads(line)
+    except json.JSONDecodeError as exc:
+        record["error"] = f"Invalid JSON: {exc}"
+        return record
+    if not isinstance(parsed, dict) or not isinstance(parsed.get("tool"), str):
+        record["error"] = "Record must be an object with a string 'tool'"
+        return record
+    args = parsed.get("args") or {}
+    if not isinstance(args, dict):
+        record["error"] = "Record 'args' must be an object"
+        return record
+    record.update(tool=parsed["tool"], args=args)
+    if "id" in parsed:
+        record["id"] = parsed["id"]
+    record["error"] = _confirm_error(parsed["tool"])
+    return record
+
+
+def _read_batch(source: str) -> list[dict[str, Any]]:
+    """Read batch records from a JSONL file, or stdin when ``source`` is ``-``."""
+    lines = (
+        sys.stdin.read().splitlines() if source == "-" else Path(source).read_text().splitlines()
     )
-    parsed = parser.parse_args()
+    records = []
+    for line in lines:
+        if line.strip() and not line.lstrip().startswith("#"):
+            records.append(_parse_batch_line(len(records), line))
+    return records
+
+
+class _BatchEmitter:
+    """Write one JSON line per finished call, optionally in input order."""
+
+    def __init__(self, *, ordered: bool) -> None:
+        self.ordered = ordered
+        self.next_index = 0
+        self.held: dict[int, dict[str, Any]] = {}
+        self.failures = 0
+
+    def emit(self, line: dict[str, Any]) -> None:
+        if not line["ok"]:
+            self.failures += 1
+        if not self.ordered:
+            logger.info(json.dumps(line))
+            return
+        self.held[line["index"]] = line
+        while self.next_index in self.held:
+            logger.info(json.dumps(self.held.pop(self.next_index)))
+            self.next_index += 1
+
+
+def _batch_line(record: dict[str, Any], **fields: Any) -> dict[str, Any]:  # noqa: ANN401
+    line = {"index": record["index"], "tool": record["tool"]}
+    if "id" in record:
+        line["id"] = record["id"]
+    line.update(fields)
+    return line
+
+
+async def _run_batch_direct(
+    server: str,
+    records: list[dict[str, Any]],
+    emitter: _BatchEmitter,
+    *,
+    concurrency: int,
+    use_cache: bool,
+) -> None:
+    """Run batch records over one MCP session with bounded concurrency."""
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    cache = AnswerCache.from_env() if use_cache else None
+
+    async def _one(client: McpStdioClient, record: dict[str, Any]) -> None:
+        if record["error"]:
+            emitter.emit(_batch_line(record, ok=False, error=record["error"]))
+            return
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                payload, is_error, hit = await _call(client, cache, record["tool"], record["args"])
+            except McpError as exc:
+                line = _batch_line(record, ok=False, error=str(exc))
+            else:
+                line = _batch_line(
+                    record,
+                    ok=not is_error,
+                    cached=hit,
+                    result=payload,
+                )
+            line["latency_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        emitter.emit(line)
+
+    try:
+        async with McpStdioClient.from_config(server) as client:
+            await asyncio.gather(*(_one(client, record) for record in records))
+    finally:
+        if cache is not None:
+            cache.close()
+
+
+def _run_batch_codex(records: list[dict[str, Any]], emitter: _BatchEmitter) -> None:
+    """Run batch records one Codex process at a time (fallback transport)."""
+    for record in records:
+        if record["error"]:
+            emitter.emit(_batch_line(record, ok=False, error=record["error"]))
+            continue
+        started = time.perf_counter()
+        try:
+            _run_codex(_build_prompt(record["tool"], record["args"]))
+        except subprocess.CalledProcessError as exc:
+            line = _batch_line(record, ok=False, error=str(exc))
+        else:
+            line = _batch_line(record, ok=True)
+        line["latency_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        emitter.emit(line)
 
+
+def _main_batch(parsed: argparse.Namespace, transport: str) -> int:
+    """Execute a JSONL batch and stream one result line per call."""
+    try:
+        records = _read_batch(parsed.batch)
+    except OSError:
+        logger.exception("Cannot read batch input %s.", parsed.batch)
+        return 2
+    emitter = _BatchEmitter(ordered=parsed.ordered)
+    if transport == "direct":
+        try:
+            asyncio.run(
+                _run_batch_direct(
+                    parsed.server,
+                    records,
+                    emitter,
+                    concurrency=parsed.concurrency,
+                    use_cache=not parsed.no_cache,
+                ),
+            )
+        except McpStartError:
+            if parsed.transport == "direct":
+                raise
+            logger.warning("MCP server failed to start; falling back to Codex.")
+        except McpError as exc:
+            logger.error("MCP session failed: %s", exc)  # noqa: TRY400
+            return 1
+        else:
+            return 1 if emitter.failures else 0
+    _run_batch_codex(records, emitter)
+    return 1 if emitter.failures else 0
+
+
+def _main_single(parsed: argparse.Namespace, transport: str) -> int:
+    """Execute one tool call."""
     tool = parsed.tool
-    if tool in CONFIRM_REQUIRED and os.environ.get("NLM_CONFIRM") != "1":
-        logger.error(
-            "Tool %s requires confirmation. Re-run with NLM_CONFIRM=1.",
-            tool,
-        )
+    confirm_error = _confirm_error(tool)
+    if confirm_error:
+        logger.error(confirm_error)
         return 2
 
     args_json = parsed.args_json or os.environ.get("NLM_ARGS_JSON", "")
@@ -102,10 +311,103 @@ def main() -> int:
         logger.exception("Invalid args JSON.")
         return 2
 
+    if transport == "direct":
+        try:
+            ok = asyncio.run(
+                _run_direct(
+                    parsed.server,
+                    tool,
+                    tool_args,
+                    use_cache=not parsed.no_cache,
+                    reuse_session=parsed.reuse_session or None,
+                ),
+            )
+        except McpStartError:
+            if parsed.transport == "direct":
+                raise
+            logger.warning("MCP server failed to start; falling back to Codex.")
+        except McpError as exc:
+            logger.error("MCP session failed: %s", exc)  # noqa: TRY400
+            return 1
+        else:
+            return 0 if ok else 1
+
     prompt = _build_prompt(tool, tool_args)
     _run_codex(prompt)
     return 0
 
 
+def main() -> int:
+    """Execute the requested NotebookLM tool (or JSONL batch) directly or via Codex."""
+    _configure_logging()
+    parser = argparse.ArgumentParser(
+        description="Run NotebookLM MCP tools over MCP stdio or via Codex CLI.",
+    )
+    parser.add_argument("tool", nargs="?", help="NotebookLM tool name (e.g. notebook_list)")
+    parser.add_argument(
+        "--args",
+        dest="args_json",
+        default=None,
+        help="Optional JSON object of tool arguments.",
+    )
+    parser.add_argument(
+        "--batch",
+        default=None,
+        help="JSONL file of {tool, args} records to run over one session ('-' for stdin).",
+    )
+    parser.add_argument(
+        "--ordered",
+        action="store_true",
+        help="Emit batch results in input order instead of completion order.",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=int(os.environ.get("NLM_BATCH_CONCURRENCY", "4")),
+        help="Maximum batch calls in flight (direct transport only).",
+    )
+    parser.add_argument(
+        "--transport",
+        choices=TRANSPORTS,
+        default=os.environ.get("NLM_TRANSPORT", "auto"),
+        help="direct (MCP stdio), codex, or auto (direct when the server is on PATH).",
+    )
+    parser.add_argument(
+        "--server",
+        default=DEFAULT_SERVER,
+        help="Server name in mcp-config/servers.json for direct calls.",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Bypass the notebook_query answer cache (same as NLM_CACHE=0).",
+    )
+    parser.add_argument(
+        "--reuse-session",
+        action="store_true",
+        help="Ask notebook_query as a follow-up in the notebook's warm chat session "
+        "(same as NLM_REUSE_SESSION=1).",
+    )
+    parsed = parser.parse_args()
+    if (parsed.tool is None) == (parsed.batch is None):
+        parser.error("pass exactly one of a tool name or --batch")
+
+    transport = parsed.transport
+    if transport != "codex":
+        try:
+            command = str(load_server_config(parsed.server)["command"])
+        except (FileNotFoundError, KeyError) as exc:
+            if transport == "direct":
+                logger.error("Cannot run directly: %s", exc.args[0])  # noqa: TRY400
+                return 2
+            transport = "codex"
+        else:
+            transport = resolve_transport(transport, command)
+    with tracing.span(f"nlm_tasks {parsed.tool or 'batch'}", transport=transport):
+        if parsed.batch is not None:
+            return _main_batch(parsed, transport)
+        return _main_single(parsed, transport)
+
+
 if __name__ == "__main__":
     raise SystemExit(main())
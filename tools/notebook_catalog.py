@@ -0,0 +1,281 @@
+"""Local NotebookLM notebook catalog refreshed from ``notebook_list``."""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import sys
+import time
+from dataclasses import asdict, dataclass
+from typing import TYPE_CHECKING, Any
+
+from mcp_client import DEFAULT_SERVER, McpError, McpStdioClient
+from nlm_state import env_flag, state_dir
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator
+    from pathlib import Path
+
+logger = logging.getLogger("notebook_catalog")
+
+DEFAULT_TTL_S = 300.0
+DEFAULT_MAX_STALE_S = 3600.0
+
+
+@dataclass
+class RefreshSummary:
+    """Counts from merging a fresh ``notebook_list`` into the catalog."""
+
+    added: int = 0
+    updated: int = 0
+    removed: int = 0
+    unchanged: int = 0
+
+
+def _first(item: dict[str, Any], *keys: str) -> Any:  # noqa: ANN401
+    for key in keys:
+        value = item.get(key)
+        if value not in (None, ""):
+            return value
+    return None
+
+
+def notebook_entries(payload: Any) -> list[dict[str, Any]]:  # noqa: ANN401
+    """Normalize a ``notebook_list`` payload to catalog entries.
+
+    Each entry has ``id``, ``title``, ``source_count`` and ``updated_at``.
+    """
+    items = payload.get("notebooks", []) if isinstance(payload, dict) else payload
+    entries = []
+    for item in items or []:
+        if not isinstance(item, dict):
+            continue
+        notebook_id = _first(item, "id", "notebook_id")
+        if not notebook_id:
+            continue
+        sources = item.get("sources")
+        source_count = _first(item, "source_count", "sources_count")
+        if source_count is None and isinstance(sources, list):
+            source_count = len(sources)
+        entries.append(
+            {
+                "id": str(notebook_id),
+                "title": str(_first(item, "title", "name") or notebook_id),
+                "source_count": source_count,
+                "updated_at": _first(item, "updated_at", "modified_at", "last_modified"),
+            },
+        )
+    return entries
+
+
+def parse_notebook_ids(notebook_ids: str) -> list[str]:
+    """Split a comma-separated ``NOTEBOOK_IDS`` value."""
+    return [part.strip() for part in notebook_ids.split(",") if part.strip()]
+
+
+class NotebookCatalog:
+    """Notebook IDs, titles, source counts and update times cached on disk."""
+
+    def __init__(
+        self,
+        path: Path | None = None,
+        *,
+        ttl_s: float = DEFAULT_TTL_S,
+        max_stale_s: float = DEFAULT_MAX_STALE_S,
+    ) -> None:
+        """Load the catalog file if it exists."""
+        self.path = path or state_dir() / "catalog.json"
+        self.ttl_s = ttl_s
+        self.max_stale_s = max_stale_s
+        self.fetched_at = 0.0
+        self.notebooks: dict[str, dict[str, Any]] = {}
+        if self.path.exists():
+            try:
+                data = json.loads(self.path.read_text())
+            except json.JSONDecodeError:
+                data = {}
+            self.fetched_at = float(data.get("fetched_at", 0.0))
+            self.notebooks = data.get("notebooks", {})
+
+    @classmethod
+    def from_env(cls) -> NotebookCatalog:
+        """Build a catalog using ``NLM_CATALOG_TTL`` and ``NLM_CATALOG_MAX_STALE``."""
+        return cls(
+            ttl_s=float(os.environ.get("NLM_CATALOG_TTL", DEFAULT_TTL_S)),
+            max_stale_s=float(os.environ.get("NLM_CATALOG_MAX_STALE", DEFAULT_MAX_STALE_S)),
+        )
+
+    @property
+    def age_s(self) -> float:
+        """Seconds since the last successful refresh."""
+        return time.time() - self.fetched_at
+
+    def is_fresh(self) -> bool:
+        """Return True when the catalog is populated and within its TTL."""
+        return bool(self.notebooks) and self.age_s <= self.ttl_s
+
+    def is_usable_stale(self) -> bool:
+        """Return True when stale data may be served while a refresh runs."""
+        return bool(self.notebooks) and self.age_s <= self.max_stale_s
+
+    def entries(self) -> list[dict[str, Any]]:
+        """Return catalog entries sorted by title."""
+        return sorted(self.notebooks.values(), key=lambda entry: entry["title"].lower())
+
+    def lookup(self, key: str) -> dict[str, Any] | None:
+        """Find a notebook by exact ID, then by case-insensitive title."""
+        if key in self.notebooks:
+            return self.notebooks[key]
+        lowered = key.strip().lower()
+        for entry in self.notebooks.values():
+            if entry["title"].lower() == lowered:
+                return entry
+        return None
+
+    def select(self, notebook_ids: str) -> list[dict[str, Any]]:
+        """Apply ``NOTEBOOK_IDS`` filtering (IDs or titles) against the catalog."""
+        wanted = parse_notebook_ids(notebook_ids)
+        if not wanted:
+            return self.entries()
+        return [self.lookup(key) or {"id": key, "title": key} for key in wanted]
+
+    def merge(self, entries: list[dict[str, Any]]) -> RefreshSummary:
+        """Merge a fresh listing, keeping per-notebook change times."""
+        summary = RefreshSummary()
+        now = time.time()
+        current: dict[str, dict[str, Any]] = {}
+        for entry in entries:
+            previous = self.notebooks.get(entry["id"])
+            if previous is None:
+                summary.added += 1
+                current[entry["id"]] = {**entry, "changed_at": now}
+                continue
+            fields = ("title", "source_count", "updated_at")
+            if any(previous.get(field) != entry.get(field) for field in fields):
+                summary.updated += 1
+                current[entry["id"]] = {**entry, "changed_at": now}
+            else:
+                summary.unchanged += 1
+                current[entry["id"]] = previous
+        summary.removed = len(set(self.notebooks) - set(current))
+        self.notebooks = current
+        self.fetched_at = now
+        return summary
+
+    def save(self) -> None:
+        """Write the catalog atomically."""
+        tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps({"fetched_at": self.fetched_at, "notebooks": self.notebooks}))
+        tmp.replace(self.path)
+
+    async def refresh(self, client: McpStdioClient) -> RefreshSummary:
+        """Fetch ``notebook_list`` and merge it into the catalog."""
+        listing = await client.call_tool("notebook_list")
+        if listing.is_error:
+            message = f"notebook_list failed: {listing.payload()}"
+            raise McpError(message)
+        summary = self.merge(notebook_entries(listing.payload()))
+        self.save()
+        return summary
+
+    async def ensure(
+        self,
+        client: McpStdioClient,
+        *,
+        force: bool = False,
+    ) -> asyncio.Task[RefreshSummary] | None:
+        """Make the catalog usable, refreshing in the background when merely stale.
+
+        Returns the background refresh task (await it before closing ``client``),
+        or None when no background refresh was started.
+        """
+        if not force and self.is_fresh():
+            return None
+        if not force and self.is_usable_stale():
+            return asyncio.create_task(self.refresh(client))
+        await self.refresh(client)
+        return None
+
+    @contextlib.asynccontextmanager
+    async def ensured(
+        self,
+        client: McpStdioClient,
+        *,
+        force: bool = False,
+    ) -> AsyncIterator[NotebookCatalog]:
+        """``ensure`` the catalog, then finish any background refresh on exit.
+
+        Use it inside the client's ``async with`` so the refresh completes before the
+        client closes; a failed background refresh leaves the stale data in place.
+        """
+        refresh = await self.ensure(client, force=force)
+        try:
+            yield self
+        finally:
+            if refresh is not None:
+                with contextlib.suppress(McpError, TimeoutError):
+                    await refresh
+
+
+def force_refresh_requested() -> bool:
+    """Return True when ``NLM_CATALOG_REFRESH=1`` asks to bypass cached data."""
+    return env_flag("NLM_CATALOG_REFRESH", default=False)
+
+
+async def _refresh(server: str) -> RefreshSummary:
+    catalog = NotebookCatalog.from_env()
+    async with McpStdioClient.from_config(server) as client:
+        return await catalog.refresh(client)
+
+
+def _configure_logging() -> None:
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+def main() -> int:
+    """Show, refresh or query the local notebook catalog."""
+    _configure_logging()
+    parser = argparse.ArgumentParser(description="Local NotebookLM notebook catalog")
+    parser.add_argument("action", choices=["show", "refresh", "lookup"])
+    parser.add_argument("key", nargs="?", default="", help="Notebook ID or title for lookup.")
+    parser.add_argument("--server", default=DEFAULT_SERVER)
+    args = parser.parse_args()
+
+    if args.action == "refresh":
+        summary = asyncio.run(_refresh(args.server))
+        logger.info(json.dumps(asdict(summary)))
+        return 0
+
+    catalog = NotebookCatalog.from_env()
+    if args.action == "lookup":
+        entry = catalog.lookup(args.key)
+        if entry is None:
+            logger.error("Notebook %r not in catalog (age %.0fs).", args.key, catalog.age_s)
+            return 1
+        logger.info(json.dumps(entry, indent=2))
+        return 0
+
+    logger.info(
+        json.dumps(
+            {
+                "path": str(catalog.path),
+                "age_s": round(catalog.age_s, 1) if catalog.fetched_at else None,
+                "fresh": catalog.is_fresh(),
+                "notebooks": catalog.entries(),
+            },
+            indent=2,
+        ),
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,242 @@
+"""Per-notebook circuit breaker persisted between runs.
+
+Consecutive ``notebook_query`` timeouts are counted per notebook in
+``notebook_health.json`` in the state directory. A notebook with any recent
+timeout loses its retry; after ``NLM_BREAKER_THRESHOLD`` consecutive timeouts its
+circuit opens and it is skipped for ``NLM_BREAKER_COOLDOWN`` seconds. The next
+query after the cool-down is a single probe with a shorter deadline: success
+closes the circuit, another timeout re-opens it.
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import fcntl
+import json
+import logging
+import os
+import sys
+import time
+from dataclasses import asdict, dataclass
+from typing import TYPE_CHECKING, Any
+
+from nlm_state import env_flag, state_dir
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from pathlib import Path
+
+logger = logging.getLogger("notebook_health")
+
+DEFAULT_THRESHOLD = 3
+DEFAULT_COOLDOWN_S = 900.0
+DEFAULT_PROBE_FRACTION = 0.25
+EWMA_WEIGHT = 0.3
+
+
+@dataclass
+class NotebookHealth:
+    """Breaker state and latency history for one notebook."""
+
+    notebook_id: str
+    title: str = ""
+    consecutive_timeouts: int = 0
+    opened_at: float = 0.0
+    last_status: str = ""
+    last_error: str = ""
+    ewma_ms: float = 0.0
+    updated_at: float = 0.0
+
+
+@dataclass
+class QueryPlan:
+    """How the fan-out should treat one notebook this run."""
+
+    skip: bool
+    timeout_s: float
+    retries: int
+    reason: str = ""
+
+
+class HealthStore:
+    """Load, consult and update per-notebook breaker state."""
+
+    def __init__(
+        self,
+        path: Path | None = None,
+        *,
+        threshold: int = DEFAULT_THRESHOLD,
+        cooldown_s: float = DEFAULT_COOLDOWN_S,
+        probe_fraction: float = DEFAULT_PROBE_FRACTION,
+    ) -> None:
+        """Read the saved state, if any."""
+        self.path = path or state_dir() / "notebook_health.json"
+        self.threshold = threshold
+        self.cooldown_s = cooldown_s
+        self.probe_fraction = probe_fraction
+        self.notebooks = self._read()
+        self._dirty: set[str] = set()
+
+    @classmethod
+    def from_env(cls) -> HealthStore | None:
+        """Build from ``NLM_BREAKER_*`` settings, or None when ``NLM_BREAKER=0``."""
+        if not env_flag("NLM_BREAKER"):
+            return None
+        return cls(
+            threshold=int(os.environ.get("NLM_BREAKER_THRESHOLD", DEFAULT_THRESHOLD)),
+            cooldown_s=float(os.environ.get("NLM_BREAKER_COOLDOWN", DEFAULT_COOLDOWN_S)),
+            probe_fraction=float(
+                os.environ.get("NLM_BREAKER_PROBE_FRACTION", DEFAULT_PROBE_FRACTION),
+            ),
+        )
+
+    def _read(self) -> dict[str, NotebookHealth]:
+        try:
+            data = json.loads(self.path.read_text())
+        except (OSError, json.JSONDecodeError):
+            return {}
+        return {key: NotebookHealth(**value) for key, value in data.items()}
+
+    def state(self, notebook_id: str, now: float | None = None) -> str:
+        """Return ``closed``, ``open`` or ``half_open`` for a notebook."""
+        health = self.notebooks.get(notebook_id)
+        if health is None or health.consecutive_timeouts < self.threshold:
+            return "closed"
+        now = time.time() if now is None else now
+        return "open" if now - health.opened_at < self.cooldown_s else "half_open"
+
+    def plan(self, notebook_id: str, timeout_s: float, retries: int) -> QueryPlan:
+        """Decide whether to query a notebook, with what deadline and retry budget."""
+        state = self.state(notebook_id)
+        health = self.notebooks.get(notebook_id)
+        if state == "open" and health is not None:
+            remaining = self.cooldown_s - (time.time() - health.opened_at)
+            return QueryPlan(
+                skip=True,
+                timeout_s=0.0,
+                retries=0,
+                reason=f"circuit open after {health.consecutive_timeouts} timeouts; "
+                f"retrying in {remaining:.0f}s",
+            )
+        if state == "half_open":
+            return QueryPlan(skip=False, timeout_s=timeout_s * self.probe_fraction, retries=0)
+        if health is not None and health.consecutive_timeouts:
+            return QueryPlan(skip=False, timeout_s=timeout_s, retries=0)
+        return QueryPlan(skip=False, timeout_s=timeout_s, retries=retries)
+
+    def record(
+        self,
+        notebook_id: str,
+        *,
+        title: str,
+        status: str,
+        elapsed_ms: float,
+        error: str = "",
+    ) -> None:
+        """Fold one query outcome into the notebook's state."""
+        now = time.time()
+        health = self.notebooks.setdefault(notebook_id, NotebookHealth(notebook_id))
+        health.title = title or health.title
+        health.last_status = status
+        health.last_error = error
+        health.updated_at = now
+        if status == "timeout":
+            health.consecutive_timeouts += 1
+            if health.consecutive_timeouts >= self.threshold:
+                health.opened_at = now
+        elif status == "ok":
+            health.consecutive_timeouts = 0
+            health.opened_at = 0.0
+            health.ewma_ms = (
+                elapsed_ms
+                if not health.ewma_ms
+                else EWMA_WEIGHT * elapsed_ms + (1 - EWMA_WEIGHT) * health.ewma_ms
+            )
+        self._dirty.add(notebook_id)
+
+    @contextlib.contextmanager
+    def _locked(self) -> Iterator[None]:
+        with self.path.with_suffix(".lock").open("a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            yield
+
+    def _write(self, notebooks: dict[str, NotebookHealth]) -> None:
+        tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(
+            json.dumps({key: asdict(value) for key, value in notebooks.items()}, indent=2),
+        )
+        tmp.replace(self.path)
+        self.notebooks = notebooks
+
+    def save(self) -> None:
+        """Merge this process's updates into the file, keeping other processes' entries."""
+        if not self._dirty:
+            return
+        with self._locked():
+            merged = self._read()
+            for notebook_id in self._dirty:
+                merged[notebook_id] = self.notebooks[notebook_id]
+            self._write(merged)
+        self._dirty.clear()
+
+    def reset(self, notebook_id: str = "") -> None:
+        """Forget one notebook's state, or every notebook's when no ID is given."""
+        with self._locked():
+            merged = self._read()
+            if notebook_id:
+                merged.pop(notebook_id, None)
+            else:
+                merged.clear()
+            self._write(merged)
+
+    def open_notebooks(self) -> list[NotebookHealth]:
+        """Return notebooks whose circuit is currently open."""
+        return [h for h in self.notebooks.values() if self.state(h.notebook_id) == "open"]
+
+    def report(self) -> list[dict[str, Any]]:
+        """Return every tracked notebook with its breaker state."""
+        now = time.time()
+        rows = []
+        for health in sorted(self.notebooks.values(), key=lambda h: h.title.lower()):
+            row = {**asdict(health), "state": self.state(health.notebook_id, now)}
+            row["ewma_ms"] = round(health.ewma_ms, 1)
+            rows.append(row)
+        return rows
+
+
+def _configure_logging() -> None:
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+def main() -> int:
+    """Show or reset per-notebook circuit breaker state."""
+    _configure_logging()
+    parser = argparse.ArgumentParser(description="NotebookLM notebook health")
+    parser.add_argument("action", choices=["status", "reset"])
+    parser.add_argument("notebook_id", nargs="?", default="")
+    args = parser.parse_args()
+
+    store = HealthStore.from_env() or HealthStore()
+    if args.action == "reset":
+        store.reset(args.notebook_id)
+        logger.info("Reset health for %s", args.notebook_id or "all notebooks")
+        return 0
+    for row in store.report():
+        logger.info(
+            "%-9s %-40s timeouts=%d ewma=%.0fms last=%s",
+            row["state"],
+            f"{row['title']} ({row['notebook_id']})",
+            row["consecutive_timeouts"],
+            row["ewma_ms"],
+            row["last_status"] or "-",
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
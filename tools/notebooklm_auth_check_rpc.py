@@ -1,25 +1,102 @@
-"""Check NotebookLM auth cookies via a lightweight request."""
+"""Check NotebookLM auth cookies via a lightweight request.
+
+Results are cached per auth-file hash, and cookie expiry recorded in the auth
+file settles obviously valid or expired states without a network round-trip.
+"""
 
 from __future__ import annotations
 
+import hashlib
 import json
 import logging
 import os
+import time
 import urllib.request
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Any
 from urllib.parse import urlparse
 
+import tracing
+from nlm_state import env_flag, state_dir
+
 logger = logging.getLogger(__name__)
 
+DEFAULT_AUTH_FILE = "~/.notebooklm-mcp/auth.json"
+DEFAULT_URL = "https://notebooklm.google.com/"
+DEFAULT_CACHE_TTL_S = 300.0
+# Treat cookies as obviously valid offline only with at least this much lifetime left.
+OFFLINE_VALID_MARGIN_S = 24 * 60 * 60
+SESSION_COOKIES = {
+    "SID",
+    "HSID",
+    "SSID",
+    "APISID",
+    "SAPISID",
+    "__Secure-1PSID",
+    "__Secure-3PSID",
+}
+
+
+@dataclass
+class AuthResult:
+    """Outcome of an auth check and how it was decided."""
+
+    valid: bool
+    reason: str
+    source: str
 
-def _load_cookie_header(auth_file: Path) -> str:
-    """Load the cookie header from the auth file."""
-    data = json.loads(auth_file.read_text())
+
+def _auth_path() -> Path:
+    return Path(os.environ.get("AUTH_FILE", DEFAULT_AUTH_FILE)).expanduser()
+
+
+def _cookie_items(data: dict[str, Any]) -> list[dict[str, Any]]:
+    """Return cookies as ``{"name", "value", "expires"}`` dicts for either auth-file layout."""
     cookies = data.get("cookies", {})
+    if isinstance(cookies, dict):
+        return [{"name": k, "value": v, "expires": None} for k, v in cookies.items()]
+    items = []
+    for cookie in cookies or []:
+        if isinstance(cookie, dict) and "name" in cookie:
+            expires = cookie.get("expires", cookie.get("expirationDate"))
+            items.append(
+                {"name": cookie["name"], "value": cookie.get("value", ""), "expires": expires},
+            )
+    return items
+
+
+def _cookie_header(data: dict[str, Any]) -> str:
+    """Build the cookie header from parsed auth-file data."""
+    cookies = _cookie_items(data)
     if not cookies:
         message = "no cookies found in auth file"
         raise ValueError(message)
-    return "; ".join(f"{k}={v}" for k, v in cookies.items())
+    return "; ".join(f"{c['name']}={c['value']}" for c in cookies)
+
+
+def _offline_verdict(data: dict[str, Any], now: float) -> AuthResult | None:
+    """Decide from recorded session-cookie expiry, or return None when it is unknown."""
+    expiries = [
+        float(c["expires"])
+        for c in _cookie_items(data)
+        if c["name"] in SESSION_COOKIES
+        and isinstance(c["expires"], int | float)
+        and c["expires"] > 0
+    ]
+    if not expiries:
+        return None
+    earliest = min(expiries)
+    if earliest <= now:
+        return AuthResult(valid=False, reason="session cookies expired", source="offline")
+    if earliest - now >= OFFLINE_VALID_MARGIN_S:
+        days = (earliest - now) / 86400
+        return AuthResult(
+            valid=True,
+            reason=f"session cookies valid for {days:.1f}d",
+            source="offline",
+        )
+    return None
 
 
 def _check_auth(cookie_header: str, url: str) -> str:
@@ -39,38 +116,103 @@ def _check_auth(cookie_header: str, url: str) -> str:
         return resp.geturl()
 
 
-def main() -> int:
-    """Run the auth check for the configured NotebookLM URL."""
-    logging.basicConfig(level=logging.INFO, format="%(message)s")
-    auth_file = Path(
-        os.environ.get("AUTH_FILE", "~/.notebooklm-mcp/auth.json"),
-    ).expanduser()
-    url = os.environ.get("NOTEBOOKLM_URL", "https://notebooklm.google.com/")
-
+def _read_cache(cache_file: Path, key: str, ttl_s: float, now: float) -> AuthResult | None:
+    try:
+        cached = json.loads(cache_file.read_text())
+    except (OSError, json.JSONDecodeError):
+        return None
+    if cached.get("key") != key or now - float(cached.get("checked_at", 0)) > ttl_s:
+        return None
+    return AuthResult(valid=bool(cached["valid"]), reason=str(cached["reason"]), source="cache")
+
+
+def _write_cache(cache_file: Path, key: str, result: AuthResult, now: float) -> None:
+    payload = {"key": key, "valid": result.valid, "reason": result.reason, "checked_at": now}
+    cache_file.write_text(json.dumps(payload))
+
+
+def _local_verdict(
+    data: dict[str, Any],
+    cache_file: Path,
+    key: str,
+    now: float,
+    *,
+    use_cache: bool,
+) -> AuthResult | None:
+    """Return a verdict that needs no network probe, or None."""
+    offline = _offline_verdict(data, now)
+    if offline is not None and not offline.valid:
+        return offline
+    if not use_cache:
+        return None
+    ttl_s = float(os.environ.get("AUTH_CHECK_TTL", DEFAULT_CACHE_TTL_S))
+    return _read_cache(cache_file, key, ttl_s, now) or offline
+
+
+def check_auth(
+    auth_file: Path | None = None,
+    url: str | None = None,
+    *,
+    use_cache: bool = True,
+) -> AuthResult:
+    """Check auth in-process: cache, then offline cookie expiry, then a network probe.
+
+    The cache key is a hash of the auth file and probe URL, so refreshed cookies
+    are always re-checked. Expired session cookies fail offline; set
+    ``AUTH_CHECK_CACHE=0`` (or ``use_cache=False``) to skip the cache and the
+    offline "still valid" shortcut.
+    """
+    auth_file = auth_file or _auth_path()
+    url = url or os.environ.get("NOTEBOOKLM_URL", DEFAULT_URL)
     if not auth_file.exists() or auth_file.stat().st_size == 0:
-        logger.error("Auth file not found at %s.", auth_file)
-        logger.error("Run: notebooklm-mcp-auth --file")
-        return 1
+        return AuthResult(valid=False, reason=f"auth file not found at {auth_file}", source="file")
 
+    raw = auth_file.read_bytes()
     try:
-        cookie_header = _load_cookie_header(auth_file)
-    except (json.JSONDecodeError, ValueError, OSError):
-        logger.exception("Failed to load cookies from %s.", auth_file)
-        return 1
+        data = json.loads(raw)
+        cookie_header = _cookie_header(data)
+    except (json.JSONDecodeError, ValueError) as exc:
+        return AuthResult(valid=False, reason=f"failed to load cookies: {exc}", source="file")
+
+    now = time.time()
+    key = hashlib.sha256(raw + url.encode()).hexdigest()
+    cache_file = state_dir() / "auth_check.json"
+    local = _local_verdict(
+        data,
+        cache_file,
+        key,
+        now,
+        use_cache=use_cache and env_flag("AUTH_CHECK_CACHE"),
+    )
+    if local is not None:
+        return local
 
     try:
-        final_url = _check_auth(cookie_header, url)
-    except (OSError, ValueError):
-        logger.exception("Auth check failed.")
-        return 1
+        with tracing.span("auth probe", "http", url=url):
+            final_url = _check_auth(cookie_header, url)
+    except (OSError, ValueError) as exc:
+        return AuthResult(valid=False, reason=f"auth probe failed: {exc}", source="network")
 
     if "accounts.google.com" in final_url:
-        logger.error("Auth appears expired (redirected to login).")
-        logger.error("Re-auth with: notebooklm-mcp-auth --file")
-        return 1
+        result = AuthResult(valid=False, reason="redirected to login", source="network")
+    else:
+        result = AuthResult(valid=True, reason="no login redirect", source="network")
+    _write_cache(cache_file, key, result, now)
+    return result
+
+
+def main() -> int:
+    """Run the auth check for the configured NotebookLM URL."""
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    result = check_auth()
+
+    if result.valid:
+        logger.info("Auth looks valid (%s; via %s).", result.reason, result.source)
+        return 0
 
-    logger.info("Auth looks valid (no login redirect).")
-    return 0
+    logger.error("Auth check failed: %s (via %s).", result.reason, result.source)
+    logger.error("Re-auth with: notebooklm-mcp-auth --file")
+    return 1
 
 
 if __name__ == "__main__":
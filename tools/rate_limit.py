@@ -0,0 +1,287 @@
+"""Token-bucket rate limit with AIMD concurrency, shared by every task process.
+
+State lives in ``rate_limit.json`` in the state directory and is only touched
+under an exclusive ``flock`` on ``rate_limit.lock``, so parallel pixi tasks draw
+from one bucket. Each call takes a token and an in-flight lease. Successes grow
+the concurrency limit additively; timeouts, throttling and transport errors
+halve it (at most once per cooldown window). ``codex exec`` launches only spend a
+token: a Codex run lasts minutes, and its exit status says nothing about throttling.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import fcntl
+import json
+import logging
+import os
+import sys
+import time
+import uuid
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any
+
+from nlm_state import env_flag, state_dir
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator, Callable
+    from pathlib import Path
+
+logger = logging.getLogger("rate_limit")
+
+DEFAULT_RATE = 5.0
+DEFAULT_BURST = 10.0
+DEFAULT_MIN_CONCURRENCY = 1.0
+DEFAULT_MAX_CONCURRENCY = 8.0
+DECREASE_COOLDOWN_S = 2.0
+MAX_LEASE_S = 900.0
+MAX_WAIT_S = 0.5
+CONGESTION_OUTCOMES = {"timeout", "throttled", "error"}
+THROTTLE_MARKERS = ("429", "rate limit", "too many requests", "quota", "resource_exhausted")
+
+
+def is_throttle_message(text: str) -> bool:
+    """Return True when an error message looks like server-side throttling."""
+    lowered = text.lower()
+    return any(marker in lowered for marker in THROTTLE_MARKERS)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+@dataclass
+class Slot:
+    """An acquired lease; set ``outcome`` before release to report how the call went."""
+
+    lease_id: str
+    outcome: str = "ok"
+
+
+class RateLimiter:
+    """Cross-process token bucket plus an AIMD-adjusted in-flight limit."""
+
+    def __init__(
+        self,
+        path: Path | None = None,
+        *,
+        rate: float = DEFAULT_RATE,
+        burst: float = DEFAULT_BURST,
+        min_concurrency: float = DEFAULT_MIN_CONCURRENCY,
+        max_concurrency: float = DEFAULT_MAX_CONCURRENCY,
+    ) -> None:
+        """Configure the bucket; shared state is created on first use."""
+        self.path = path or state_dir() / "rate_limit.json"
+        self.lock_path = self.path.with_suffix(".lock")
+        self.rate = rate
+        self.burst = burst
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+
+    @classmethod
+    def from_env(cls) -> RateLimiter | None:
+        """Build from ``NLM_RATE``, ``NLM_RATE_BURST`` and ``NLM_MAX_CONCURRENCY``.
+
+        Returns None when ``NLM_RATE_LIMIT=0``.
+        """
+        if not env_flag("NLM_RATE_LIMIT"):
+            return None
+        return cls(
+            rate=float(os.environ.get("NLM_RATE", DEFAULT_RATE)),
+            burst=float(os.environ.get("NLM_RATE_BURST", DEFAULT_BURST)),
+            max_concurrency=float(os.environ.get("NLM_MAX_CONCURRENCY", DEFAULT_MAX_CONCURRENCY)),
+        )
+
+    def _fresh_state(self, now: float) -> dict[str, Any]:
+        return {
+            "tokens": self.burst,
+            "updated_at": now,
+            "limit": self.max_concurrency,
+            "leases": {},
+            "last_decrease": 0.0,
+            "counters": {},
+        }
+
+    def _transact(self, update: Callable[[dict[str, Any], float], Any]) -> Any:  # noqa: ANN401
+        """Apply ``update`` to the shared state under the file lock."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.lock_path.open("a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            now = time.time()
+            try:
+                state = json.loads(self.path.read_text())
+            except (OSError, json.JSONDecodeError):
+                state = self._fresh_state(now)
+            self._refill(state, now)
+            result = update(state, now)
+            tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_text(json.dumps(state))
+            tmp.replace(self.path)
+            return result
+
+    def _refill(self, state: dict[str, Any], now: float) -> None:
+        elapsed = max(0.0, now - float(state["updated_at"]))
+        state["tokens"] = min(self.burst, float(state["tokens"]) + elapsed * self.rate)
+        state["updated_at"] = now
+        state["limit"] = min(self.max_concurrency, max(self.min_concurrency, state["limit"]))
+        state["leases"] = {
+            lease_id: lease
+            for lease_id, lease in state["leases"].items()
+            if now - lease["started_at"] < MAX_LEASE_S and _pid_alive(lease["pid"])
+        }
+
+    def try_acquire(self) -> tuple[str | None, float]:
+        """Take a token and lease if both are available, else say how long to wait."""
+
+        def update(state: dict[str, Any], now: float) -> tuple[str | None, float]:
+            if len(state["leases"]) >= int(state["limit"]):
+                return None, MAX_WAIT_S / 5
+            if state["tokens"] < 1:
+                return None, min(MAX_WAIT_S, (1 - state["tokens"]) / self.rate)
+            state["tokens"] -= 1
+            lease_id = uuid.uuid4().hex
+            state["leases"][lease_id] = {"pid": os.getpid(), "started_at": now}
+            return lease_id, 0.0
+
+        return self._transact(update)
+
+    def try_take_token(self) -> float:
+        """Spend a token without taking a lease; return 0.0, or how long to wait."""
+
+        def update(state: dict[str, Any], _now: float) -> float:
+            if state["tokens"] < 1:
+                return min(MAX_WAIT_S, (1 - state["tokens"]) / self.rate)
+            state["tokens"] -= 1
+            return 0.0
+
+        return self._transact(update)
+
+    def release(self, slot: Slot) -> None:
+        """Return a lease and adjust the concurrency limit from its outcome."""
+
+        def update(state: dict[str, Any], now: float) -> None:
+            state["leases"].pop(slot.lease_id, None)
+            counters = state.setdefault("counters", {})
+            counters[slot.outcome] = counters.get(slot.outcome, 0) + 1
+            if slot.outcome in CONGESTION_OUTCOMES:
+                if now - state["last_decrease"] >= DECREASE_COOLDOWN_S:
+                    state["limit"] = max(self.min_concurrency, state["limit"] / 2)
+                    state["last_decrease"] = now
+            else:
+                state["limit"] = min(self.max_concurrency, state["limit"] + 1 / state["limit"])
+
+        self._transact(update)
+
+    async def acquire(self) -> Slot:
+        """Wait (without blocking the event loop) for a token and a lease."""
+        while True:
+            lease_id, wait_s = self.try_acquire()
+            if lease_id is not None:
+                return Slot(lease_id)
+            await asyncio.sleep(wait_s)
+
+    @contextlib.asynccontextmanager
+    async def slot(self) -> AsyncIterator[Slot]:
+        """Hold a lease for the enclosed call; exceptions count as congestion."""
+        slot = await self.acquire()
+        try:
+            yield slot
+        except TimeoutError:
+            slot.outcome = "timeout"
+            raise
+        except Exception:
+            slot.outcome = "error"
+            raise
+        finally:
+            self.release(slot)
+
+    def pace_blocking(self) -> None:
+        """Wait for a token from synchronous code, without holding a lease."""
+        while (wait_s := self.try_take_token()) > 0:
+            time.sleep(wait_s)
+
+    def status(self) -> dict[str, Any]:
+        """Return the current limits, tokens, in-flight leases and outcome counters."""
+
+        def update(state: dict[str, Any], now: float) -> dict[str, Any]:
+            return {
+                "path": str(self.path),
+                "rate_per_s": self.rate,
+                "burst": self.burst,
+                "tokens": round(state["tokens"], 2),
+                "concurrency_limit": round(state["limit"], 2),
+                "max_concurrency": self.max_concurrency,
+                "in_flight": len(state["leases"]),
+                "last_decrease_s_ago": round(now - state["last_decrease"], 1)
+                if state["last_decrease"]
+                else None,
+                "counters": state.get("counters", {}),
+            }
+
+        return self._transact(update)
+
+    def reset(self) -> None:
+        """Restore a full bucket and the maximum concurrency limit."""
+
+        def update(state: dict[str, Any], now: float) -> None:
+            state.clear()
+            state.update(self._fresh_state(now))
+
+        self._transact(update)
+
+
+_shared: list[RateLimiter | None] = []
+
+
+def shared_limiter() -> RateLimiter | None:
+    """Return the process-wide limiter built from the environment (None when disabled)."""
+    if not _shared:
+        _shared.append(RateLimiter.from_env())
+    return _shared[0]
+
+
+def pace_launch() -> None:
+    """Spend a shared-limiter token before launching a long subprocess, if limiting is on.
+
+    No lease is held, so the subprocess neither occupies an in-flight slot for its
+    whole run nor feeds its exit status into the concurrency limit.
+    """
+    limiter = shared_limiter()
+    if limiter is not None:
+        limiter.pace_blocking()
+
+
+def _configure_logging() -> None:
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+def main() -> int:
+    """Show or reset the shared rate-limit state."""
+    _configure_logging()
+    parser = argparse.ArgumentParser(description="Shared NotebookLM rate limiter")
+    parser.add_argument("action", choices=["status", "reset"])
+    args = parser.parse_args()
+
+    limiter = RateLimiter.from_env() or RateLimiter()
+    if args.action == "reset":
+        limiter.reset()
+        logger.info("Reset rate-limit state at %s", limiter.path)
+        return 0
+    logger.info(json.dumps(limiter.status(), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
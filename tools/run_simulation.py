@@ -9,11 +9,22 @@ from pathlib import Path
 
 ROOT = Path(__file__).resolve().parents[1]
 STAMP = ROOT / ".pixi-cache" / "simulation.stamp"
+REPORT = ROOT / ".pixi-cache" / "simulation-timings.json"
 
 
 def main() -> int:
-    """Run simulation tests."""
-    subprocess.run([sys.executable, "tests/run_simulation.py"], check=True, cwd=ROOT)  # noqa: S603
+    """Run simulation tests in fast mode, keeping the timing report next to the stamp."""
+    subprocess.run(  # noqa: S603
+        [
+            sys.executable,
+            "tests/run_simulation.py",
+            "--fast",
+            "--report",
+            str(REPORT),
+        ],
+        check=True,
+        cwd=ROOT,
+    )
     STAMP.parent.mkdir(parents=True, exist_ok=True)
     STAMP.write_text(f"ok {datetime.now(UTC).isoformat()}\n")
     return 0
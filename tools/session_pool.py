@@ -0,0 +1,207 @@
+"""Warm NotebookLM chat sessions, kept per notebook between task runs.
+
+With reuse enabled (``NLM_REUSE_SESSION=1`` or ``--reuse-session``) the
+``session_id`` returned by each successful ``notebook_query`` is stored in
+``sessions.json`` in the state directory, keyed by notebook, and the next
+question to that notebook is sent as a follow-up in the same chat instead of a
+cold one, as long as the session has been idle for less than
+``NLM_SESSION_IDLE`` seconds. Without reuse the file is not touched. A
+follow-up that fails or times out is retried once as a cold question, within
+what is left of the caller's timeout, and the stale session is dropped.
+Follow-ups are never served from the answer cache.
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import fcntl
+import json
+import logging
+import os
+import sys
+import time
+from typing import TYPE_CHECKING, Any
+
+from answer_cache import cached_query
+from mcp_client import McpError
+from nlm_state import env_flag, state_dir
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from pathlib import Path
+
+    from answer_cache import AnswerCache
+    from mcp_client import McpStdioClient
+
+logger = logging.getLogger("session_pool")
+
+DEFAULT_IDLE_S = 15 * 60
+
+
+def response_session_id(payload: Any) -> str:  # noqa: ANN401
+    """Return the ``session_id`` from a ``notebook_query`` payload, or ``""``."""
+    if isinstance(payload, dict):
+        return str(payload.get("session_id") or payload.get("conversation_id") or "")
+    return ""
+
+
+class SessionPool:
+    """Per-notebook chat sessions with idle expiry, shared through a JSON file."""
+
+    def __init__(
+        self,
+        path: Path | None = None,
+        *,
+        idle_s: float = DEFAULT_IDLE_S,
+        reuse: bool = False,
+    ) -> None:
+        """Bind the pool file; ``reuse`` decides whether queries join warm sessions."""
+        self.path = path or state_dir() / "sessions.json"
+        self.idle_s = idle_s
+        self.reuse = reuse
+
+    @classmethod
+    def from_env(cls, *, reuse: bool | None = None) -> SessionPool:
+        """Read ``NLM_SESSION_IDLE`` and, unless ``reuse`` is given, ``NLM_REUSE_SESSION``."""
+        return cls(
+            idle_s=float(os.environ.get("NLM_SESSION_IDLE", DEFAULT_IDLE_S)),
+            reuse=env_flag("NLM_REUSE_SESSION", default=False) if reuse is None else reuse,
+        )
+
+    @contextlib.contextmanager
+    def _locked(self, *, write: bool = True) -> Iterator[dict[str, dict[str, Any]]]:
+        """Yield the live sessions under the file lock, writing them back if ``write``."""
+        with self.path.with_suffix(".lock").open("a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                sessions = json.loads(self.path.read_text())
+            except (OSError, json.JSONDecodeError):
+                sessions = {}
+            now = time.time()
+            sessions = {
+                notebook_id: entry
+                for notebook_id, entry in sessions.items()
+                if now - entry["last_used"] < self.idle_s
+            }
+            yield sessions
+            if not write:
+                return
+            tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_text(json.dumps(sessions, indent=2))
+            tmp.replace(self.path)
+
+    def session_for(self, notebook_id: str) -> str:
+        """Return the warm session to reuse for ``notebook_id``, or ``""``."""
+        if not self.reuse:
+            return ""
+        with self._locked(write=False) as sessions:
+            entry = sessions.get(notebook_id)
+            return entry["session_id"] if entry else ""
+
+    def remember(self, notebook_id: str, session_id: str) -> None:
+        """Record ``session_id`` as the notebook's warm session (only with reuse enabled)."""
+        if not self.reuse or not session_id:
+            return
+        with self._locked() as sessions:
+            entry = sessions.get(notebook_id)
+            turns = entry["turns"] + 1 if entry and entry["session_id"] == session_id else 1
+            sessions[notebook_id] = {
+                "session_id": session_id,
+                "turns": turns,
+                "last_used": time.time(),
+            }
+
+    def forget(self, notebook_id: str = "") -> None:
+        """Drop one notebook's session, or every session when no ID is given."""
+        with self._locked() as sessions:
+            if notebook_id:
+                sessions.pop(notebook_id, None)
+            else:
+                sessions.clear()
+
+    def entries(self) -> dict[str, dict[str, Any]]:
+        """Return the sessions that have not idled out."""
+        if not self.path.exists():
+            return {}
+        with self._locked(write=False) as sessions:
+            return dict(sessions)
+
+
+async def pooled_query(
+    client: McpStdioClient,
+    cache: AnswerCache | None,
+    pool: SessionPool | None,
+    args: dict[str, Any],
+    *,
+    timeout_s: float | None = None,
+) -> tuple[Any, bool, bool]:
+    """Run ``notebook_query`` in the notebook's warm session when the pool allows it.
+
+    Returns ``(payload, is_error, cache_hit)`` like ``cached_query``. ``timeout_s`` bounds
+    the follow-up and the cold retry together, not each of them.
+    """
+    if pool is None or not pool.reuse or "session_id" in args:
+        return await cached_query(client, cache, args, timeout_s=timeout_s)
+    deadline = None if timeout_s is None else time.monotonic() + timeout_s
+    notebook_id = str(args.get("notebook_id", ""))
+    session_id = pool.session_for(notebook_id)
+    if session_id:
+        try:
+            payload, is_error, hit = await cached_query(
+                client,
+                cache,
+                {**args, "session_id": session_id},
+                timeout_s=timeout_s,
+            )
+        except (McpError, TimeoutError):
+            is_error = True
+        if not is_error:
+            pool.remember(notebook_id, response_session_id(payload) or session_id)
+            return payload, is_error, hit
+        logger.warning("Session %s for %s failed; asking cold.", session_id, notebook_id)
+        pool.forget(notebook_id)
+    remaining = None if deadline is None else deadline - time.monotonic()
+    if remaining is not None and remaining <= 0:
+        raise TimeoutError
+    payload, is_error, hit = await cached_query(client, cache, args, timeout_s=remaining)
+    if not is_error:
+        pool.remember(notebook_id, response_session_id(payload))
+    return payload, is_error, hit
+
+
+def _configure_logging() -> None:
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+def main() -> int:
+    """List or clear warm chat sessions."""
+    _configure_logging()
+    parser = argparse.ArgumentParser(description="NotebookLM chat session pool")
+    parser.add_argument("action", choices=["list", "clear"])
+    parser.add_argument("notebook_id", nargs="?", default="")
+    args = parser.parse_args()
+
+    pool = SessionPool.from_env()
+    if args.action == "clear":
+        pool.forget(args.notebook_id)
+        logger.info("Cleared sessions for %s", args.notebook_id or "all notebooks")
+        return 0
+    now = time.time()
+    for notebook_id, entry in sorted(pool.entries().items()):
+        logger.info(
+            "%s session=%s turns=%d idle=%.0fs",
+            notebook_id,
+            entry["session_id"],
+            entry["turns"],
+            now - entry["last_used"],
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,199 @@
+"""Lightweight spans for subprocess launches, MCP calls and HTTP probes.
+
+Tracing is off unless ``NLM_TRACE_FILE`` is set. Spans are appended as they
+finish, one JSON object per line, or as Chrome trace events when the file name
+ends in ``.json`` (open it in ``chrome://tracing`` or Perfetto). Child processes
+started through :func:`run` inherit the file and their parent span, so a whole
+``bootstrap-parallel`` run lands in one nested trace.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import contextvars
+import fcntl
+import functools
+import hashlib
+import json
+import os
+import subprocess
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, ParamSpec, TypeVar
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterator
+
+P = ParamSpec("P")
+R = TypeVar("R")
+
+TRACE_FILE_ENV = "NLM_TRACE_FILE"
+TRACE_PARENT_ENV = "NLM_TRACE_PARENT"
+
+_current: contextvars.ContextVar[Span | None] = contextvars.ContextVar("span", default=None)
+
+
+@dataclass
+class Span:
+    """One timed operation; ``attrs`` carry command, args hash, exit status and sizes."""
+
+    name: str
+    kind: str
+    span_id: str = field(default_factory=lambda: uuid.uuid4().hex[:16])
+    parent_id: str | None = None
+    start: float = field(default_factory=time.time)
+    end: float = 0.0
+    status: str = "ok"
+    attrs: dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def duration_ms(self) -> float:
+        """Elapsed wall time in milliseconds."""
+        return (self.end - self.start) * 1000
+
+    def set(self, **attrs: object) -> None:
+        """Attach attributes to the span."""
+        self.attrs.update(attrs)
+
+    def to_dict(self) -> dict[str, Any]:
+        """Return the JSONL record for this span."""
+        return {
+            "name": self.name,
+            "kind": self.kind,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "pid": os.getpid(),
+            "start": self.start,
+            "end": self.end,
+            "duration_ms": round(self.duration_ms, 3),
+            "status": self.status,
+            "attrs": self.attrs,
+        }
+
+    def to_chrome(self) -> dict[str, Any]:
+        """Return a Chrome trace "complete" event for this span."""
+        return {
+            "name": self.name,
+            "cat": self.kind,
+            "ph": "X",
+            "ts": round(self.start * 1_000_000),
+            "dur": round(self.duration_ms * 1000),
+            "pid": os.getpid(),
+            "tid": _track_id(),
+            "args": {
+                "span_id": self.span_id,
+                "parent_id": self.parent_id,
+                "status": self.status,
+                **self.attrs,
+            },
+        }
+
+
+def trace_file() -> Path | None:
+    """Return the configured trace file, or None when tracing is disabled."""
+    value = os.environ.get(TRACE_FILE_ENV, "")
+    return Path(value).expanduser() if value else None
+
+
+def args_hash(value: object) -> str:
+    """Short stable hash of call arguments, so spans do not leak prompts or secrets."""
+    material = json.dumps(value, sort_keys=True, default=str)
+    return hashlib.sha256(material.encode()).hexdigest()[:12]
+
+
+def _track_id() -> int:
+    """Group spans by asyncio task (or thread) so concurrent calls get their own rows."""
+    with contextlib.suppress(RuntimeError):
+        task = asyncio.current_task()
+        if task is not None:
+            return id(task) % 1_000_000
+    return threading.get_native_id()
+
+
+def _export(span: Span, path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    chrome = path.suffix == ".json"
+    record = span.to_chrome() if chrome else span.to_dict()
+    with path.open("a") as handle:
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        # Chrome's JSON array format tolerates the missing closing bracket.
+        prefix = "[\n" if chrome and handle.tell() == 0 else ""
+        suffix = ",\n" if chrome else "\n"
+        handle.write(prefix + json.dumps(record, default=str) + suffix)
+
+
+@contextlib.contextmanager
+def span(name: str, kind: str = "task", **attrs: object) -> Iterator[Span]:
+    """Time the enclosed block as a span nested under the current one."""
+    parent = _current.get()
+    parent_id = parent.span_id if parent else os.environ.get(TRACE_PARENT_ENV) or None
+    current = Span(name=name, kind=kind, parent_id=parent_id, attrs=dict(attrs))
+    token = _current.set(current)
+    try:
+        yield current
+    except BaseException as exc:
+        current.status = "error"
+        current.set(error=type(exc).__name__)
+        raise
+    finally:
+        current.end = time.time()
+        _current.reset(token)
+        path = trace_file()
+        if path is not None:
+            _export(current, path)
+
+
+def traced(name: str) -> Callable[[Callable[P, R]], Callable[P, R]]:
+    """Record every call of the decorated function as a span called ``name``."""
+
+    def decorator(func: Callable[P, R]) -> Callable[P, R]:
+        @functools.wraps(func)
+        def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+            with span(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def child_env(env: dict[str, str] | None = None) -> dict[str, str] | None:
+    """Return ``env`` with the current span exported as the child's trace parent."""
+    current = _current.get()
+    if current is None or trace_file() is None:
+        return env
+    return {**(env if env is not None else os.environ), TRACE_PARENT_ENV: current.span_id}
+
+
+def run(
+    cmd: list[str],
+    **kwargs: Any,  # noqa: ANN401
+) -> subprocess.CompletedProcess[Any]:
+    """Run ``subprocess.run`` inside a ``subprocess`` span.
+
+    The span records the executable, a hash of the arguments, the exit code and,
+    when output is captured, its size in bytes.
+    """
+    with span(Path(cmd[0]).name, "subprocess", command=cmd[0], args_hash=args_hash(cmd)) as sp:
+        kwargs["env"] = child_env(kwargs.get("env"))
+        try:
+            completed = subprocess.run(cmd, **kwargs)  # noqa: PLW1510, S603
+        except subprocess.CalledProcessError as exc:
+            sp.set(exit_code=exc.returncode, output_bytes=_output_size(exc.stdout, exc.stderr))
+            raise
+        sp.set(
+            exit_code=completed.returncode,
+            output_bytes=_output_size(completed.stdout, completed.stderr),
+        )
+        if completed.returncode:
+            sp.status = "error"
+        return completed
+
+
+def _output_size(*streams: str | bytes | None) -> int | None:
+    sizes = [len(stream) for stream in streams if stream is not None]
+    return sum(sizes) if sizes else None